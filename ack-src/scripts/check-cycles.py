@@ -2,75 +2,1288 @@
 """
 check-cycles.py - Detect circular dependencies in task graph
 
-Usage: python3 check-cycles.py <dependencies.md>
+Usage: python3 check-cycles.py [check] <dependencies.md>
+       python3 check-cycles.py [check] <dir|glob> ... [--root DIR] [--jobs N]
+       python3 check-cycles.py watch [dependencies.md]
+       python3 check-cycles.py query <dependencies.md> --depends TASK DEPENDENCY
+       python3 check-cycles.py query <dependencies.md> --blocked-by TASK | --blockers TASK
+       python3 check-cycles.py schedule <dependencies.md> [--tasks tasks.md] [--workers N ...]
+       python3 check-cycles.py diff <dependencies.md> <base-rev> [<head-rev>]
+       python3 check-cycles.py reduce <dependencies.md> [--matrix] [--verbose]
+
+Commands:
+  check  - Report every circular dependency in the file (default).
+           Given directories, glob patterns or several files, parses
+           every dependencies.md in a process pool and checks the merged
+           graph. Task IDs are namespaced by project directory
+           relative to --root, by default the git toplevel
+           (services/api:TASK-001); write project:TASK-XXX to depend on
+           another project's task. A reference to a project that was
+           not found is an error.
+  watch  - Read dependency edges from stdin, one per line, and answer
+           each immediately: OK if accepted, CYCLE if it would close a
+           cycle (the edge is rejected). Optionally seeded from a file.
+  query  - Answer "does A depend on B" / "what does X block" from a
+           reachability index kept next to the file (<file>.reach).
+           The index is written by 'check --index' and rebuilt
+           automatically when the file changes.
+  schedule - Split the DAG into parallel waves, find the critical path
+           weighted by task Complexity (story points), and simulate the
+           makespan for each worker count.
+  diff   - List the edges added and removed between two git revisions
+           (head defaults to the working tree) and re-check only the
+           part of the graph reachable from them: cycles introduced by
+           the change, and cycles it resolves.
+  reduce - Compute the transitive reduction of the DAG: every edge
+           A → C already implied by A → B → C. Reports them, or with
+           --matrix prints the file with them removed from the matrix.
+
+Parsed graphs and their verdicts are cached by content hash under
+$XDG_CACHE_HOME/ack/check-cycles (default ~/.cache); pass --no-cache to
+bypass the cache.
 
 Exit codes:
   0 - No circular dependencies found
-  1 - Circular dependencies detected
-  2 - Error reading file or invalid format
+  1 - Circular dependencies detected (diff: introduced by the change)
+  2 - Error reading file or invalid format (check: or a reference to
+      an unknown project)
 """
 
+import argparse
+import fnmatch
+import glob
+import hashlib
+import heapq
+import json
+import os
 import sys
 import re
-from typing import Dict, List, Set, Tuple
-from collections import defaultdict
+import subprocess
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+
+class CycleError(ValueError):
+    """Raised when an incremental add_edge would close a dependency cycle"""
+    
+    def __init__(self, cycle: List[str]):
+        super().__init__(f"dependency cycle: {' → '.join(cycle)}")
+        self.cycle = cycle
 
 
 class DependencyGraph:
-    """Directed graph for task dependencies"""
+    """
+    Directed graph for task dependencies.
+
+    Task IDs are interned to dense integers as edges are added, and the
+    edges are frozen into a compressed sparse row (CSR) layout before the
+    first traversal: the dependencies of task i are
+    targets[offsets[i]:offsets[i + 1]], sorted and de-duplicated.
+
+    In incremental mode (see enable_incremental) the graph instead keeps
+    mutable adjacency lists and a topological order, and add_edge raises
+    CycleError rather than accept an edge that would close a cycle.
+    """
     
     def __init__(self):
-        self.graph: Dict[str, Set[str]] = defaultdict(set)
-        self.all_tasks: Set[str] = set()
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.offsets = array('q', [0])
+        self.targets = array('i')
+        self._pending: Optional[List[List[int]]] = []
+        # Incremental mode: reverse adjacency and topological positions
+        self._dependents: Optional[List[List[int]]] = None
+        self._position: Optional[List[int]] = None
+    
+    @property
+    def all_tasks(self) -> List[str]:
+        """Every task ID seen, in interning order"""
+        return self.names
+    
+    @property
+    def task_count(self) -> int:
+        return len(self.names)
+    
+    @property
+    def edge_count(self) -> int:
+        self.freeze()
+        return len(self.targets)
+    
+    def intern(self, task: str) -> int:
+        """Return the dense integer ID for task, assigning one if new"""
+        node = self.ids.get(task)
+        if node is None:
+            node = self.ids[task] = len(self.names)
+            self.names.append(task)
+            self._thaw().append([])
+            if self._position is not None:
+                self._dependents.append([])
+                self._position.append(node)
+        return node
     
     def add_edge(self, from_task: str, to_task: str):
         """Add dependency: from_task depends on to_task"""
-        self.graph[from_task].add(to_task)
-        self.all_tasks.add(from_task)
-        self.all_tasks.add(to_task)
+        ids = self.ids
+        from_node = ids.get(from_task)
+        if from_node is None:
+            from_node = self.intern(from_task)
+        to_node = ids.get(to_task)
+        if to_node is None:
+            to_node = self.intern(to_task)
+        if self._position is not None:
+            self._insert_checked(from_node, to_node)
+            return
+        pending = self._pending
+        if pending is None:
+            pending = self._thaw()
+        pending[from_node].append(to_node)
+    
+    def add_edges(self, from_task: str, to_tasks: Iterable[str]):
+        """Add dependencies: from_task depends on each of to_tasks"""
+        if self._position is not None:
+            for to_task in to_tasks:
+                self.add_edge(from_task, to_task)
+            return
+        ids = self.ids
+        from_node = ids.get(from_task)
+        if from_node is None:
+            from_node = self.intern(from_task)
+        pending = self._pending
+        if pending is None:
+            pending = self._thaw()
+        to_nodes = [ids.get(to_task) for to_task in to_tasks]
+        if None in to_nodes:
+            to_nodes = [self.intern(to_task) for to_task in to_tasks]
+        pending[from_node].extend(to_nodes)
+    
+    @classmethod
+    def from_arrays(cls, names: List[str], offsets: array, targets: array) -> 'DependencyGraph':
+        """Rebuild a frozen graph from its interned names and CSR arrays"""
+        graph = cls()
+        graph.names = names
+        graph.ids = {name: node for node, name in enumerate(names)}
+        graph.offsets = offsets
+        graph.targets = targets
+        graph._pending = None
+        if len(offsets) != len(names) + 1:
+            raise ValueError("CSR offsets do not match the task count")
+        return graph
+    
+    def _thaw(self) -> List[List[int]]:
+        """Return the edge builder, unpacking the CSR arrays if frozen"""
+        if self._pending is None:
+            self._pending = [list(self.dependencies(node)) for node in range(len(self.offsets) - 1)]
+            self.offsets = array('q', [0])
+            self.targets = array('i')
+        return self._pending
+    
+    def freeze(self):
+        """Pack the pending edges into the CSR arrays (ends incremental mode)"""
+        if self._pending is None:
+            return
+        self._dependents = None
+        self._position = None
+        self.offsets, self.targets = pack_rows(self._pending)
+        self._pending = None
+    
+    def dependencies(self, node: int) -> array:
+        """Return the tasks node depends on, as a sorted array of IDs"""
+        self.freeze()
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+    
+    def has_edge(self, from_node: int, to_node: int) -> bool:
+        """Check whether from_node depends directly on to_node"""
+        self.freeze()
+        lo, hi = self.offsets[from_node], self.offsets[from_node + 1]
+        i = bisect_left(self.targets, to_node, lo, hi)
+        return i < hi and self.targets[i] == to_node
+    
+    def enable_incremental(self):
+        """
+        Switch to incremental cycle detection.
+
+        Seeds a topological order from the current edges, in which every
+        task sits after the tasks it depends on. From then on add_edge
+        maintains that order (Pearce-Kelly) and raises CycleError for an
+        edge that would close a cycle, leaving the graph unchanged.
+
+        Raises:
+            CycleError: if the graph already contains a cycle
+        """
+        cycles = self.find_cycles()
+        if cycles:
+            raise CycleError(cycles[0])
+        
+        # Components come out dependencies-first, and all are single tasks
+        position = [0] * self.task_count
+        for i, (node,) in enumerate(self.strongly_connected_components()):
+            position[node] = i
+        
+        dependents: List[List[int]] = [[] for _ in range(self.task_count)]
+        offsets, targets = self.offsets, self.targets
+        for node in range(self.task_count):
+            for dep in targets[offsets[node]:offsets[node + 1]]:
+                dependents[dep].append(node)
+        
+        self._thaw()
+        self._dependents = dependents
+        self._position = position
+    
+    def _insert_checked(self, from_node: int, to_node: int):
+        """Insert from_node -> to_node, repairing the order or raising CycleError"""
+        forward = self._pending
+        dependents = self._dependents
+        position = self._position
+        
+        if from_node == to_node:
+            raise CycleError([self.names[from_node]] * 2)
+        if to_node in forward[from_node]:
+            return
+        
+        lower, upper = position[from_node], position[to_node]
+        if upper < lower:
+            # to_node already comes first
+            forward[from_node].append(to_node)
+            dependents[to_node].append(from_node)
+            return
+        
+        # Affected region is the slice of the order between the two tasks.
+        # Tasks that depend on from_node (transitively, within the region)
+        # must move after to_node; if to_node is among them, the edge would
+        # close a cycle.
+        parent = {from_node: from_node}
+        stack = [from_node]
+        while stack:
+            node = stack.pop()
+            for dependent in dependents[node]:
+                if dependent == to_node:
+                    path = [to_node, node]
+                    while node != from_node:
+                        node = parent[node]
+                        path.append(node)
+                    raise CycleError([self.names[n] for n in [from_node] + path])
+                if dependent not in parent and position[dependent] <= upper:
+                    parent[dependent] = node
+                    stack.append(dependent)
+        moved_later = list(parent)
+        
+        # Tasks that to_node depends on (within the region) move before them
+        seen = {to_node}
+        stack = [to_node]
+        while stack:
+            node = stack.pop()
+            for dep in forward[node]:
+                if dep not in seen and position[dep] >= lower:
+                    seen.add(dep)
+                    stack.append(dep)
+        moved_earlier = list(seen)
+        
+        moved_earlier.sort(key=position.__getitem__)
+        moved_later.sort(key=position.__getitem__)
+        slots = sorted(position[node] for node in moved_earlier + moved_later)
+        for slot, node in zip(slots, moved_earlier + moved_later):
+            position[node] = slot
+        
+        forward[from_node].append(to_node)
+        dependents[to_node].append(from_node)
     
+    def strongly_connected_components(self, roots: Optional[Iterable[int]] = None) -> List[List[int]]:
+        """
+        Return the strongly connected components of the graph.
+
+        Iterative Tarjan over the CSR arrays: every task and edge is visited
+        once, and the explicit work stack keeps deep dependency chains clear
+        of Python's recursion limit. Components come out in reverse
+        topological order (a component is emitted before any component that
+        depends on it).
+
+        With roots, only the tasks reachable from them are searched. Those
+        components are still exact, since everything in a component
+        reachable from a root is reachable from it too.
+        """
+        self.freeze()
+        offsets, targets = self.offsets, self.targets
+        n = self.task_count
+        index = [-1] * n
+        lowlink = [0] * n
+        on_stack = [False] * n
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+
+        for root in range(n) if roots is None else roots:
+            if index[root] >= 0:
+                continue
+
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, offsets[root])]
+
+            while work:
+                node, i = work[-1]
+                end = offsets[node + 1]
+
+                while i < end:
+                    neighbor = targets[i]
+                    i += 1
+                    if index[neighbor] < 0:
+                        work[-1] = (node, i)
+                        index[neighbor] = lowlink[neighbor] = counter
+                        counter += 1
+                        stack.append(neighbor)
+                        on_stack[neighbor] = True
+                        work.append((neighbor, offsets[neighbor]))
+                        break
+                    if on_stack[neighbor] and index[neighbor] < lowlink[node]:
+                        lowlink[node] = index[neighbor]
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        if lowlink[node] < lowlink[parent]:
+                            lowlink[parent] = lowlink[node]
+
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+
+        return components
+
+    def shortest_cycle(self, start: int, members: Set[int]) -> List[int]:
+        """
+        Return a shortest cycle through start using only tasks in members.
+
+        Breadth-first search from start's dependencies back to start, so the
+        witness is minimal for that task. Returns [] if no such cycle exists.
+        """
+        if self.has_edge(start, start):
+            return [start, start]
+
+        offsets, targets = self.offsets, self.targets
+        parent: Dict[int, int] = {}
+        frontier = [start]
+
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for neighbor in targets[offsets[node]:offsets[node + 1]]:
+                    if neighbor not in members or neighbor in parent:
+                        continue
+                    parent[neighbor] = node
+                    if neighbor == start:
+                        cycle = [start]
+                        node = parent[start]
+                        while node != start:
+                            cycle.append(node)
+                            node = parent[node]
+                        cycle.append(start)
+                        cycle.reverse()
+                        return cycle
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return []
+
+    def shortest_path(self, start: int, goal: int, members: Set[int]) -> List[int]:
+        """
+        Return a shortest dependency path from start to goal within members.
+
+        Breadth-first search, like shortest_cycle. Returns [] if goal cannot
+        be reached.
+        """
+        if start == goal:
+            return [start]
+
+        offsets, targets = self.offsets, self.targets
+        parent: Dict[int, int] = {start: start}
+        frontier = [start]
+
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for neighbor in targets[offsets[node]:offsets[node + 1]]:
+                    if neighbor not in members or neighbor in parent:
+                        continue
+                    parent[neighbor] = node
+                    if neighbor == goal:
+                        path = [goal]
+                        while node != start:
+                            path.append(node)
+                            node = parent[node]
+                        path.append(start)
+                        path.reverse()
+                        return path
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return []
+
     def find_cycles(self) -> List[List[str]]:
-        """Find all cycles in the graph using DFS"""
+        """
+        Find every cyclic component and return one witness cycle for each.
+
+        A component is cyclic if it has more than one task, or a single task
+        that depends on itself. The witness is a shortest cycle through the
+        component's lowest task ID, so output is stable between runs.
+        """
+        names = self.names
         cycles = []
-        visited = set()
-        rec_stack = set()
-        
-        def dfs(node: str, path: List[str]) -> bool:
-            """DFS helper that returns True if cycle found"""
-            visited.add(node)
-            rec_stack.add(node)
-            path.append(node)
-            
-            for neighbor in self.graph.get(node, set()):
-                if neighbor not in visited:
-                    if dfs(neighbor, path):
-                        return True
-                elif neighbor in rec_stack:
-                    # Found a cycle
-                    cycle_start = path.index(neighbor)
-                    cycle = path[cycle_start:] + [neighbor]
-                    cycles.append(cycle)
+
+        for component in self.strongly_connected_components():
+            if len(component) == 1 and not self.has_edge(component[0], component[0]):
+                continue
+            start = min(component, key=names.__getitem__)
+            cycle = self.shortest_cycle(start, set(component))
+            cycles.append([names[node] for node in cycle])
+
+        cycles.sort()
+        return cycles
+
+    def condensation(self) -> Tuple[array, array, array, array, array]:
+        """
+        Collapse each strongly connected component to a single node.
+
+        Returns (component_of, offsets, targets, member_offsets, members):
+        component_of maps task -> component, (offsets, targets) is the CSR
+        of the condensed DAG, and members[member_offsets[c]:member_offsets[c + 1]]
+        lists the tasks of component c. Components are numbered so that a
+        component's dependencies always have lower numbers.
+        """
+        components = self.strongly_connected_components()
+        component_of = array('i', bytes(4 * self.task_count))
+        member_offsets = array('q', [0])
+        members = array('i')
+        for c, component in enumerate(components):
+            for node in component:
+                component_of[node] = c
+            members.extend(component)
+            member_offsets.append(len(members))
+
+        offsets, targets = self.offsets, self.targets
+        rows: List[List[int]] = []
+        for component in components:
+            c = component_of[component[0]]
+            row = []
+            for node in component:
+                for dep in targets[offsets[node]:offsets[node + 1]]:
+                    d = component_of[dep]
+                    if d != c:
+                        row.append(d)
+            rows.append(row)
+
+        return (component_of, *pack_rows(rows), member_offsets, members)
+
+
+def pack_rows(rows: List[List[int]]) -> Tuple[array, array]:
+    """Pack adjacency rows into sorted, de-duplicated CSR arrays"""
+    offsets = array('q', [0])
+    targets = array('i')
+    for row in rows:
+        if len(row) > 1:
+            row = sorted(set(row))
+        targets.extend(row)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def transpose_csr(n: int, offsets: array, targets: array) -> Tuple[array, array]:
+    """Return the CSR arrays of the graph with every edge reversed"""
+    rows: List[List[int]] = [[] for _ in range(n)]
+    for node in range(n):
+        for target in targets[offsets[node]:offsets[node + 1]]:
+            rows[target].append(node)
+    return pack_rows(rows)
+
+
+# Interval labels kept per component of the reachability index; beyond
+# this a component is answered by a pruned search instead, which keeps the
+# index linear in the graph on dense DAGs
+MAX_LABELS = 64
+
+
+def interval_labels(n: int, offsets: array, targets: array, roots: Iterable[int],
+                    max_labels: int = MAX_LABELS) -> Tuple[array, array, array, array, array, array]:
+    """
+    Label the nodes of a DAG with the postorder intervals they can reach.
+
+    Tree-cover labeling: number the nodes in DFS postorder, then give each
+    node the merged union of its own number and its successors' intervals.
+    Node u reaches node w iff post[w] lies in one of u's intervals, and
+    every number inside those intervals belongs to a reachable node.
+    roots should list the DAG's sources first: a spanning forest with few,
+    deep trees keeps the labels short.
+
+    On dense DAGs the merged labels can grow with the graph, so a node
+    whose union needs more than max_labels intervals (or that has such a
+    successor) gets none: queries search the DAG from it instead. Every
+    node also gets low, the smallest postorder number it reaches, so any
+    node outside [low[u], post[u]] is known to be unreachable from u
+    without a search.
+
+    Returns (post, order, low, label_offsets, label_lo, label_hi), where
+    order maps postorder numbers back to nodes; a node without labels has
+    an empty label range.
+    """
+    post = array('i', bytes(4 * n))
+    order = array('i')
+    visited = [False] * n
+
+    for root in roots:
+        if visited[root]:
+            continue
+        visited[root] = True
+        work = [(root, offsets[root])]
+        while work:
+            node, i = work[-1]
+            end = offsets[node + 1]
+            while i < end:
+                target = targets[i]
+                i += 1
+                if not visited[target]:
+                    visited[target] = True
+                    work[-1] = (node, i)
+                    work.append((target, offsets[target]))
+                    break
+            else:
+                work.pop()
+                post[node] = len(order)
+                order.append(node)
+
+    # Intervals are packed as lo << 32 | hi so they sort by lo. Postorder
+    # finishes every successor before its predecessors. None marks a node
+    # whose labels went over max_labels.
+    mask = (1 << 32) - 1
+    low = array('i', post)
+    labels: List[Optional[List[int]]] = [None] * n
+    for node in order:
+        p = post[node]
+        intervals = [p << 32 | p]
+        for target in targets[offsets[node]:offsets[node + 1]]:
+            if low[target] < low[node]:
+                low[node] = low[target]
+            if intervals is not None:
+                target_labels = labels[target]
+                if target_labels is None:
+                    intervals = None
+                else:
+                    intervals.extend(target_labels)
+        if intervals is not None and len(intervals) > 1:
+            intervals.sort()
+            merged = []
+            last_lo = intervals[0] >> 32
+            last_hi = -2
+            for interval in intervals:
+                lo, hi = interval >> 32, interval & mask
+                if lo <= last_hi + 1:
+                    if hi > last_hi:
+                        last_hi = hi
+                else:
+                    if last_hi >= 0:
+                        merged.append(last_lo << 32 | last_hi)
+                    last_lo, last_hi = lo, hi
+            merged.append(last_lo << 32 | last_hi)
+            intervals = merged if len(merged) <= max_labels else None
+        labels[node] = intervals
+
+    label_offsets = array('q', [0])
+    label_lo = array('i')
+    label_hi = array('i')
+    for node in range(n):
+        for interval in labels[node] or ():
+            label_lo.append(interval >> 32)
+            label_hi.append(interval & mask)
+        label_offsets.append(len(label_lo))
+        labels[node] = None
+
+    return post, order, low, label_offsets, label_lo, label_hi
+
+
+class ReachabilityIndex:
+    """
+    Precomputed "what depends on what" answers for a dependency graph.
+
+    Built over the condensation (one node per strongly connected
+    component) in both directions: 'down' follows dependencies, 'up'
+    follows dependents. Most components carry interval labels, so a
+    reachability test is a binary search and listing a closure walks the
+    intervals in time linear in the output. Components whose labels
+    would exceed MAX_LABELS are answered by a search of the condensed
+    DAG, pruned by the postorder bounds and cut short at every labeled
+    component it meets; the index stays linear in the size of the graph.
+    """
+
+    FORMAT = 2
+    DIRECTION_ARRAYS = ('post', 'order', 'low', 'offsets', 'lo', 'hi', 'edge_offsets', 'edges')
+    ARRAYS = (
+        'component_of', 'member_offsets', 'members',
+        'down_post', 'down_order', 'down_low', 'down_offsets', 'down_lo', 'down_hi',
+        'down_edge_offsets', 'down_edges',
+        'up_post', 'up_order', 'up_low', 'up_offsets', 'up_lo', 'up_hi',
+        'up_edge_offsets', 'up_edges',
+    )
+
+    def __init__(self, names: List[str], arrays: Dict[str, array], source: Optional[Dict] = None):
+        self.names = names
+        self.ids = {name: node for node, name in enumerate(names)}
+        self.arrays = arrays
+        self.source = source or {}
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, graph: DependencyGraph, source: Optional[Dict] = None) -> 'ReachabilityIndex':
+        """Build the index from a parsed dependency graph"""
+        component_of, offsets, targets, member_offsets, members = graph.condensation()
+        n = len(member_offsets) - 1
+        arrays = {
+            'component_of': component_of,
+            'member_offsets': member_offsets,
+            'members': members,
+        }
+        # Components are numbered dependencies-first, so the sources of the
+        # 'down' direction are the highest numbers and those of 'up' the lowest
+        directions = {
+            'down': (offsets, targets, range(n - 1, -1, -1)),
+            'up': (*transpose_csr(n, offsets, targets), range(n)),
+        }
+        for direction, (dir_offsets, dir_targets, roots) in directions.items():
+            labels = interval_labels(n, dir_offsets, dir_targets, roots)
+            for suffix, values in zip(cls.DIRECTION_ARRAYS, labels + (dir_offsets, dir_targets)):
+                arrays[f'{direction}_{suffix}'] = values
+        return cls(list(graph.names), arrays, source)
+
+    def save(self, path: str):
+        """Write the index to path"""
+        meta = {'format': self.FORMAT, 'source': self.source, 'names': self.names}
+        save_arrays(path, meta, {name: self.arrays[name] for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path: str) -> Optional['ReachabilityIndex']:
+        """Read an index written by save(), or None if missing or unreadable"""
+        try:
+            meta, arrays = load_arrays(path)
+        except (OSError, ValueError, EOFError):
+            return None
+        if meta.get('format') != cls.FORMAT or set(arrays) != set(cls.ARRAYS):
+            return None
+        return cls(meta['names'], arrays, meta.get('source'))
+
+    def _direction(self, direction: str) -> List[array]:
+        return [self.arrays[f'{direction}_{suffix}'] for suffix in self.DIRECTION_ARRAYS]
+
+    def _reaches(self, direction: str, from_component: int, to_component: int) -> bool:
+        if from_component == to_component:
+            return True  # tasks on a common cycle reach each other
+        post, _, low, offsets, lo, hi, edge_offsets, edges = self._direction(direction)
+        p = post[to_component]
+        stack = [from_component]
+        seen = {from_component}
+        while stack:
+            c = stack.pop()
+            if not low[c] <= p <= post[c]:
+                continue
+            start, end = offsets[c], offsets[c + 1]
+            if start < end:
+                i = bisect_right(lo, p, start, end) - 1
+                if i >= start and hi[i] >= p:
                     return True
-            
-            path.pop()
-            rec_stack.remove(node)
+                continue
+            for target in edges[edge_offsets[c]:edge_offsets[c + 1]]:
+                if target == to_component:
+                    return True
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return False
+
+    def _closure(self, direction: str, task: str) -> List[str]:
+        _, order, _, offsets, lo, hi, edge_offsets, edges = self._direction(direction)
+        node = self.ids[task]
+        component = self.component_of[node]
+        seen = bytearray(len(self.member_offsets) - 1)
+        seen[component] = 1
+        components = [component]
+        stack = [component]
+        while stack:
+            c = stack.pop()
+            if offsets[c] < offsets[c + 1]:
+                # Labeled: the intervals already cover everything c reaches
+                for i in range(offsets[c], offsets[c + 1]):
+                    for p in range(lo[i], hi[i] + 1):
+                        reached = order[p]
+                        if not seen[reached]:
+                            seen[reached] = 1
+                            components.append(reached)
+                continue
+            for target in edges[edge_offsets[c]:edge_offsets[c + 1]]:
+                if not seen[target]:
+                    seen[target] = 1
+                    components.append(target)
+                    stack.append(target)
+
+        result = []
+        for c in components:
+            for member in self.members[self.member_offsets[c]:self.member_offsets[c + 1]]:
+                if member != node:
+                    result.append(self.names[member])
+        return result
+
+    def depends_on(self, task: str, dependency: str) -> bool:
+        """Check whether task transitively depends on dependency"""
+        node, dep = self.ids[task], self.ids[dependency]
+        if node == dep:
             return False
+        return self._reaches('down', self.component_of[node], self.component_of[dep])
+
+    def dependencies_of(self, task: str) -> List[str]:
+        """Every task that task transitively depends on"""
+        return self._closure('down', task)
+
+    def dependents_of(self, task: str) -> List[str]:
+        """Every task transitively blocked by task"""
+        return self._closure('up', task)
+
+
+def save_arrays(path: str, meta: Dict, arrays: Dict[str, array]):
+    """
+    Write a JSON header line followed by the raw bytes of each array.
+
+    The file is written to a temporary name and renamed into place, so
+    readers never see a partial file. Arrays are stored in native byte
+    order; these files are local caches, not an interchange format.
+    """
+    header = dict(meta, arrays=[[name, values.typecode, len(values)] for name, values in arrays.items()])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(json.dumps(header).encode('utf-8') + b'\n')
+        for values in arrays.values():
+            values.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def load_arrays(path: str) -> Tuple[Dict, Dict[str, array]]:
+    """Read a file written by save_arrays and return (meta, arrays)"""
+    with open(path, 'rb') as f:
+        meta = json.loads(f.readline())
+        arrays = {}
+        for name, typecode, length in meta.pop('arrays'):
+            values = array(typecode)
+            values.fromfile(f, length)
+            arrays[name] = values
+    return meta, arrays
+
+
+def file_signature(filepath: str) -> Dict:
+    """Describe a file's contents: size, mtime and SHA-256"""
+    st = os.stat(filepath)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': file_sha256(filepath)}
+
+
+def is_current(filepath: str, source: Dict) -> bool:
+    """Check whether a recorded file signature still matches filepath"""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return False
+    if st.st_size != source.get('size'):
+        return False
+    if st.st_mtime_ns == source.get('mtime_ns'):
+        return True
+    return file_signature(filepath)['sha256'] == source.get('sha256')
+
+
+def index_path(filepath: str) -> str:
+    """Where the reachability index for a dependencies file is kept"""
+    return f"{filepath}.reach"
+
+
+def build_index(filepath: str, graph: Optional[DependencyGraph] = None) -> ReachabilityIndex:
+    """Build and persist the reachability index for filepath"""
+    source = file_signature(filepath)
+    if graph is None:
+        graph = parse_dependencies_md(filepath)
+    index = ReachabilityIndex.build(graph, source)
+    try:
+        index.save(index_path(filepath))
+    except OSError as e:
+        print(f"⚠️  Could not write index {index_path(filepath)}: {e}", file=sys.stderr)
+    return index
+
+
+def load_index(filepath: str, graph: Optional[DependencyGraph] = None) -> ReachabilityIndex:
+    """Load the persisted index for filepath, rebuilding it if stale"""
+    index = ReachabilityIndex.load(index_path(filepath))
+    if index is not None and is_current(filepath, index.source):
+        return index
+    return build_index(filepath, graph)
+
+
+# A task ID, or project:TASK-XXX for a task in another project. The
+# qualified form is only tried when merging projects, on lines that
+# contain ':TASK-'; a single file reads "Phase:TASK-001" as TASK-001.
+TASK_ID = r'TASK-\d+'
+QUALIFIED_TASK_ID = r'(?<![\w./-])(?:[\w.-]+(?:/[\w.-]+)*:)?TASK-\d+'
+
+# Matrix cells that mean "no dependencies"
+EMPTY_CELLS = {'', 'none', '-'}
+
+
+class EdgePatterns(NamedTuple):
+    """Compiled edge syntaxes for one form of task ID"""
+    task: Pattern
+    # First task ID in each comma-separated piece of a dependency cell
+    dep_cell: Pattern
+    # TASK-XXX → TASK-YYY, or TASK-XXX depends on TASK-YYY, TASK-ZZZ
+    edge: Pattern
+    # An arrow or "depends on" left open at the end of a line
+    dangling: Pattern
+
+
+def compile_edge_patterns(task_id: str) -> EdgePatterns:
+    return EdgePatterns(
+        task=re.compile(task_id),
+        dep_cell=re.compile(rf'(?:^|,)[^,]*?({task_id})'),
+        edge=re.compile(
+            rf'({task_id})(?:\s*→\s*({task_id})'
+            rf'|\s+depends\s+on\s+({task_id}(?:\s*,\s*{task_id})*))'
+        ),
+        dangling=re.compile(rf'{task_id}(?:\s*→|\s+depends\s+on)\s*$'),
+    )
+
+
+PLAIN_PATTERNS = compile_edge_patterns(TASK_ID)
+QUALIFIED_PATTERNS = compile_edge_patterns(QUALIFIED_TASK_ID)
+TASK_ID_PATTERN = PLAIN_PATTERNS.task
+
+
+def matrix_row_edges(line: str, patterns: EdgePatterns = PLAIN_PATTERNS) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield (task, dependencies) for each matrix row in a table line.
+
+    Format: | TASK-XXX | TASK-YYY, TASK-ZZZ | ... |
+    A cell holding a single task ID is followed by its dependency cell;
+    scanning resumes after that cell, so other columns are not mistaken
+    for rows.
+    """
+    cells = line.split('|')
+    last = len(cells) - 2
+    i = 1
+    
+    while i < last:
+        task = cells[i].strip()
+        if 'TASK-' in task and patterns.task.fullmatch(task):
+            deps_str = cells[i + 1].strip()
+            if deps_str.lower() not in EMPTY_CELLS:
+                deps = patterns.dep_cell.findall(deps_str)
+                if deps:
+                    yield task, deps
+            i += 3
+        else:
+            i += 1
+
+
+def iter_dependency_edges(lines: Iterable[str], qualified: bool = False) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield (task, dependencies) for every edge statement in lines.
+
+    A single pass recognizes all three syntaxes: dependency matrix rows,
+    TASK-XXX → TASK-YYY arrows, and "TASK-XXX depends on ..." lists. Only
+    one line (plus an arrow left dangling at the end of the previous
+    line) is held at a time. With qualified=True (a project being
+    merged), project:TASK-XXX is read as one task ID.
+    """
+    carry = ''
+    
+    for line in lines:
+        if carry:
+            line = carry + line
+            carry = ''
         
-        for task in self.all_tasks:
-            if task not in visited:
-                dfs(task, [])
+        if 'TASK-' not in line:
+            continue
         
-        return cycles
+        patterns = QUALIFIED_PATTERNS if qualified and ':TASK-' in line else PLAIN_PATTERNS
+        
+        if '|' in line:
+            yield from matrix_row_edges(line, patterns)
+        
+        if '→' not in line and 'depends' not in line:
+            continue
+        
+        for match in patterns.edge.finditer(line):
+            if match.group(2):
+                yield match.group(1), [match.group(2)]
+            else:
+                yield match.group(1), patterns.task.findall(match.group(3))
+        
+        dangling = patterns.dangling.search(line)
+        if dangling:
+            carry = dangling.group(0) + ' '
+
+
+def build_dependency_graph(lines: Iterable[str], qualified: bool = False) -> DependencyGraph:
+    """Parse dependencies.md lines into a frozen DependencyGraph"""
+    graph = DependencyGraph()
+    for task, deps in iter_dependency_edges(lines, qualified):
+        graph.add_edges(task, deps)
+    graph.freeze()
+    return graph
+
+
+def read_dependency_graph(filepath: str, qualified: bool = False) -> Tuple[DependencyGraph, str]:
+    """
+    Stream filepath into a frozen DependencyGraph (raises on I/O errors).
+
+    Returns (graph, sha256), hashing the bytes as they are parsed.
+    """
+    digest = hashlib.sha256()
+    
+    def lines(f):
+        for raw in f:
+            digest.update(raw)
+            yield raw.decode('utf-8')
+    
+    with open(filepath, 'rb') as f:
+        graph = build_dependency_graph(lines(f), qualified)
+    return graph, digest.hexdigest()
 
 
 def parse_dependencies_md(filepath: str) -> DependencyGraph:
     """Parse dependencies.md and build dependency graph"""
     
+    try:
+        return read_dependency_graph(filepath)[0]
+    except FileNotFoundError:
+        print(f"❌ File not found: {filepath}", file=sys.stderr)
+        sys.exit(2)
+    except Exception as e:
+        print(f"❌ Error reading file: {e}", file=sys.stderr)
+        sys.exit(2)
+
+
+# Bump whenever parsing rules change, so graphs cached by older rules are ignored
+PARSER_VERSION = 2
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory ($XDG_CACHE_HOME/ack/check-cycles)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ack', 'check-cycles')
+
+
+def file_sha256(filepath: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class GraphCache:
+    """
+    Parsed graphs and their cycle verdicts, keyed by content hash.
+
+    Entries are named <sha256>.v<PARSER_VERSION>.<kind>, so an edited file
+    or a parser change simply misses, and an unreadable entry is treated
+    as a miss and overwritten. Writes are best effort: a read-only cache
+    directory only costs the speedup. Projects parsed for a merge (with
+    qualified task IDs) are cached apart, as kind 'project'.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, kind: str = 'graph'):
+        self.directory = directory or default_cache_dir()
+        self.kind = kind
+    
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.v{PARSER_VERSION}.{self.kind}")
+    
+    def load(self, digest: str) -> Optional[Tuple[DependencyGraph, Optional[List[List[str]]]]]:
+        """Return (graph, cycles) for digest, or None; cycles is None if never checked"""
+        try:
+            meta, arrays = load_arrays(self.path(digest))
+            graph = DependencyGraph.from_arrays(meta['names'], arrays['offsets'], arrays['targets'])
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        return graph, meta.get('cycles')
+    
+    def save(self, digest: str, graph: DependencyGraph, cycles: Optional[List[List[str]]] = None):
+        graph.freeze()
+        meta = {'parser_version': PARSER_VERSION, 'names': graph.names, 'cycles': cycles}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            save_arrays(self.path(digest), meta, {'offsets': graph.offsets, 'targets': graph.targets})
+        except OSError:
+            pass
+
+
+def load_dependencies(filepath: str, cache: Optional[GraphCache] = None) -> Tuple[DependencyGraph, List[List[str]]]:
+    """
+    Parse and check filepath, going through the cache when one is given.
+
+    An unchanged file costs one hash and one cache load. On a miss the
+    file is parsed (and hashed again as it streams); the result is only
+    cached if the file did not change in between.
+    """
+    if cache is None:
+        graph = parse_dependencies_md(filepath)
+        return graph, graph.find_cycles()
+    
+    try:
+        digest = file_sha256(filepath)
+        cached = cache.load(digest)
+        if cached is not None and cached[1] is not None:
+            return cached
+        if cached is not None:
+            graph, parsed_digest = cached[0], digest
+        else:
+            graph, parsed_digest = read_dependency_graph(filepath)
+    except FileNotFoundError:
+        print(f"❌ File not found: {filepath}", file=sys.stderr)
+        sys.exit(2)
+    except Exception as e:
+        print(f"❌ Error reading file: {e}", file=sys.stderr)
+        sys.exit(2)
+    
+    cycles = graph.find_cycles()
+    if parsed_digest == digest:
+        cache.save(digest, graph, cycles)
+    return graph, cycles
+
+
+# Directories never searched for dependency files
+SKIP_DIRS = {'.git', 'node_modules', '.venv', 'venv', '__pycache__'}
+
+
+def find_dependency_files(paths: List[str]) -> List[str]:
+    """
+    Expand files, directories and glob patterns into dependencies.md paths.
+
+    Directories are searched recursively and glob patterns are expanded by
+    the same walk, so both reach hidden directories such as .ipe and both
+    skip SKIP_DIRS.
+    """
+    files = []
+    
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+                if 'dependencies.md' in filenames:
+                    files.append(os.path.join(dirpath, 'dependencies.md'))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            files.extend(glob_files(path))
+    
+    return sorted(set(files))
+
+
+def glob_files(pattern: str) -> List[str]:
+    """
+    Expand a glob pattern by walking from its fixed leading directories.
+
+    Unlike glob.glob, wildcards and ** match hidden names (mono/**/
+    dependencies.md finds mono/api/.ipe/dependencies.md), and SKIP_DIRS
+    are pruned as for directory arguments.
+    """
+    parts = pattern.replace(os.sep, '/').split('/')
+    fixed = []
+    for part in parts[:-1]:
+        if glob.has_magic(part):
+            break
+        fixed.append(part)
+    base = '/'.join(fixed) or ('/' if fixed else '.')
+    rest = parts[len(fixed):]
+    # Without **, nothing deeper than the pattern can match
+    max_depth = None if '**' in rest else len(rest) - 1
+    
+    matches = []
+    for dirpath, dirnames, filenames in os.walk(base):
+        relative = os.path.relpath(dirpath, base)
+        segments = [] if relative == '.' else relative.split(os.sep)
+        if max_depth is not None and len(segments) >= max_depth:
+            dirnames[:] = []
+        else:
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in filenames:
+            if match_segments(segments + [name], rest):
+                matches.append(os.path.normpath(os.path.join(dirpath, name)))
+    return sorted(matches)
+
+
+def match_segments(path: List[str], pattern: List[str]) -> bool:
+    """Match path components against pattern components, ** spanning any number"""
+    if not pattern:
+        return not path
+    if pattern[0] == '**':
+        return any(match_segments(path[i:], pattern[1:]) for i in range(len(path) + 1))
+    return bool(path) and fnmatch.fnmatchcase(path[0], pattern[0]) and match_segments(path[1:], pattern[1:])
+
+
+def project_root(root: Optional[str] = None) -> str:
+    """
+    The directory project names are taken relative to.
+
+    root if given, else the git toplevel of the current directory, else
+    the current directory. It does not depend on the paths being checked,
+    so a project has the same name however the check is invoked.
+    """
+    if root is not None:
+        return root
+    try:
+        return git_output(['rev-parse', '--show-toplevel'], '.').decode('utf-8').strip()
+    except RuntimeError:
+        return '.'
+
+
+def project_name(filepath: str, root: str) -> str:
+    """
+    Name the project a dependencies file belongs to.
+
+    The file's directory relative to root, cut at the first hidden
+    directory: services/api/.ipe/design/dependencies.md -> services/api.
+    A file directly under root is named after root itself. Raises
+    ValueError for a file outside root.
+    """
+    # realpath on both sides: git reports the toplevel with symlinks resolved
+    relative = os.path.relpath(os.path.dirname(os.path.realpath(filepath)), os.path.realpath(root))
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        raise ValueError(f"{filepath} is outside the project root {root}")
+    parts = []
+    for part in relative.replace(os.sep, '/').split('/'):
+        if part.startswith('.'):
+            break
+        parts.append(part)
+    return '/'.join(parts) or os.path.basename(os.path.realpath(root))
+
+
+def parse_project_file(filepath: str, cache_dir: Optional[str] = None) -> Tuple[str, Optional[str], List[str], bytes, bytes]:
+    """
+    Parse one project's file for the process pool.
+
+    Returns (filepath, error, names, offsets, targets) with the CSR arrays
+    as bytes, which pickle far more cheaply than per-edge tuples. With a
+    cache_dir, unchanged files are loaded from the GraphCache instead.
+    """
+    try:
+        if cache_dir is None:
+            graph = read_dependency_graph(filepath, qualified=True)[0]
+        else:
+            cache = GraphCache(cache_dir, kind='project')
+            digest = file_sha256(filepath)
+            cached = cache.load(digest)
+            if cached is not None:
+                graph = cached[0]
+            else:
+                graph, parsed_digest = read_dependency_graph(filepath, qualified=True)
+                if parsed_digest == digest:
+                    cache.save(digest, graph)
+    except Exception as e:
+        return filepath, str(e), [], b'', b''
+    return filepath, None, graph.names, graph.offsets.tobytes(), graph.targets.tobytes()
+
+
+def merge_projects(files: List[str], root: str, jobs: Optional[int] = None,
+                   cache: Optional[GraphCache] = None) -> Tuple[DependencyGraph, List[str]]:
+    """
+    Parse every file in a process pool and merge them into one graph.
+
+    Task IDs are namespaced per project: TASK-001 in services/api becomes
+    services/api:TASK-001, and qualified references are kept as written,
+    which is how edges cross projects. Returns (graph, errors).
+    """
+    projects = {filepath: project_name(filepath, root) for filepath in files}
     graph = DependencyGraph()
+    errors = []
+    
+    parse = partial(parse_project_file, cache_dir=cache.directory if cache else None)
+    if jobs == 1 or len(files) == 1:
+        results = map(parse, files)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = executor.map(parse, files, chunksize=max(1, len(files) // 64))
+    
+    try:
+        for filepath, error, names, offset_bytes, target_bytes in results:
+            if error:
+                errors.append(f"{filepath}: {error}")
+                continue
+            
+            project = projects[filepath]
+            local = [graph.intern(name if ':' in name else f"{project}:{name}") for name in names]
+            offsets = array('q')
+            offsets.frombytes(offset_bytes)
+            targets = array('i')
+            targets.frombytes(target_bytes)
+            
+            rows = graph._thaw()
+            for node, global_node in enumerate(local):
+                start, end = offsets[node], offsets[node + 1]
+                if start != end:
+                    rows[global_node].extend([local[target] for target in targets[start:end]])
+    finally:
+        if executor:
+            executor.shutdown()
+    
+    graph.freeze()
+    return graph, errors
+
+
+def task_project(task: str) -> str:
+    """The project part of a namespaced task ID"""
+    return task.rpartition(':')[0]
+
+
+# Story points per complexity rating (low end of the Stage 5 complexity scale)
+COMPLEXITY_POINTS = {
+    'Simple': 1,
+    'Medium': 3,
+    'Complex': 8,
+    'Very Complex': 21,
+}
+
+# Weight for tasks with no (or an unrecognized) complexity rating
+DEFAULT_POINTS = COMPLEXITY_POINTS['Medium']
+
+TASK_HEADER_PATTERN = re.compile(r'^###\s+(TASK-\d+):')
+COMPLEXITY_PATTERN = re.compile(r'^\*\*Complexity:\*\*\s*(.+?)\s*$')
+
+
+def parse_task_points(filepath: str) -> Dict[str, Optional[int]]:
+    """
+    Read tasks.md and return {task_id: story points} from Complexity fields.
+
+    Every task header is included; tasks without a recognized rating map
+    to None.
+    """
+    points: Dict[str, Optional[int]] = {}
+    current_task = None
     
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+            for line in f:
+                header = TASK_HEADER_PATTERN.match(line)
+                if header:
+                    current_task = header.group(1)
+                    points[current_task] = None
+                    continue
+                if current_task and line.startswith('**Complexity:'):
+                    complexity = COMPLEXITY_PATTERN.match(line)
+                    if complexity and complexity.group(1) in COMPLEXITY_POINTS:
+                        points[current_task] = COMPLEXITY_POINTS[complexity.group(1)]
     except FileNotFoundError:
         print(f"❌ File not found: {filepath}", file=sys.stderr)
         sys.exit(2)
@@ -78,91 +1291,793 @@ def parse_dependencies_md(filepath: str) -> DependencyGraph:
         print(f"❌ Error reading file: {e}", file=sys.stderr)
         sys.exit(2)
     
-    # Parse dependency matrix if it exists
-    # Format: | TASK-XXX | TASK-YYY, TASK-ZZZ | ... |
-    matrix_pattern = r'\|\s*(TASK-\d+)\s*\|\s*([^|]*)\s*\|'
+    return points
+
+
+class Schedule:
+    """
+    Parallel execution plan for a dependency DAG.
+
+    waves[k] lists the tasks whose longest dependency chain has k links,
+    so every task in a wave can run once the earlier waves are done. The
+    critical path is the chain with the most story points; no number of
+    workers can finish sooner. makespan is a simulated list schedule for
+    a fixed worker count, always starting the ready task with the longest
+    remaining path (critical-path-first).
+    """
     
-    for match in re.finditer(matrix_pattern, content):
-        task = match.group(1).strip()
-        deps_str = match.group(2).strip()
+    def __init__(self, graph: DependencyGraph, points: Dict[str, Optional[int]]):
+        graph.freeze()
+        self.graph = graph
+        n = graph.task_count
+        names = graph.names
+        offsets, targets = graph.offsets, graph.targets
+        self.weight = array('i', [points.get(name) or DEFAULT_POINTS for name in names])
+        self.unrated = sum(1 for name in names if points.get(name) is None)
         
-        if deps_str and deps_str.lower() not in ['none', '-', '']:
-            # Parse comma-separated dependencies
-            deps = [d.strip() for d in deps_str.split(',')]
-            for dep in deps:
-                # Extract TASK-XXX from dep (may have extra text)
-                dep_match = re.search(r'TASK-\d+', dep)
-                if dep_match:
-                    dep_task = dep_match.group(0)
-                    graph.add_edge(task, dep_task)
-    
-    # Also parse from dependency graph section
-    # Format: TASK-XXX → TASK-YYY or TASK-XXX depends on TASK-YYY
-    arrow_pattern = r'(TASK-\d+)\s*→\s*(TASK-\d+)'
-    depends_pattern = r'(TASK-\d+)\s+depends\s+on\s+([TASK-\d+,\s]+)'
-    
-    for match in re.finditer(arrow_pattern, content):
-        from_task = match.group(1)
-        to_task = match.group(2)
-        graph.add_edge(from_task, to_task)
-    
-    for match in re.finditer(depends_pattern, content):
-        from_task = match.group(1)
-        deps_str = match.group(2)
-        deps = [d.strip() for d in deps_str.split(',')]
-        for dep in deps:
-            dep_match = re.search(r'TASK-\d+', dep)
-            if dep_match:
-                graph.add_edge(from_task, dep_match.group(0))
+        # Tarjan emits components dependencies-first; in a DAG they are single tasks
+        self.order = [node for (node,) in graph.strongly_connected_components()]
+        
+        level = array('i', bytes(4 * n))
+        finish = array('q', bytes(8 * n))
+        previous = array('i', [-1]) * n
+        for node in self.order:
+            best_level, best_finish, best_dep = -1, 0, -1
+            for dep in targets[offsets[node]:offsets[node + 1]]:
+                if level[dep] > best_level:
+                    best_level = level[dep]
+                if finish[dep] > best_finish:
+                    best_finish, best_dep = finish[dep], dep
+            level[node] = best_level + 1
+            finish[node] = best_finish + self.weight[node]
+            previous[node] = best_dep
+        
+        self.waves: List[List[int]] = [[] for _ in range(max(level, default=-1) + 1)]
+        for node in self.order:
+            self.waves[level[node]].append(node)
+        
+        self.critical_path: List[int] = []
+        if n:
+            node = max(range(n), key=finish.__getitem__)
+            while node >= 0:
+                self.critical_path.append(node)
+                node = previous[node]
+            self.critical_path.reverse()
+        self.critical_points = finish[self.critical_path[-1]] if self.critical_path else 0
+        self.total_points = sum(self.weight)
+        
+        # Longest remaining path from each task to the end of the plan
+        self.dependents = transpose_csr(n, offsets, targets)
+        dep_offsets, dep_targets = self.dependents
+        self.remaining = array('q', bytes(8 * n))
+        for node in reversed(self.order):
+            longest = 0
+            for dependent in dep_targets[dep_offsets[node]:dep_offsets[node + 1]]:
+                if self.remaining[dependent] > longest:
+                    longest = self.remaining[dependent]
+            self.remaining[node] = longest + self.weight[node]
     
+    @property
+    def width(self) -> int:
+        """Largest number of tasks that can run at once"""
+        return max((len(wave) for wave in self.waves), default=0)
+    
+    def makespan(self, workers: int) -> int:
+        """Simulate the plan on a pool of workers and return its finish time"""
+        graph = self.graph
+        n = graph.task_count
+        offsets = graph.offsets
+        dep_offsets, dep_targets = self.dependents
+        waiting = [offsets[node + 1] - offsets[node] for node in range(n)]
+        
+        ready = [(-self.remaining[node], node) for node in range(n) if not waiting[node]]
+        heapq.heapify(ready)
+        running: List[Tuple[int, int]] = []
+        now = 0
+        
+        while ready or running:
+            while ready and len(running) < workers:
+                _, node = heapq.heappop(ready)
+                heapq.heappush(running, (now + self.weight[node], node))
+            
+            now, node = heapq.heappop(running)
+            finished = [node]
+            while running and running[0][0] == now:
+                finished.append(heapq.heappop(running)[1])
+            
+            for node in finished:
+                for dependent in dep_targets[dep_offsets[node]:dep_offsets[node + 1]]:
+                    waiting[dependent] -= 1
+                    if not waiting[dependent]:
+                        heapq.heappush(ready, (-self.remaining[dependent], dependent))
+        
+        return now
+
+
+# Transitive reduction
+
+# Memory for one block of reachability bitsets in transitive_reduction
+REDUCTION_BLOCK_BYTES = 32 << 20
+
+
+def transitive_reduction(graph: DependencyGraph) -> List[Tuple[int, int, int]]:
+    """
+    Find every edge of a DAG that is implied by a longer path.
+
+    Returns (task, dependency, via) triples: task → dependency is
+    redundant because task's direct dependency via also reaches it.
+    Tasks are visited in topological order, dependencies first, keeping
+    a bitset of everything each one reaches: an edge is redundant iff
+    its dependency is in the bitset of one of the task's other
+    dependencies. The bitsets only cover one block of dependencies at a
+    time, sized to REDUCTION_BLOCK_BYTES, so memory stays bounded on
+    dense graphs at the cost of one pass over the edges per block.
+    """
+    _, offsets, targets, member_offsets, members = graph.condensation()
+    n = len(member_offsets) - 1
+    width = max(64, REDUCTION_BLOCK_BYTES * 8 // max(n, 1))
+    redundant = []
+    
+    for base in range(0, n, width):
+        top = min(base + width, n)
+        # below[c]: the block's components that c strictly reaches, as bits
+        # from base. Components are numbered dependencies-first, so those
+        # under base reach nothing in the block.
+        below = [0] * n
+        for c in range(base, n):
+            start, end = bisect_left(targets, base, offsets[c], offsets[c + 1]), offsets[c + 1]
+            if start == end:
+                continue
+            union = direct = 0
+            for d in targets[start:end]:
+                union |= below[d]
+                if d < top:
+                    direct |= 1 << (d - base)
+            below[c] = union | direct
+            
+            implied = union & direct
+            while implied:
+                bit = implied & -implied
+                implied ^= bit
+                d = base + bit.bit_length() - 1
+                for via in reversed(targets[start:end]):
+                    if via > d and below[via] & bit:
+                        break
+                redundant.append((members[member_offsets[c]], members[member_offsets[d]],
+                                  members[member_offsets[via]]))
+    
+    redundant.sort()
+    return redundant
+
+
+def reduce_matrix_line(line: str, redundant: Dict[str, Set[str]]) -> str:
+    """
+    Drop redundant dependencies from the matrix rows in a table line.
+
+    Cells are found the same way as matrix_row_edges; a dependency cell
+    left empty becomes "None". Lines without changes come back as is.
+    """
+    cells = line.split('|')
+    last = len(cells) - 2
+    changed = False
+    i = 1
+    
+    while i < last:
+        task = cells[i].strip()
+        if 'TASK-' in task and TASK_ID_PATTERN.fullmatch(task):
+            drop = redundant.get(task)
+            if drop:
+                pieces = cells[i + 1].split(',')
+                kept = []
+                for piece in pieces:
+                    match = TASK_ID_PATTERN.search(piece)
+                    if not (match and match.group(0) in drop):
+                        kept.append(piece.strip())
+                if len(kept) < len(pieces):
+                    cells[i + 1] = f" {', '.join(kept) or 'None'} "
+                    changed = True
+            i += 3
+        else:
+            i += 1
+    
+    return '|'.join(cells) if changed else line
+
+
+# Revision diffs
+
+def git_output(args: List[str], cwd: str) -> bytes:
+    """Run git in cwd and return stdout, raising RuntimeError on failure"""
+    try:
+        result = subprocess.run(['git', *args], cwd=cwd, capture_output=True)
+    except OSError as e:
+        raise RuntimeError(f"cannot run git: {e}")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def revision_graph(filepath: str, rev: Optional[str], cache: Optional[GraphCache] = None) -> DependencyGraph:
+    """
+    Parse filepath as of git revision rev (the working tree if None).
+
+    A file that does not exist at rev is an empty graph, so a file added
+    since rev reports every edge as added. Goes through the cache by
+    content hash, so a revision whose file was already checked
+    (typically the base branch) is not parsed again.
+    """
+    if rev is None:
+        data = open(filepath, 'rb').read()
+    else:
+        cwd = os.path.dirname(os.path.abspath(filepath))
+        path = f"./{os.path.basename(filepath)}"
+        # ls-tree fails on a bad revision but lists nothing for a missing path
+        if not git_output(['ls-tree', '--name-only', rev, '--', path], cwd).strip():
+            return DependencyGraph()
+        data = git_output(['show', f"{rev}:{path}"], cwd)
+    
+    digest = hashlib.sha256(data).hexdigest()
+    cached = cache.load(digest) if cache else None
+    if cached is not None:
+        return cached[0]
+    
+    graph = build_dependency_graph(data.decode('utf-8').splitlines(keepends=True))
+    if cache:
+        cache.save(digest, graph)
     return graph
 
 
+def diff_candidate_edges(diff: str) -> Tuple[Set[Tuple[str, str]], Set[Tuple[str, str]]]:
+    """
+    Parse the hunks of a unified diff into (removed, added) candidate edges.
+
+    Each side of a hunk (context plus removed, context plus added lines)
+    is parsed on its own, so one line of context is enough to carry a
+    dangling arrow into a changed line. Context edges land on both sides;
+    callers confirm candidates against the two graphs.
+    """
+    removed: Set[Tuple[str, str]] = set()
+    added: Set[Tuple[str, str]] = set()
+    old_lines: List[str] = []
+    new_lines: List[str] = []
+    
+    def flush():
+        for lines, edges in ((old_lines, removed), (new_lines, added)):
+            for task, deps in iter_dependency_edges(lines):
+                edges.update((task, dep) for dep in deps)
+            lines.clear()
+    
+    in_hunk = False
+    for line in diff.splitlines():
+        if line.startswith('@@'):
+            flush()
+            in_hunk = True
+        elif not in_hunk or line.startswith('\\'):
+            continue
+        elif line[:1] == ' ':
+            old_lines.append(line[1:])
+            new_lines.append(line[1:])
+        elif line[:1] == '-':
+            old_lines.append(line[1:])
+        elif line[:1] == '+':
+            new_lines.append(line[1:])
+        else:
+            in_hunk = False
+    flush()
+    
+    return removed, added
+
+
+def graph_has_edge(graph: DependencyGraph, task: str, dep: str) -> bool:
+    """Does task depend directly on dep in graph?"""
+    ids = graph.ids
+    return task in ids and dep in ids and graph.has_edge(ids[task], ids[dep])
+
+
+def graph_edges(graph: DependencyGraph) -> List[Tuple[str, str]]:
+    """Every (task, dep) edge of graph, sorted"""
+    names = graph.names
+    return sorted((names[node], names[dep]) for node in range(graph.task_count)
+                  for dep in graph.dependencies(node))
+
+
+def edge_delta(filepath: str, base: DependencyGraph, head: DependencyGraph,
+               base_rev: str, head_rev: Optional[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Return the (removed, added) edges of filepath between two revisions.
+
+    Candidates come from the changed lines of 'git diff', so the cost
+    follows the size of the change; each is confirmed against the graphs,
+    which drops edges that moved lines or are still declared elsewhere.
+    If either side has no edges (say the file is new, or untracked),
+    the other side's edges are the whole delta.
+    """
+    if not base.edge_count or not head.edge_count:
+        return graph_edges(base), graph_edges(head)
+    
+    revs = [base_rev] if head_rev is None else [base_rev, head_rev]
+    diff = git_output(['diff', '-U1', '--no-color', '--no-ext-diff', *revs, '--', os.path.basename(filepath)],
+                      os.path.dirname(os.path.abspath(filepath)))
+    old_edges, new_edges = diff_candidate_edges(diff.decode('utf-8', 'replace'))
+    
+    removed = sorted(e for e in old_edges if graph_has_edge(base, *e) and not graph_has_edge(head, *e))
+    added = sorted(e for e in new_edges if graph_has_edge(head, *e) and not graph_has_edge(base, *e))
+    return removed, added
+
+
+def cycles_through(graph: DependencyGraph, edges: List[Tuple[str, str]]) -> Tuple[List[List[str]], int]:
+    """
+    Find the cycles that run through any of edges.
+
+    Only the tasks reachable from the edges' dependencies are searched:
+    a cycle through task → dep must come back to task from dep. Returns
+    one witness per cyclic component, starting with the edge itself,
+    and the number of tasks searched.
+    """
+    ids, names = graph.ids, graph.names
+    pairs = [(ids[task], ids[dep]) for task, dep in edges]
+    components = graph.strongly_connected_components(roots=[dep for _, dep in pairs])
+    component_of = {node: c for c, component in enumerate(components) for node in component}
+    
+    cycles = []
+    reported: Set[int] = set()
+    for task, dep in pairs:
+        c = component_of.get(task)
+        if c is None or c != component_of[dep] or c in reported:
+            continue
+        if task != dep and len(components[c]) == 1:
+            continue
+        reported.add(c)
+        path = graph.shortest_path(dep, task, set(components[c]))
+        cycles.append([names[task]] + [names[node] for node in path])
+    
+    cycles.sort()
+    return cycles, len(component_of)
+
+
+def still_cyclic(graph: DependencyGraph, cycle: List[str]) -> bool:
+    """Do all tasks of cycle still share one strongly connected component?"""
+    if not all(task in graph.ids for task in cycle):
+        return False
+    nodes = [graph.ids[task] for task in cycle]
+    component = graph.strongly_connected_components(roots=nodes[:1])[-1]
+    return set(nodes) <= set(component) and (len(component) > 1 or graph.has_edge(nodes[0], nodes[0]))
+
+
 def format_cycle(cycle: List[str]) -> str:
     """Format a cycle for display"""
     return ' → '.join(cycle)
 
 
-def main():
-    if len(sys.argv) != 2:
-        print(__doc__)
-        sys.exit(2)
+def run_check(args) -> int:
+    """Check a dependencies file for cycles and print the report"""
+    if len(args.files) > 1 or not is_single_file(args.files[0]):
+        return run_check_projects(args)
     
-    filepath = sys.argv[1]
+    filepath = args.files[0]
     
     print("🔍 Checking for circular dependencies...")
     print()
     
-    graph = parse_dependencies_md(filepath)
+    graph, cycles = load_dependencies(filepath, cache_from_args(args))
     
     if not graph.all_tasks:
         print("⚠️  No task dependencies found in file")
         print("   This may be normal if dependencies haven't been defined yet")
-        sys.exit(0)
+        return 0
     
     print(f"Found {len(graph.all_tasks)} unique tasks")
     print(f"Analyzing dependency graph...")
     print()
     
+    if cycles:
+        print_cycles(cycles)
+        return 1
+    else:
+        print("✅ No circular dependencies detected")
+        print()
+        print("Dependency graph is valid (forms a DAG)")
+        if args.index:
+            build_index(filepath, graph)
+            print(f"Reachability index written to {index_path(filepath)}")
+        return 0
+
+
+def cache_from_args(args) -> Optional[GraphCache]:
+    """The parse cache, unless --no-cache was given"""
+    return None if args.no_cache else GraphCache()
+
+
+def is_single_file(path: str) -> bool:
+    """A plain file path (or a missing one that is not a glob pattern)"""
+    if os.path.isdir(path):
+        return False
+    return os.path.isfile(path) or not glob.has_magic(path)
+
+
+def print_cycles(cycles: List[List[str]], merged: bool = False):
+    """Print the cycle report shared by single-file and project checks"""
+    print(f"❌ Found {len(cycles)} circular dependency cycle(s):")
+    print()
+    
+    for i, cycle in enumerate(cycles, 1):
+        projects = sorted({task_project(task) for task in cycle}) if merged else []
+        if len(projects) > 1:
+            print(f"  Cycle {i} (crosses projects: {', '.join(projects)}):")
+        else:
+            print(f"  Cycle {i}:")
+        print(f"    {format_cycle(cycle)}")
+        print()
+    
+    print("Circular dependencies must be resolved before implementation.")
+    print("Review the dependency graph and break the cycles.")
+
+
+def run_check_projects(args) -> int:
+    """Merge every project's dependencies file and check the combined graph"""
+    files = find_dependency_files(args.files)
+    root = project_root(args.root)
+    
+    print("🔍 Checking for circular dependencies across projects...")
+    print()
+    
+    if not files:
+        print(f"❌ No dependencies.md files found in: {' '.join(args.files)}", file=sys.stderr)
+        return 2
+    try:
+        projects = {project_name(filepath, root) for filepath in files}
+    except ValueError as e:
+        print(f"❌ {e}; pass --root", file=sys.stderr)
+        return 2
+    if args.index:
+        print("⚠️  --index applies to a single file; skipping", file=sys.stderr)
+    
+    graph, errors = merge_projects(files, root, args.jobs, cache_from_args(args))
+    
+    for error in errors:
+        print(f"⚠️  Error reading {error}", file=sys.stderr)
+    
+    unknown = sorted({task_project(task) for task in graph.names} - projects)
+    if unknown:
+        print(f"❌ References to unknown projects: {', '.join(unknown)}", file=sys.stderr)
+        print(f"   Projects found under {root}: {', '.join(sorted(projects))}", file=sys.stderr)
+        return 2
+    
+    print(f"Found {len(files)} dependency file(s) in {len(projects)} project(s)")
+    print(f"Found {graph.task_count} unique tasks")
+    print(f"Analyzing merged dependency graph...")
+    print()
+    
     cycles = graph.find_cycles()
     
     if cycles:
-        print(f"❌ Found {len(cycles)} circular dependency cycle(s):")
-        print()
+        crossing = sum(1 for cycle in cycles if len({task_project(task) for task in cycle}) > 1)
+        print_cycles(cycles, merged=True)
+        print(f"{crossing} of {len(cycles)} cycle(s) cross project boundaries.")
+        return 1
+    
+    print("✅ No circular dependencies detected")
+    print()
+    print("Merged dependency graph is valid (forms a DAG)")
+    return 2 if errors else 0
+
+
+def run_query(args) -> int:
+    """Answer reachability questions from the persisted index"""
+    if not os.path.isfile(args.file):
+        print(f"❌ File not found: {args.file}", file=sys.stderr)
+        return 2
+    
+    index = load_index(args.file)
+    
+    tasks = args.depends or [args.blocked_by or args.blockers]
+    for task in tasks:
+        if task not in index.ids:
+            print(f"❌ Unknown task: {task}", file=sys.stderr)
+            return 2
+    
+    if args.depends:
+        task, dependency = args.depends
+        if index.depends_on(task, dependency):
+            print(f"{task} depends on {dependency}")
+            return 0
+        print(f"{task} does not depend on {dependency}")
+        return 1
+    
+    if args.blocked_by:
+        results = index.dependents_of(args.blocked_by)
+    else:
+        results = index.dependencies_of(args.blockers)
+    for task in sorted(results):
+        print(task)
+    return 0
+
+
+def run_watch(args) -> int:
+    """
+    Answer dependency insertions read from stdin, one line at a time.
+
+    Each line uses the dependencies.md syntax (a matrix row, an arrow, or
+    "depends on"). Every edge on it is answered with "OK <edge>", or
+    "CYCLE <cycle>" if it was rejected; unparseable lines get "ERROR".
+    """
+    graph = load_dependencies(args.file, cache_from_args(args))[0] if args.file else DependencyGraph()
+    
+    try:
+        graph.enable_incremental()
+    except CycleError as e:
+        print(f"❌ Cannot watch: {e}", file=sys.stderr)
+        return 1
+    
+    for line in sys.stdin:
+        edges = list(iter_dependency_edges([line]))
+        if not edges:
+            if line.strip():
+                print(f"ERROR no dependency found: {line.strip()}", flush=True)
+            continue
         
-        for i, cycle in enumerate(cycles, 1):
-            print(f"  Cycle {i}:")
-            print(f"    {format_cycle(cycle)}")
-            print()
+        for task, deps in edges:
+            for dep in deps:
+                try:
+                    graph.add_edge(task, dep)
+                    print(f"OK {task} → {dep}", flush=True)
+                except CycleError as e:
+                    print(f"CYCLE {format_cycle(e.cycle)}", flush=True)
+    
+    return 0
+
+
+def run_schedule(args) -> int:
+    """Report waves, the weighted critical path and the makespan per worker count"""
+    graph, cycles = load_dependencies(args.file, cache_from_args(args))
+    
+    if cycles:
+        print(f"❌ Cannot schedule: {len(cycles)} circular dependency cycle(s)")
+        print("   Run 'check-cycles.py check' for details")
+        return 1
+    
+    tasks_file = args.tasks
+    if tasks_file is None:
+        candidate = os.path.join(os.path.dirname(args.file), 'tasks.md')
+        if os.path.isfile(candidate):
+            tasks_file = candidate
+    points = parse_task_points(tasks_file) if tasks_file else {}
+    
+    # Tasks with no dependency edges still need a worker
+    for task in points:
+        graph.intern(task)
+    
+    schedule = Schedule(graph, points)
+    names = graph.names
+    
+    print("═══════════════════════════════════════════════════════════════")
+    print("  Parallel Schedule")
+    print("═══════════════════════════════════════════════════════════════")
+    print()
+    print(f"Tasks:          {graph.task_count:,}")
+    print(f"Total work:     {schedule.total_points:,} points")
+    if schedule.unrated:
+        print(f"                ({schedule.unrated:,} task(s) without a Complexity rating, "
+              f"counted as {DEFAULT_POINTS} points each)")
+    print(f"Waves:          {len(schedule.waves):,}")
+    print(f"Widest wave:    {schedule.width:,} tasks")
+    print()
+    
+    if args.verbose:
+        for i, wave in enumerate(schedule.waves, 1):
+            print(f"  Wave {i} ({len(wave)} tasks): {', '.join(sorted(names[node] for node in wave))}")
+        print()
+    
+    print(f"Critical path:  {schedule.critical_points:,} points, {len(schedule.critical_path):,} tasks")
+    path = [names[node] for node in schedule.critical_path]
+    if len(path) > 12 and not args.verbose:
+        path = path[:6] + [f"… {len(path) - 12:,} more …"] + path[-6:]
+    print(f"  {format_cycle(path)}")
+    print()
+    
+    if schedule.critical_points:
+        parallelism = schedule.total_points / schedule.critical_points
+        print(f"Average parallelism: {parallelism:.1f} (total work / critical path)")
+        print()
+    
+    print("Makespan by worker count:")
+    for workers in args.workers:
+        makespan = schedule.makespan(workers)
+        utilization = schedule.total_points / (makespan * workers) * 100 if makespan else 0
+        print(f"  {workers:>4} worker(s): {makespan:,} points ({utilization:.0f}% busy)")
+    print()
+    
+    return 0
+
+
+def run_diff(args) -> int:
+    """Report edge changes between two revisions and the cycles they open or close"""
+    cache = cache_from_args(args)
+    head_label = args.head or "working tree"
+    
+    try:
+        base = revision_graph(args.file, args.base, cache)
+        head = revision_graph(args.file, args.head, cache)
+        removed, added = edge_delta(args.file, base, head, args.base, args.head)
+    except (OSError, UnicodeDecodeError, RuntimeError) as e:
+        print(f"❌ Error comparing revisions: {e}", file=sys.stderr)
+        return 2
+    
+    print(f"🔍 Comparing {args.file}: {args.base} → {head_label}")
+    print()
+    
+    for label, edges in (("removed", removed), ("added", added)):
+        print(f"Edges {label}: {len(edges)}")
+        for task, dep in edges:
+            print(f"  {task} → {dep}")
+    print()
+    
+    new_cycles, searched = cycles_through(head, added) if added else ([], 0)
+    old_cycles = cycles_through(base, removed)[0] if removed else []
+    resolved = [cycle for cycle in old_cycles if not still_cyclic(head, cycle)]
+    
+    print(f"Re-checked {searched:,} of {head.task_count:,} tasks reachable from the added edges")
+    print()
+    
+    for cycle in resolved:
+        print(f"✅ Resolved: {format_cycle(cycle)}")
+    if resolved:
+        print()
+    
+    if new_cycles:
+        print(f"❌ {len(new_cycles)} circular dependency cycle(s) introduced:")
+        print()
+        for i, cycle in enumerate(new_cycles, 1):
+            print(f"  Cycle {i}: {format_cycle(cycle)}")
+        print()
+        print("The first edge of each cycle was added in this change.")
+        return 1
+    
+    print("✅ No new circular dependencies")
+    return 0
+
+
+def run_reduce(args) -> int:
+    """Report the redundant edges of a DAG, or print the reduced matrix"""
+    graph, cycles = load_dependencies(args.file, cache_from_args(args))
+    
+    if cycles:
+        print(f"❌ Cannot reduce: {len(cycles)} circular dependency cycle(s)", file=sys.stderr)
+        print("   Run 'check-cycles.py check' for details", file=sys.stderr)
+        return 1
+    
+    redundant = transitive_reduction(graph)
+    names = graph.names
+    edges = graph.edge_count
+    share = len(redundant) / edges * 100 if edges else 0
+    
+    if args.matrix:
+        drop: Dict[str, Set[str]] = {}
+        for node, dep, _ in redundant:
+            drop.setdefault(names[node], set()).add(names[dep])
+        with open(args.file, 'r', encoding='utf-8') as f:
+            lines = [reduce_matrix_line(line, drop) if '|' in line and 'TASK-' in line else line for line in f]
+        sys.stdout.writelines(lines)
         
-        print("Circular dependencies must be resolved before implementation.")
-        print("Review the dependency graph and break the cycles.")
-        sys.exit(1)
-    else:
-        print("✅ No circular dependencies detected")
+        # Edges declared outside a matrix row (arrows, "depends on") are left alone
+        reduced = build_dependency_graph(lines)
+        remaining = sum(graph_has_edge(reduced, names[node], names[dep]) for node, dep, _ in redundant)
+        print(f"Removed {len(redundant) - remaining:,} redundant edge(s) of {edges:,}", file=sys.stderr)
+        if remaining:
+            print(f"⚠️  {remaining:,} redundant edge(s) are declared outside the matrix and were kept",
+                  file=sys.stderr)
+        return 0
+    
+    print("═══════════════════════════════════════════════════════════════")
+    print("  Transitive Reduction")
+    print("═══════════════════════════════════════════════════════════════")
+    print()
+    print(f"Tasks:            {graph.task_count:,}")
+    print(f"Edges:            {edges:,}")
+    print(f"Redundant edges:  {len(redundant):,} ({share:.1f}%)")
+    print(f"Minimal edge set: {edges - len(redundant):,}")
+    print()
+    
+    if redundant:
+        print("Each edge below is already implied through another dependency:")
+        shown = redundant if args.verbose else redundant[:20]
+        for node, dep, via in shown:
+            print(f"  {names[node]} → {names[dep]}  (via {names[via]})")
+        if len(shown) < len(redundant):
+            print(f"  … {len(redundant) - len(shown):,} more (--verbose lists all)")
         print()
-        print("Dependency graph is valid (forms a DAG)")
-        sys.exit(0)
+        print("Run with --matrix to print the dependency file with these edges removed.")
+    else:
+        print("✅ The dependency graph is already minimal")
+    print()
+    
+    return 0
+
+
+COMMANDS = {
+    'check': run_check,
+    'watch': run_watch,
+    'query': run_query,
+    'schedule': run_schedule,
+    'diff': run_diff,
+    'reduce': run_reduce,
+}
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts of workers or processes"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Detect circular dependencies in task graph",
+        epilog="With no command, 'check' is assumed.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the parsed-graph cache (~/.cache/ack/check-cycles)")
+    
+    check_parser = subparsers.add_parser("check", parents=[common], help="Check dependencies.md for cycles")
+    check_parser.add_argument("files", nargs="+", metavar="file",
+                              help="dependencies.md, or directories / glob patterns to merge")
+    check_parser.add_argument("--index", action="store_true",
+                              help="Write the reachability index if the graph is a DAG")
+    check_parser.add_argument("--root", metavar="DIR",
+                              help="Directory project names are relative to (default: the git toplevel, "
+                                   "else the current directory)")
+    check_parser.add_argument("--jobs", type=positive_int, default=None,
+                              help="Parser processes when merging projects (default: CPU count)")
+    
+    watch_parser = subparsers.add_parser("watch", parents=[common], help="Check edge insertions from stdin as they arrive")
+    watch_parser.add_argument("file", nargs="?", help="dependencies.md to seed the graph from")
+    
+    query_parser = subparsers.add_parser("query", help="Answer reachability questions from the index")
+    query_parser.add_argument("file", help="Path to dependencies.md")
+    question = query_parser.add_mutually_exclusive_group(required=True)
+    question.add_argument("--depends", nargs=2, metavar=("TASK", "DEPENDENCY"),
+                          help="Does TASK transitively depend on DEPENDENCY? (exit 0 if yes, 1 if no)")
+    question.add_argument("--blocked-by", metavar="TASK",
+                          help="List every task transitively blocked by TASK")
+    question.add_argument("--blockers", metavar="TASK",
+                          help="List every task TASK transitively depends on")
+    
+    schedule_parser = subparsers.add_parser("schedule", parents=[common], help="Plan parallel execution waves and the critical path")
+    schedule_parser.add_argument("file", help="Path to dependencies.md")
+    schedule_parser.add_argument("--tasks", help="tasks.md with Complexity ratings (default: next to the file)")
+    schedule_parser.add_argument("--workers", type=positive_int, nargs="+", default=[1, 2, 4, 8],
+                                 help="Worker counts to simulate (default: 1 2 4 8)")
+    schedule_parser.add_argument("--verbose", action="store_true",
+                                 help="List every wave and the full critical path")
+    
+    diff_parser = subparsers.add_parser("diff", parents=[common], help="Check only the edges changed between two git revisions")
+    diff_parser.add_argument("file", help="Path to dependencies.md")
+    diff_parser.add_argument("base", help="Base revision (e.g. origin/main)")
+    diff_parser.add_argument("head", nargs="?", help="Head revision (default: the working tree)")
+    
+    reduce_parser = subparsers.add_parser("reduce", parents=[common], help="Find dependency edges implied by longer paths")
+    reduce_parser.add_argument("file", help="Path to dependencies.md")
+    reduce_parser.add_argument("--matrix", action="store_true",
+                               help="Print the file with redundant matrix dependencies removed")
+    reduce_parser.add_argument("--verbose", action="store_true",
+                               help="List every redundant edge")
+    
+    argv = sys.argv[1:]
+    if argv and argv[0] not in COMMANDS and argv[0] not in ('-h', '--help'):
+        argv.insert(0, 'check')
+    args = parser.parse_args(argv)
+    
+    if not args.command:
+        print(__doc__)
+        sys.exit(2)
+    
+    sys.exit(COMMANDS[args.command](args))
 
 
 if __name__ == "__main__":
@@ -7,7 +7,53 @@ Ensures CLAUDE.md and its imports stay within recommended limits:
   - Warning: >30,000 tokens (~120,000 chars)
   - Maximum: <50,000 tokens (~200,000 chars)
 
-Usage: python3 check-token-budget.py [claude-md-path]
+Usage: python3 check-token-budget.py [claude-md-path] [--tokenizer auto|bpe|heuristic]
+                                     [--vocab file.tiktoken] [--fast] [--no-cache]
+                                     [--plan-budget target|warning]
+                                     [--heatmap [text|json]] [--duplicates] [--top N]
+                                     [--compile [BUNDLE] | --check-bundle [BUNDLE]]
+       python3 check-token-budget.py --audit DIR [DIR ...] [--jobs N] [--output report.json] [--fast]
+
+@imports are followed recursively (up to 5 levels, as Claude Code does);
+a file imported more than once is counted once.
+
+Tokens are counted with a BPE vocabulary (--vocab or
+$ACK_TOKENIZER_VOCAB in .tiktoken format), otherwise estimated at 4
+characters per token. The offline BPE splits text like tiktoken's
+cl100k pattern, so it gives tiktoken's counts except on rare numeric
+characters (see PRETOKENIZE_PATTERN). tiktoken is an optional dependency
+(pip install tiktoken): --tokenizer bpe without a vocabulary uses it,
+and its encoding is downloaded on first use, so it needs network access
+once. Exact counts are cached by content hash under
+$XDG_CACHE_HOME/ack/token-budget.
+
+--fast estimates from os.stat sizes instead of reading files: files
+unchanged since the last exact run reuse their recorded imports and
+counts, others are estimated with bytes-per-token ratios calibrated per
+extension. A total within 10% of a budget is re-counted exactly.
+
+Over target, the report plans which imports to comment out: the set
+that keeps the most priority within --plan-budget. Annotate import
+lines with <!-- priority: N --> (default 5) or <!-- priority: required -->.
+
+--heatmap breaks the total down by heading section across CLAUDE.md and
+every import, largest first; --heatmap json prints only that, as JSON.
+--duplicates finds paragraphs repeated (exactly or nearly, by MinHash)
+across the loaded context and the tokens each repeat costs.
+
+--compile writes one bundle with every import inlined and a manifest
+(<bundle>.manifest.json) of source paths, SHA-256 hashes and token
+counts; it only rebuilds when a source, the root CLAUDE.md or the
+tokenizer changed, and exits 1 if the bundle exceeds the warning
+budget. --check-bundle just compares the manifest with the sources: it
+exits 0 if the bundle is up to date and 1 if it is stale or missing,
+whatever the bundle's size.
+
+--audit finds every .claude/CLAUDE.md under the given directories,
+analyzes them in a thread pool sharing one import cache (a file imported
+by many projects is tokenized once) and prints one JSON report:
+per-project totals, a summary, over-budget outliers and shared imports.
+It exits 1 if any project is over the warning budget.
 
 Exit codes:
   0 - Within budget
@@ -15,10 +61,17 @@ Exit codes:
   2 - Error reading files
 """
 
+import argparse
+import base64
+import hashlib
+import json
 import sys
 import os
 import re
-from typing import List, Tuple
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 
 # Rough token estimation (GPT-4 style)
@@ -30,75 +83,1364 @@ TARGET_BUDGET = 20000
 WARNING_BUDGET = 30000
 MAX_BUDGET = 50000
 
+# Near-duplicate paragraphs: word shingles, MinHash banded for LSH, and
+# the Jaccard similarity that counts as a duplicate
+MIN_DUPLICATE_WORDS = 12
+SHINGLE_SIZE = 3
+LSH_BANDS = 16
+LSH_ROWS = 4
+DUPLICATE_SIMILARITY = 0.6
+DENSIFY_OFFSET = 1 << 58
+
+# Manifest format written by --compile, and the bundle's default name (next to CLAUDE.md)
+BUNDLE_FORMAT = 1
+DEFAULT_BUNDLE = "CLAUDE.bundle.md"
+
+# Import priority annotation: @path <!-- priority: 8 --> or <!-- priority: required -->
+PRIORITY_PATTERN = re.compile(r'<!--\s*priority:\s*(required|\d+)\s*-->', re.IGNORECASE)
+DEFAULT_PRIORITY = 5
+
+# Largest knapsack table (imports * total priority) solved exactly
+EXACT_SELECTION_LIMIT = 5_000_000
+
+# --fast re-counts exactly when its estimate lands within this fraction of a budget
+ESCALATION_MARGIN = 0.10
+
+# Exact tokens an extension needs before its bytes-per-token ratio is trusted
+MIN_CALIBRATION_TOKENS = 1000
+
+# Claude Code follows @imports at most this many hops from CLAUDE.md
+MAX_IMPORT_DEPTH = 5
+
+# Token counts kept in the cache file; the least recently used go first
+MAX_CACHED_COUNTS = 20000
+
 
 def estimate_tokens(text: str) -> int:
     """Estimate token count from character count"""
     return len(text) // CHARS_PER_TOKEN
 
 
-def find_imports(content: str, base_path: str) -> List[Tuple[str, int]]:
-    """Find all @imports in CLAUDE.md and return (path, token_count)"""
+# Tokenizers
+#
+# A tokenizer has a name (part of every cache key, so counts from
+# different backends or vocabularies never mix) and count(text).
+
+class HeuristicTokenizer:
+    """The CHARS_PER_TOKEN estimate; needs no vocabulary"""
+    name = "heuristic"
+    
+    def count(self, text: str) -> int:
+        return estimate_tokens(text)
+
+
+# cl100k-style pre-tokenization, with the Unicode classes spelled in
+# stdlib re: [^\W\d_] stands for \p{L} and \d for \p{N}. They differ
+# on numeric characters outside \d (superscripts, fractions, Roman
+# numerals: ², ½, Ⅻ), which re treats as letters, and on the \x1c-\x1f
+# separators, which re treats as whitespace. Counts for text with those
+# can differ slightly from tiktoken's; letters in any script and digit
+# runs split the same way.
+PRETOKENIZE_PATTERN = re.compile(
+    r"(?i:'s|'t|'re|'ve|'m|'ll|'d)"
+    r"|(?:[^\r\n\w]|_)?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*"
+    r"|\s*[\r\n]+"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+
+
+class BPETokenizer:
+    """
+    Offline byte-pair encoding over a tiktoken-format vocabulary.
+
+    The vocabulary file has one "<base64 token> <rank>" per line (the
+    .tiktoken format). It is only decoded on the first count, so runs
+    served entirely from the count cache pay for one file hash. Text is
+    split into pre-tokens, and each distinct pre-token is merged once and
+    memoized; prose repeats its words so heavily that most pre-tokens
+    are dictionary hits.
+    """
+    
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._data = f.read()
+        digest = hashlib.sha256(self._data).hexdigest()[:12]
+        self.name = f"bpe:{os.path.basename(path)}:{digest}"
+        self._ranks: Optional[Dict[bytes, int]] = None
+        self._memo: Dict[str, int] = {}
+    
+    @property
+    def ranks(self) -> Dict[bytes, int]:
+        if self._ranks is None:
+            ranks = {}
+            for line in self._data.splitlines():
+                if line:
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+            self._ranks = ranks
+        return self._ranks
+    
+    def _merge(self, piece: bytes) -> int:
+        """Number of tokens piece encodes to: merge the lowest-ranked pair until none is left"""
+        ranks = self.ranks
+        parts = [piece[i:i + 1] for i in range(len(piece))]
+        while len(parts) > 1:
+            best = None
+            best_rank = None
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best, best_rank = i, rank
+            if best is None:
+                break
+            parts[best:best + 2] = [parts[best] + parts[best + 1]]
+        return len(parts)
+    
+    def count(self, text: str) -> int:
+        memo, ranks = self._memo, self.ranks
+        total = 0
+        for piece in PRETOKENIZE_PATTERN.findall(text):
+            n = memo.get(piece)
+            if n is None:
+                encoded = piece.encode('utf-8')
+                n = 1 if encoded in ranks else self._merge(encoded)
+                memo[piece] = n
+            total += n
+        return total
+
+
+class TiktokenTokenizer:
+    """BPE through the tiktoken package, when it is installed"""
+    
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        import tiktoken
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.name = f"tiktoken:{encoding_name}"
+    
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+
+TOKENIZERS = ("auto", "bpe", "heuristic")
+
+
+def get_tokenizer(name: str = "auto", vocab: Optional[str] = None):
+    """
+    Return the tokenizer backend called name.
+
+    "bpe" counts BPE tokens: with the given vocabulary (or $ACK_TOKENIZER_VOCAB)
+    in pure Python, otherwise through the optional tiktoken package, whose
+    get_encoding downloads the encoding on first use. "auto" counts with a
+    configured vocabulary and otherwise falls back to "heuristic", so it
+    never needs tiktoken or the network. Raises ValueError if "bpe" is
+    unavailable.
+    """
+    if name == "heuristic":
+        return HeuristicTokenizer()
+    
+    vocab = vocab or os.environ.get("ACK_TOKENIZER_VOCAB")
+    try:
+        if vocab:
+            return BPETokenizer(vocab)
+        if name == "auto":
+            return HeuristicTokenizer()
+        try:
+            return TiktokenTokenizer()
+        except ImportError:
+            raise ValueError("no vocabulary: pass --vocab or set ACK_TOKENIZER_VOCAB (or install tiktoken)")
+        except Exception as e:
+            raise ValueError(f"tiktoken encoding unavailable: {e}")
+    except (OSError, ValueError) as e:
+        if name == "auto":
+            return HeuristicTokenizer()
+        raise ValueError(f"BPE tokenizer unavailable: {e}")
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory ($XDG_CACHE_HOME/ack/token-budget)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ack', 'token-budget')
+
+
+def load_json_cache(path: str) -> Dict:
+    """Read a JSON cache file; a missing or damaged cache reads as empty"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_json_cache(path: str, data: Dict):
+    """Atomically write a JSON cache file; failures only cost the speedup"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+class TokenCounter:
+    """
+    Count tokens with a tokenizer, caching counts by content hash.
+
+    Counts are stored per (tokenizer, SHA-256 of the text) in one JSON file
+    under default_cache_dir(), so an unchanged file costs one hash on the
+    next run whatever the backend. Every edit leaves a stale entry behind,
+    so the file keeps only the MAX_CACHED_COUNTS most recently used.
+    Cache problems only cost the speedup.
+    """
+    
+    def __init__(self, tokenizer=None, cache_path: Optional[str] = None):
+        self.tokenizer = tokenizer or HeuristicTokenizer()
+        self.cache_path = cache_path
+        self.counts: Dict[str, int] = load_json_cache(cache_path) if cache_path else {}
+        self.dirty = False
+    
+    @classmethod
+    def cached(cls, tokenizer) -> 'TokenCounter':
+        return cls(tokenizer, os.path.join(default_cache_dir(), 'counts.json'))
+    
+    def count(self, text: str) -> int:
+        if not self.cache_path or isinstance(self.tokenizer, HeuristicTokenizer):
+            return self.tokenizer.count(text)
+        key = f"{self.tokenizer.name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+        tokens = self.counts.pop(key, None)
+        if tokens is None:
+            tokens = self.tokenizer.count(text)
+            self.dirty = True
+        # Re-inserted last, so the dict runs from least to most recently used
+        self.counts[key] = tokens
+        return tokens
+    
+    def save(self):
+        """Write new counts back to the cache file, dropping the least recently used"""
+        if self.dirty:
+            excess = len(self.counts) - MAX_CACHED_COUNTS
+            if excess > 0:
+                self.counts = dict(list(self.counts.items())[excess:])
+            save_json_cache(self.cache_path, self.counts)
+            self.dirty = False
+
+
+class StatIndex:
+    """
+    What a stat-only (--fast) run needs to know about each file.
+
+    For every file read exactly it keeps the size, mtime, imports and
+    token count. An unchanged file then costs one os.stat. Estimates for
+    changed files use bytes-per-token ratios calibrated per file extension
+    from those exact counts.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.files: Dict[str, Dict] = load_json_cache(path).get('files', {}) if path else {}
+        self._ratios: Dict[Tuple[str, str], float] = {}
+        self.dirty = False
+    
+    @classmethod
+    def cached(cls) -> 'StatIndex':
+        return cls(os.path.join(default_cache_dir(), 'stat-index.json'))
+    
+    def lookup(self, path: str, st: os.stat_result) -> Optional[Dict]:
+        """The entry for path if the file is unchanged since it was recorded"""
+        entry = self.files.get(path)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry
+        return None
+    
+    def record(self, context_file: 'ContextFile', tokenizer_name: str):
+        self.files[context_file.path] = {
+            'size': context_file.size,
+            'mtime_ns': context_file.mtime_ns,
+            'imports': context_file.imports,
+            'missing': context_file.missing,
+            'tokenizer': tokenizer_name,
+            'tokens': context_file.tokens,
+        }
+        self.dirty = True
+    
+    def bytes_per_token(self, tokenizer_name: str, extension: str) -> float:
+        """Calibrated bytes per token for files with extension (CHARS_PER_TOKEN if unknown)"""
+        key = (tokenizer_name, extension)
+        if key not in self._ratios:
+            size = tokens = 0
+            for path, entry in self.files.items():
+                if entry['tokenizer'] == tokenizer_name and os.path.splitext(path)[1] == extension:
+                    size += entry['size']
+                    tokens += entry['tokens']
+            self._ratios[key] = size / tokens if tokens >= MIN_CALIBRATION_TOKENS else CHARS_PER_TOKEN
+        return self._ratios[key]
+    
+    def save(self):
+        if self.dirty and self.path:
+            save_json_cache(self.path, {'files': self.files})
+            self.dirty = False
+
+
+@dataclass
+class ContextFile:
+    """A file of the loaded context, read once per resolver"""
+    path: str
+    content: str = ""
+    chars: int = 0
+    tokens: int = 0
+    size: int = 0
+    mtime_ns: int = 0
+    estimated: bool = False
+    imports: List[str] = None
+    missing: List[str] = None
+    error: Optional[str] = None
+    
+    def __post_init__(self):
+        if self.imports is None:
+            self.imports = []
+        if self.missing is None:
+            self.missing = []
+
+
+@dataclass
+class ImportTree:
+    """CLAUDE.md and everything it imports, each file counted once"""
+    root: str
+    files: Dict[str, ContextFile]
+    order: List[str] = None
+    importers: Dict[str, List[str]] = None
+    cycles: List[List[str]] = None
+    warnings: List[str] = None
+    
+    def __post_init__(self):
+        if self.order is None:
+            self.order = [self.root]
+        if self.importers is None:
+            self.importers = {}
+        if self.cycles is None:
+            self.cycles = []
+        if self.warnings is None:
+            self.warnings = []
+    
+    @property
+    def core_tokens(self) -> int:
+        return self.files[self.root].tokens
+    
+    @property
+    def imports(self) -> List[Tuple[str, int]]:
+        """(path, tokens) for every imported file, in load order"""
+        return [(path, self.files[path].tokens) for path in self.order[1:]]
+    
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.files[path].tokens for path in self.order)
+    
+    @property
+    def total_chars(self) -> int:
+        return sum(self.files[path].chars for path in self.order)
+    
+    @property
+    def estimated(self) -> List[str]:
+        """Files whose token count is a size-based estimate"""
+        return [path for path in self.order if self.files[path].estimated]
+    
+    def shared(self) -> Dict[str, int]:
+        """Imports reached from more than one file, with their importer count"""
+        return {path: len(set(importers)) for path, importers in self.importers.items()
+                if len(set(importers)) > 1}
+
+
+def import_line_path(line: str, base_path: str) -> Optional[str]:
+    """The path a line imports, resolved against base_path, or None if it is not an import"""
+    if not line.strip().startswith('@'):
+        return None
+    
+    # Remove @ and any trailing <!-- annotation -->
+    import_path = os.path.expanduser(line.strip()[1:].split('<!--')[0].strip())
+    
+    # Resolve relative to the importing file
+    if not import_path.startswith('/'):
+        import_path = os.path.normpath(os.path.join(base_path, import_path))
+    return import_path
+
+
+def parse_import_lines(content: str, base_path: str) -> List[Tuple[str, str]]:
+    """Return (path resolved against base_path, line) for each line starting with @"""
     imports = []
     
-    # Find all lines starting with @
     for line in content.split('\n'):
-        if line.strip().startswith('@'):
-            import_path = line.strip()[1:]  # Remove @
-            
-            # Resolve relative to base_path
-            if not import_path.startswith('/'):
-                import_path = os.path.join(base_path, import_path)
-            
-            # Check if file exists
-            if os.path.isfile(import_path):
-                try:
-                    with open(import_path, 'r', encoding='utf-8') as f:
-                        import_content = f.read()
-                    
-                    tokens = estimate_tokens(import_content)
-                    imports.append((import_path, tokens))
-                except Exception as e:
-                    print(f"⚠️  Error reading import {import_path}: {e}", file=sys.stderr)
-            else:
-                print(f"⚠️  Import file not found: {import_path}", file=sys.stderr)
+        import_path = import_line_path(line, base_path)
+        if import_path:
+            imports.append((import_path, line.strip()))
     
     return imports
 
 
+def parse_imports(content: str, base_path: str) -> List[str]:
+    """Return the import paths (lines starting with @) resolved against base_path"""
+    return [path for path, _ in parse_import_lines(content, base_path)]
+
+
+def read_context_file(path: str, counter: Optional[TokenCounter] = None) -> ContextFile:
+    """Read one context file, count its tokens and resolve its imports to real paths"""
+    context_file = ContextFile(path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            st = os.fstat(f.fileno())
+            context_file.content = f.read()
+    except Exception as e:
+        context_file.error = str(e)
+        return context_file
+    
+    context_file.size, context_file.mtime_ns = st.st_size, st.st_mtime_ns
+    context_file.chars = len(context_file.content)
+    context_file.tokens = counter.count(context_file.content) if counter else estimate_tokens(context_file.content)
+    resolve_imports(context_file, context_file.content)
+    return context_file
+
+
+def resolve_imports(context_file: ContextFile, content: str):
+    """Fill in context_file's imports (as real paths) and missing imports"""
+    for import_path in parse_imports(content, os.path.dirname(context_file.path)):
+        if os.path.isfile(import_path):
+            context_file.imports.append(os.path.realpath(import_path))
+        else:
+            context_file.missing.append(import_path)
+
+
+def read_import_text(path: str) -> str:
+    """The @import lines of path, read as bytes so the rest is never decoded"""
+    with open(path, 'rb') as f:
+        return ''.join(line.decode('utf-8', 'replace') for line in f
+                       if line.lstrip().startswith(b'@'))
+
+
+def stat_context_file(path: str, stat_index: StatIndex, tokenizer_name: str) -> ContextFile:
+    """
+    Estimate one context file from os.stat, without tokenizing it.
+
+    An unchanged file recorded in stat_index is not opened at all. A
+    changed one is read as bytes only to find its @import lines. Either
+    way the token count is estimated from its size, unless the recorded
+    count came from the same tokenizer.
+    """
+    context_file = ContextFile(path, estimated=True)
+    try:
+        st = os.stat(path)
+        entry = stat_index.lookup(path, st)
+        if entry is None:
+            resolve_imports(context_file, read_import_text(path))
+        else:
+            context_file.imports = list(entry['imports'])
+            context_file.missing = list(entry['missing'])
+    except Exception as e:
+        context_file.error = str(e)
+        return context_file
+    
+    context_file.size = context_file.chars = st.st_size
+    if entry is not None and entry['tokenizer'] == tokenizer_name:
+        context_file.tokens = entry['tokens']
+        context_file.estimated = False
+    else:
+        extension = os.path.splitext(path)[1]
+        context_file.tokens = round(st.st_size / stat_index.bytes_per_token(tokenizer_name, extension))
+    return context_file
+
+
+class ImportResolver:
+    """
+    Follow @imports recursively, reading each file once.
+
+    Files are memoized by real path, so an import reached through several
+    paths (or symlinks) is read and counted once, and a cycle of imports
+    simply stops at the first repeated file. Each level of the import
+    tree is read concurrently.
+
+    With a stat_index, exact reads are recorded in it; with fast=True as
+    well, files are estimated from os.stat instead of read.
+
+    One resolver can serve several resolve() calls at once (as in an
+    audit): a file requested by two of them is read by the first and
+    awaited by the second, so imports shared between projects are
+    tokenized once.
+    """
+    
+    def __init__(self, max_workers: int = 8, counter: Optional[TokenCounter] = None,
+                 stat_index: Optional[StatIndex] = None, fast: bool = False):
+        self.max_workers = max_workers
+        self.counter = counter or TokenCounter()
+        self.stat_index = stat_index or StatIndex()
+        self.fast = fast
+        self.files: Dict[str, ContextFile] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+    
+    def _read_one(self, path: str) -> ContextFile:
+        tokenizer_name = self.counter.tokenizer.name
+        if self.fast:
+            return stat_context_file(path, self.stat_index, tokenizer_name)
+        context_file = read_context_file(path, self.counter)
+        if not context_file.error:
+            self.stat_index.record(context_file, tokenizer_name)
+        return context_file
+    
+    def _read(self, paths: List[str], executor: ThreadPoolExecutor):
+        futures = []
+        with self._lock:
+            for path in paths:
+                if path in self.files:
+                    continue
+                future = self._pending.get(path)
+                if future is None:
+                    future = self._pending[path] = executor.submit(self._read_one, path)
+                futures.append(future)
+        for future in futures:
+            context_file = future.result()
+            self.files[context_file.path] = context_file
+    
+    def resolve(self, filepath: str) -> ImportTree:
+        """Resolve filepath and its imports breadth-first, up to MAX_IMPORT_DEPTH hops"""
+        root = os.path.realpath(filepath)
+        tree = ImportTree(root, self.files)
+        depth = {root: 0}
+        level = [root]
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while level:
+                self._read(level, executor)
+                next_level = []
+                for path in level:
+                    context_file = self.files[path]
+                    if context_file.error and path != root:
+                        tree.warnings.append(f"Error reading import {path}: {context_file.error}")
+                    for missing in context_file.missing:
+                        tree.warnings.append(f"Import file not found: {missing}")
+                    for child in context_file.imports:
+                        tree.importers.setdefault(child, []).append(path)
+                        if child in depth:
+                            continue
+                        if depth[path] == MAX_IMPORT_DEPTH:
+                            tree.warnings.append(f"Import nested deeper than {MAX_IMPORT_DEPTH} levels, not loaded: {child}")
+                            continue
+                        depth[child] = depth[path] + 1
+                        next_level.append(child)
+                        tree.order.append(child)
+                level = next_level
+        
+        # Drop unreadable imports from the tree; their warning has been recorded
+        tree.order = [path for path in tree.order if path == root or not self.files[path].error]
+        tree.cycles = find_import_cycles(tree)
+        return tree
+
+
+def find_import_cycles(tree: ImportTree) -> List[List[str]]:
+    """Return each import cycle in the tree once, as a path back to its start"""
+    loaded = set(tree.order)
+    state: Dict[str, int] = {}  # 1 = on the current path, 2 = done
+    path: List[str] = []
+    cycles = []
+    
+    def visit(node: str):
+        state[node] = 1
+        path.append(node)
+        for child in tree.files[node].imports:
+            if child not in loaded:
+                continue
+            if state.get(child) == 1:
+                cycles.append(path[path.index(child):] + [child])
+            elif child not in state:
+                visit(child)
+        path.pop()
+        state[node] = 2
+    
+    visit(tree.root)
+    return cycles
+
+
+def load_context(filepath: str, resolver: Optional[ImportResolver] = None) -> ImportTree:
+    """Resolve CLAUDE.md and its imports, exiting with code 2 if it cannot be read"""
+    if not os.path.isfile(filepath):
+        print(f"❌ File not found: {filepath}", file=sys.stderr)
+        sys.exit(2)
+    
+    tree = (resolver or ImportResolver()).resolve(filepath)
+    error = tree.files[tree.root].error
+    if error:
+        print(f"❌ Error reading file: {error}", file=sys.stderr)
+        sys.exit(2)
+    return tree
+
+
 def analyze_claude_md(filepath: str = ".claude/CLAUDE.md") -> Tuple[int, int, List[Tuple[str, int]]]:
     """
     Analyze CLAUDE.md and return (core_tokens, total_tokens, imports)
     
     Returns:
         core_tokens: Tokens in CLAUDE.md itself
-        total_tokens: Core + all imports
-        imports: List of (path, tokens) for each import
+        total_tokens: Core + all imports, each file counted once
+        imports: List of (path, tokens) for each file imported, directly or not
+    """
+    tree = load_context(filepath)
+    for warning in tree.warnings:
+        print(f"⚠️  {warning}", file=sys.stderr)
+    return tree.core_tokens, tree.total_tokens, tree.imports
+
+
+# Section heatmap
+
+@dataclass
+class Section:
+    """The text under one heading of a context file, up to the next heading"""
+    path: str
+    heading: str
+    level: int
+    line: int
+    tokens: int = 0
+
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)(?:\s+#+)?\s*$')
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+
+def file_sections(path: str, content: str, tokenizer) -> List[Section]:
     """
+    Split content at its headings and count each section's own tokens.
+
+    One pass over the lines; a section's text is counted when the next
+    heading closes it. Headings inside code fences are ignored. Text
+    before the first heading is the "(preamble)" section. Headings are
+    named by their path, e.g. "Architecture > Data model".
+    """
+    sections = []
+    titles: List[Tuple[int, str]] = []
+    current = Section(path, "(preamble)", 0, 1)
+    lines: List[str] = []
+    fence = None
+    
+    def close():
+        current.tokens = tokenizer.count(''.join(lines))
+        if current.tokens or current.level:
+            sections.append(current)
+    
+    for number, line in enumerate(content.splitlines(keepends=True), 1):
+        fence_match = FENCE_PATTERN.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            fence = None if fence == marker else (fence or marker)
+        heading = None if fence else HEADING_PATTERN.match(line)
+        # "# @path" is a commented-out import, not a heading
+        if heading and not heading.group(2).startswith('@'):
+            close()
+            level = len(heading.group(1))
+            while titles and titles[-1][0] >= level:
+                titles.pop()
+            titles.append((level, heading.group(2)))
+            current = Section(path, ' > '.join(title for _, title in titles), level, number)
+            lines = []
+        lines.append(line)
+    close()
+    
+    return sections
+
+
+def section_heatmap(tree: ImportTree, tokenizer) -> List[Section]:
+    """Every section of CLAUDE.md and its loaded imports, largest first"""
+    sections = []
+    for path in tree.order:
+        sections.extend(file_sections(path, tree.files[path].content, tokenizer))
+    sections.sort(key=lambda section: section.tokens, reverse=True)
+    return sections
+
+
+def heatmap_json(tree: ImportTree, sections: List[Section], tokenizer_name: str) -> str:
+    total = sum(section.tokens for section in sections)
+    return json.dumps({
+        'file': os.path.relpath(tree.root),
+        'tokenizer': tokenizer_name,
+        'total_tokens': total,
+        'budgets': {'target': TARGET_BUDGET, 'warning': WARNING_BUDGET, 'maximum': MAX_BUDGET},
+        'sections': [
+            {
+                'file': os.path.relpath(section.path),
+                'heading': section.heading,
+                'level': section.level,
+                'line': section.line,
+                'tokens': section.tokens,
+                'share': round(section.tokens / total, 4) if total else 0,
+            }
+            for section in sections
+        ],
+    }, indent=2)
+
+
+def print_heatmap(sections: List[Section], top: int):
+    """Print the largest sections with bars scaled to the largest one"""
+    total = sum(section.tokens for section in sections)
+    shown = sections[:top]
+    largest = shown[0].tokens if shown else 0
+    
+    print(f"Section Heatmap (top {len(shown)} of {len(sections)} sections):")
+    print()
+    for section in shown:
+        share = section.tokens / total * 100 if total else 0
+        bar = '█' * max(1, round(section.tokens / largest * 24)) if largest else ''
+        print(f"  {section.tokens:>8,}  {share:5.1f}%  {bar:<24}  "
+              f"{os.path.relpath(section.path)} › {section.heading} (line {section.line})")
+    rest = sections[top:]
+    if rest:
+        print(f"  … {len(rest):,} more sections ({sum(section.tokens for section in rest):,} tokens)")
+    print()
+
+
+# Near-duplicate detection
+
+@dataclass
+class Paragraph:
+    """A blank-line separated block of a context file"""
+    path: str
+    line: int
+    text: str
+    tokens: int = 0
+
+
+@dataclass
+class DuplicateGroup:
+    """Paragraphs that repeat the same content; the first is the one to keep"""
+    paragraphs: List[Paragraph]
+    similarity: float
+    
+    @property
+    def wasted_tokens(self) -> int:
+        return sum(paragraph.tokens for paragraph in self.paragraphs[1:])
+
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def minhash_signature(hashes: Set[int], size: int = LSH_BANDS * LSH_ROWS) -> List[int]:
+    """
+    One-permutation MinHash: the minimum hash in each of size bins.
+
+    Each shingle hash is looked at once (its low bits pick the bin)
+    instead of once per permutation. Empty bins borrow the next non-empty
+    bin's value, offset by the distance, so that similar sets still agree
+    on them (densification by rotation).
+    """
+    bins: List[Optional[int]] = [None] * size
+    for h in hashes:
+        h &= 0xFFFFFFFFFFFFFFFF
+        b, value = h % size, h // size
+        if bins[b] is None or value < bins[b]:
+            bins[b] = value
+    
+    signature = list(bins)
+    for b in range(size):
+        if bins[b] is None:
+            distance = 1
+            while bins[(b + distance) % size] is None:
+                distance += 1
+            signature[b] = bins[(b + distance) % size] + distance * DENSIFY_OFFSET
+    return signature
+
+
+def iter_paragraphs(path: str, content: str) -> Iterator[Paragraph]:
+    """Yield the paragraphs of content with at least MIN_DUPLICATE_WORDS words"""
+    lines: List[str] = []
+    start = 1
+    for number, line in enumerate(content.splitlines() + [''], 1):
+        if line.strip():
+            if not lines:
+                start = number
+            lines.append(line)
+        elif lines:
+            text = '\n'.join(lines)
+            if len(WORD_PATTERN.findall(text)) >= MIN_DUPLICATE_WORDS:
+                yield Paragraph(path, start, text)
+            lines = []
+
+
+def shingles(text: str) -> Set[int]:
+    """
+    Hashes of the SHINGLE_SIZE-word windows of text, ignoring case and punctuation.
+
+    64-bit BLAKE2b rather than hash(), which is salted per process
+    (PYTHONHASHSEED): signatures, and so the LSH candidates, are the
+    same on every run.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    return {int.from_bytes(hashlib.blake2b(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'),
+                                           digest_size=8).digest(), 'big')
+            for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+
+
+def find_duplicates(tree: ImportTree, tokenizer) -> List[DuplicateGroup]:
+    """
+    Group repeated and near-identical paragraphs across the loaded context.
+
+    Exact copies (after normalizing case and whitespace) are grouped by
+    hash first. The remaining paragraphs get a MinHash signature over
+    word shingles, split into LSH_BANDS bands of LSH_ROWS rows, and only
+    paragraphs sharing a band bucket are compared, so the work grows
+    with the number of near-duplicates rather than with all pairs.
+    Candidates are confirmed by the exact Jaccard similarity of their
+    shingles (DUPLICATE_SIMILARITY or more).
+    """
+    paragraphs = [paragraph for path in tree.order
+                  for paragraph in iter_paragraphs(path, tree.files[path].content)]
+    
+    parent = list(range(len(paragraphs)))
+    similarity = [1.0] * len(paragraphs)
+    
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(i: int, j: int, score: float):
+        i, j = find(i), find(j)
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+            similarity[min(i, j)] = min(similarity[i], similarity[j], score)
+    
+    # Exact copies
+    first_copy: Dict[str, int] = {}
+    unique = []
+    for i, paragraph in enumerate(paragraphs):
+        key = ' '.join(WORD_PATTERN.findall(paragraph.text.lower()))
+        if key in first_copy:
+            union(first_copy[key], i, 1.0)
+        else:
+            first_copy[key] = i
+            unique.append(i)
+    
+    # Near copies
+    shingle_sets = {i: shingles(paragraphs[i].text) for i in unique}
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for i in unique:
+        signature = minhash_signature(shingle_sets[i])
+        for band in range(LSH_BANDS):
+            key = (band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+            buckets.setdefault(key, []).append(i)
+    
+    compared: Set[Tuple[int, int]] = set()
+    for bucket in buckets.values():
+        for a in range(len(bucket)):
+            for b in range(a + 1, len(bucket)):
+                pair = (bucket[a], bucket[b])
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                x, y = shingle_sets[pair[0]], shingle_sets[pair[1]]
+                score = len(x & y) / len(x | y)
+                if score >= DUPLICATE_SIMILARITY:
+                    union(pair[0], pair[1], score)
+    
+    members: Dict[int, List[int]] = {}
+    for i in range(len(paragraphs)):
+        members.setdefault(find(i), []).append(i)
+    
+    groups = []
+    for root, indices in members.items():
+        if len(indices) < 2:
+            continue
+        for i in indices:
+            paragraphs[i].tokens = tokenizer.count(paragraphs[i].text)
+        groups.append(DuplicateGroup([paragraphs[i] for i in indices], similarity[root]))
+    
+    groups.sort(key=lambda group: group.wasted_tokens, reverse=True)
+    return groups
+
+
+def print_duplicates(groups: List[DuplicateGroup], top: int):
+    wasted = sum(group.wasted_tokens for group in groups)
+    print(f"Duplicate Content: {len(groups)} group(s), ~{wasted:,} tokens loaded more than once")
+    print()
+    for group in groups[:top]:
+        first = group.paragraphs[0]
+        snippet = ' '.join(first.text.split())
+        if len(snippet) > 60:
+            snippet = snippet[:57] + '...'
+        print(f"  {group.wasted_tokens:>8,} tokens wasted, {group.similarity:.0%} similar: \"{snippet}\"")
+        for paragraph in group.paragraphs:
+            print(f"      {os.path.relpath(paragraph.path)}:{paragraph.line}")
+    if len(groups) > top:
+        print(f"  … {len(groups) - top:,} more group(s)")
+    print()
+
+
+# Compiled bundles
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def flatten_context(tree: ImportTree) -> str:
+    """
+    Inline every loaded import into CLAUDE.md's text, in place.
+
+    Each import line becomes the imported file's own flattened text between
+    <!-- @import path --> markers. A file is inlined at its first import
+    only; later imports of it, and imports that were not loaded (missing,
+    unreadable or too deep), become comments so that loading the bundle
+    never pulls in anything else.
+    """
+    loaded = set(tree.order)
+    inlined: Set[str] = set()
+    out: List[str] = []
+    
+    def inline(path: str):
+        inlined.add(path)
+        base_path = os.path.dirname(path)
+        for line in tree.files[path].content.splitlines(keepends=True):
+            import_path = import_line_path(line, base_path)
+            if import_path is None:
+                out.append(line)
+                continue
+            target = os.path.realpath(import_path)
+            label = os.path.relpath(target, os.path.dirname(tree.root))
+            if target not in loaded:
+                out.append(f"<!-- @import {label} (not loaded) -->\n")
+            elif target in inlined:
+                out.append(f"<!-- @import {label} (included above) -->\n")
+            else:
+                out.append(f"<!-- @import {label} -->\n")
+                inline(target)
+                if out and not out[-1].endswith('\n'):
+                    out.append('\n')
+                out.append(f"<!-- end @import {label} -->\n")
+    
+    inline(tree.root)
+    return ''.join(out)
+
+
+def manifest_path(bundle_path: str) -> str:
+    return f"{bundle_path}.manifest.json"
+
+
+def default_bundle_path(filepath: str) -> str:
+    """Where the bundle of filepath goes by default: beside it, in its .claude/ directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(filepath)), DEFAULT_BUNDLE)
+
+
+def bundle_is_fresh(bundle_path: str, root: str, tokenizer_name: str) -> bool:
+    """
+    Check a bundle against its manifest without resolving anything.
+
+    The manifest must be for the same root CLAUDE.md and tokenizer. A
+    source whose size and mtime match costs one stat; only a touched
+    file is hashed. Any added import changes its importer, so the
+    recorded sources (and imports that were missing) are the only files
+    to look at.
+    """
+    manifest = load_json_cache(manifest_path(bundle_path))
+    if manifest.get('format') != BUNDLE_FORMAT:
+        return False
+    if manifest.get('root') != os.path.realpath(root) or manifest.get('tokenizer') != tokenizer_name:
+        return False
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        print(f"❌ File not found: {filepath}", file=sys.stderr)
-        sys.exit(2)
-    except Exception as e:
-        print(f"❌ Error reading file: {e}", file=sys.stderr)
-        sys.exit(2)
+        if os.path.getsize(bundle_path) != manifest['bundle']['size']:
+            return False
+        if any(os.path.exists(path) for path in manifest['missing']):
+            return False
+        for source in manifest['sources']:
+            st = os.stat(source['path'])
+            if st.st_size != source['size']:
+                return False
+            if st.st_mtime_ns != source['mtime_ns'] and file_sha256(source['path']) != source['sha256']:
+                return False
+    except (OSError, KeyError, TypeError):
+        return False
+    return True
+
+
+def compile_bundle(tree: ImportTree, bundle_path: str, counter: TokenCounter) -> Dict:
+    """Write the flattened bundle and its manifest; return the manifest"""
+    bundle = flatten_context(tree)
+    data = bundle.encode('utf-8')
+    sources = []
+    for path in tree.order:
+        st = os.stat(path)
+        sources.append({
+            'path': path,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': file_sha256(path),
+            'tokens': tree.files[path].tokens,
+        })
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'root': tree.root,
+        'tokenizer': counter.tokenizer.name,
+        'bundle': {
+            'path': os.path.abspath(bundle_path),
+            'size': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'tokens': counter.count(bundle),
+        },
+        'sources': sources,
+        'missing': sorted({missing for path in tree.order for missing in tree.files[path].missing}),
+    }
     
-    # Calculate core tokens (CLAUDE.md content)
-    core_tokens = estimate_tokens(content)
+    for path, content in ((bundle_path, data), (manifest_path(bundle_path), json.dumps(manifest, indent=2).encode('utf-8'))):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return manifest
+
+
+def run_compile(args, counter: TokenCounter, stat_index: StatIndex) -> int:
+    """Compile (or just verify with --check-bundle) the flattened bundle"""
+    bundle_path = args.compile if args.compile is not None else args.check_bundle
+    if not bundle_path:
+        bundle_path = default_bundle_path(args.filepath)
     
-    # Find and calculate import tokens
-    base_path = os.path.dirname(filepath)
-    if not base_path:
-        base_path = "."
+    if bundle_is_fresh(bundle_path, args.filepath, counter.tokenizer.name):
+        manifest = load_json_cache(manifest_path(bundle_path))
+        tokens = manifest['bundle']['tokens']
+        print(f"✅ Bundle is up to date: {bundle_path} ({format_tokens(tokens)} tokens, "
+              f"{len(manifest['sources'])} source file(s))")
+        if tokens > WARNING_BUDGET:
+            print(f"⚠️  Bundle exceeds the warning budget ({WARNING_BUDGET:,} tokens)")
+            # --check-bundle answers freshness only
+            return 0 if args.check_bundle is not None else 1
+        return 0
     
-    imports = find_imports(content, base_path)
-    import_tokens = sum(tokens for _, tokens in imports)
+    if args.check_bundle is not None:
+        print(f"⚠️  Bundle is stale or missing: {bundle_path}")
+        print(f"   Rebuild with --compile {bundle_path}")
+        return 1
     
-    total_tokens = core_tokens + import_tokens
+    tree = load_context(args.filepath, ImportResolver(counter=counter, stat_index=stat_index))
+    for warning in tree.warnings:
+        print(f"⚠️  {warning}", file=sys.stderr)
+    try:
+        manifest = compile_bundle(tree, bundle_path, counter)
+    except OSError as e:
+        print(f"❌ Error writing bundle: {e}", file=sys.stderr)
+        return 2
+    counter.save()
+    stat_index.save()
     
-    return core_tokens, total_tokens, imports
+    tokens = manifest['bundle']['tokens']
+    print(f"📦 Compiled {bundle_path}: {len(tree.order)} file(s), {format_tokens(tokens)} tokens")
+    print(f"   Manifest: {manifest_path(bundle_path)}")
+    if tokens > WARNING_BUDGET:
+        print(f"⚠️  Bundle exceeds the warning budget ({WARNING_BUDGET:,} tokens)")
+        return 1
+    return 0
+
+
+# Audits
+
+# Directories never searched for CLAUDE.md files
+SKIP_DIRS = {'.git', 'node_modules', '.venv', 'venv', '__pycache__'}
+
+
+def audit_roots(roots: List[str]) -> List[str]:
+    """roots as real paths, without repeats or roots nested in another one"""
+    resolved = sorted(set(os.path.realpath(root) for root in roots))
+    return [root for root in resolved
+            if not any(root.startswith(other.rstrip(os.sep) + os.sep) for other in resolved)]
+
+
+def find_claude_files(roots: List[str]) -> List[str]:
+    """Every .claude/CLAUDE.md under roots, as real paths, each listed once"""
+    files = set()
+    for root in audit_roots(roots):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            if os.path.basename(dirpath) == '.claude' and 'CLAUDE.md' in filenames:
+                files.add(os.path.realpath(os.path.join(dirpath, 'CLAUDE.md')))
+    return sorted(files)
+
+
+def budget_status(tokens: int) -> str:
+    if tokens <= TARGET_BUDGET:
+        return "ok"
+    if tokens <= WARNING_BUDGET:
+        return "over_target"
+    if tokens <= MAX_BUDGET:
+        return "over_warning"
+    return "over_maximum"
+
+
+def audit_project(filepath: str, root: str, resolver: ImportResolver,
+                  exact_resolver: ImportResolver) -> Tuple[Dict, Optional[ImportTree]]:
+    """Resolve one project's CLAUDE.md; returns (report entry, tree or None on error)"""
+    entry = {
+        'project': os.path.relpath(os.path.dirname(os.path.dirname(os.path.abspath(filepath))), root),
+        'file': os.path.relpath(filepath, root),
+    }
+    tree = resolver.resolve(filepath)
+    if tree.estimated and near_budget(tree.total_tokens):
+        tree = exact_resolver.resolve(filepath)
+    
+    error = tree.files[tree.root].error
+    if error:
+        entry['error'] = error
+        return entry, None
+    
+    entry.update({
+        'core_tokens': tree.core_tokens,
+        'total_tokens': tree.total_tokens,
+        'imports': len(tree.order) - 1,
+        'estimated': bool(tree.estimated),
+        'status': budget_status(tree.total_tokens),
+    })
+    if tree.warnings:
+        entry['warnings'] = tree.warnings
+    return entry, tree
+
+
+def audit_report(roots: List[str], files: List[str], resolver: ImportResolver,
+                 exact_resolver: ImportResolver, jobs: int) -> Dict:
+    """
+    Analyze every CLAUDE.md in a thread pool and aggregate the results.
+
+    All projects share the two resolvers, so a file imported by many
+    projects (global rules, shared standards) is read and tokenized once.
+    """
+    root = roots[0] if len(roots) == 1 else os.path.commonpath([os.path.abspath(r) for r in roots])
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(lambda f: audit_project(f, root, resolver, exact_resolver), files))
+    
+    projects = sorted((entry for entry, _ in results), key=lambda e: e.get('total_tokens', -1), reverse=True)
+    analyzed = [entry for entry in projects if 'error' not in entry]
+    totals = sorted(entry['total_tokens'] for entry in analyzed)
+    
+    importers: Dict[str, int] = {}
+    for _, tree in results:
+        if tree is not None:
+            for path in tree.order[1:]:
+                importers[path] = importers.get(path, 0) + 1
+    shared = sorted(((path, count) for path, count in importers.items() if count > 1),
+                    key=lambda item: item[1] * resolver_tokens(resolver, exact_resolver, item[0]), reverse=True)
+    
+    def percentile(q: float) -> int:
+        return totals[min(len(totals) - 1, int(q * len(totals)))] if totals else 0
+    
+    return {
+        'roots': roots,
+        'tokenizer': resolver.counter.tokenizer.name,
+        'budgets': {'target': TARGET_BUDGET, 'warning': WARNING_BUDGET, 'maximum': MAX_BUDGET},
+        'summary': {
+            'projects': len(projects),
+            'errors': len(projects) - len(analyzed),
+            'total_tokens': sum(totals),
+            'median_tokens': percentile(0.5),
+            'p90_tokens': percentile(0.9),
+            'max_tokens': totals[-1] if totals else 0,
+            'over_target': sum(entry['status'] != 'ok' for entry in analyzed),
+            'over_warning': sum(entry['status'] in ('over_warning', 'over_maximum') for entry in analyzed),
+            'over_maximum': sum(entry['status'] == 'over_maximum' for entry in analyzed),
+        },
+        'outliers': [entry['project'] for entry in analyzed if entry['status'] != 'ok'],
+        'shared_imports': [
+            {
+                'path': os.path.relpath(path, root),
+                'tokens': resolver_tokens(resolver, exact_resolver, path),
+                'projects': count,
+            }
+            for path, count in shared[:50]
+        ],
+        'projects': projects,
+    }
+
+
+def resolver_tokens(resolver: ImportResolver, exact_resolver: ImportResolver, path: str) -> int:
+    """A file's token count, preferring the exact one when both resolvers saw it"""
+    context_file = exact_resolver.files.get(path) or resolver.files[path]
+    return context_file.tokens
+
+
+def run_audit(args, counter: TokenCounter, stat_index: StatIndex) -> int:
+    """Audit every .claude/CLAUDE.md under the given roots and print one JSON report"""
+    files = find_claude_files(args.audit)
+    if not files:
+        print(f"❌ No .claude/CLAUDE.md found under: {', '.join(args.audit)}", file=sys.stderr)
+        return 2
+    
+    resolver = ImportResolver(counter=counter, stat_index=stat_index, fast=args.fast)
+    exact_resolver = ImportResolver(counter=counter, stat_index=stat_index) if args.fast else resolver
+    report = audit_report(audit_roots(args.audit), files, resolver, exact_resolver, args.jobs)
+    counter.save()
+    stat_index.save()
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        summary = report['summary']
+        print(f"Audited {summary['projects']} project(s): {summary['over_target']} over target, "
+              f"{summary['over_warning']} over warning; report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    
+    return 1 if report['summary']['over_warning'] else 0
+
+
+# Import selection
+
+@dataclass
+class ImportChoice:
+    """A direct import of CLAUDE.md that could be commented out"""
+    path: str
+    line: str
+    tokens: int
+    priority: int = DEFAULT_PRIORITY
+    required: bool = False
+
+
+@dataclass
+class ImportPlan:
+    """Which direct imports to keep so the context fits a budget"""
+    budget: int
+    fixed_tokens: int
+    keep: List[ImportChoice]
+    drop: List[ImportChoice]
+    exact: bool
+    
+    @property
+    def total_tokens(self) -> int:
+        # fixed_tokens already includes the required imports
+        return self.fixed_tokens + sum(choice.tokens for choice in self.keep if not choice.required)
+    
+    @property
+    def fits(self) -> bool:
+        return self.total_tokens <= self.budget
+
+
+def import_choices(tree: ImportTree) -> Tuple[List[ImportChoice], int]:
+    """
+    Split the tree into optional direct imports and fixed tokens.
+
+    An import costs the tokens of the files only it brings in (itself and
+    its nested imports). Files reached through several direct imports
+    are fixed cost, like CLAUDE.md itself, so a plan never counts on
+    dropping them. Priorities come from annotations on the import line:
+    <!-- priority: 8 --> (higher is more important) or <!-- priority: required -->.
+    """
+    root = tree.files[tree.root]
+    content = root.content
+    if not content and root.size:
+        # Estimated from os.stat (--fast): the text was never read, but the
+        # priority annotations are on the import lines themselves
+        try:
+            content = read_import_text(root.path)
+        except OSError:
+            pass
+    loaded = set(tree.order)
+    direct: Dict[str, str] = {}
+    for path, line in parse_import_lines(content, os.path.dirname(root.path)):
+        path = os.path.realpath(path)
+        if path in loaded and path != tree.root:
+            direct.setdefault(path, line)
+    
+    reached_by: Dict[str, List[str]] = {}
+    for start in direct:
+        seen = {start}
+        stack = [start]
+        while stack:
+            for child in tree.files[stack.pop()].imports:
+                if child in loaded and child not in seen and child != tree.root:
+                    seen.add(child)
+                    stack.append(child)
+        for path in seen:
+            reached_by.setdefault(path, []).append(start)
+    
+    choices = []
+    for path, line in direct.items():
+        tokens = sum(tree.files[p].tokens for p, starts in reached_by.items() if starts == [path])
+        choice = ImportChoice(path, line, tokens)
+        match = PRIORITY_PATTERN.search(line)
+        if match and match.group(1).lower() == 'required':
+            choice.required = True
+        elif match:
+            choice.priority = int(match.group(1))
+        choices.append(choice)
+    
+    optional_tokens = sum(choice.tokens for choice in choices)
+    return choices, tree.total_tokens - optional_tokens
+
+
+def select_imports(choices: List[ImportChoice], capacity: int) -> Tuple[List[int], bool]:
+    """
+    Pick the choices with the highest total priority whose tokens fit capacity.
+
+    Returns (indices, exact). Priorities are small integers, so the exact
+    0/1 knapsack runs over total priority (least tokens for each total)
+    in O(items * total priority); beyond EXACT_SELECTION_LIMIT cells it
+    falls back to a greedy pass by priority per token, which is within a
+    factor of two of optimal once compared with the best single import.
+    """
+    if capacity < 0:
+        return [], True
+    total_priority = sum(choice.priority for choice in choices)
+    
+    if len(choices) * (total_priority + 1) <= EXACT_SELECTION_LIMIT:
+        infinity = capacity + 1
+        least = [0] + [infinity] * total_priority
+        chosen = [bytearray(total_priority + 1) for _ in choices]
+        for i, choice in enumerate(choices):
+            priority, row = choice.priority, chosen[i]
+            for value in range(total_priority, priority - 1, -1):
+                tokens = least[value - priority] + choice.tokens
+                if tokens < least[value]:
+                    least[value] = tokens
+                    row[value] = 1
+        
+        value = max(v for v in range(total_priority + 1) if least[v] <= capacity)
+        kept = []
+        for i in range(len(choices) - 1, -1, -1):
+            if chosen[i][value]:
+                kept.append(i)
+                value -= choices[i].priority
+        return sorted(kept), True
+    
+    order = sorted(range(len(choices)),
+                   key=lambda i: choices[i].priority / max(choices[i].tokens, 1), reverse=True)
+    greedy, used = [], 0
+    for i in order:
+        if used + choices[i].tokens <= capacity:
+            greedy.append(i)
+            used += choices[i].tokens
+    fitting = [i for i in range(len(choices)) if choices[i].tokens <= capacity]
+    if fitting:
+        single = max(fitting, key=lambda i: choices[i].priority)
+        if choices[single].priority > sum(choices[i].priority for i in greedy):
+            greedy = [single]
+    return sorted(greedy), False
+
+
+def plan_imports(tree: ImportTree, budget: int) -> ImportPlan:
+    """Plan which imports to keep within budget; required imports are always kept"""
+    choices, fixed_tokens = import_choices(tree)
+    required = [choice for choice in choices if choice.required]
+    optional = [choice for choice in choices if not choice.required]
+    fixed_tokens += sum(choice.tokens for choice in required)
+    
+    kept, exact = select_imports(optional, budget - fixed_tokens)
+    keep = required + [optional[i] for i in kept]
+    drop = [choice for i, choice in enumerate(optional) if i not in set(kept)]
+    return ImportPlan(budget, fixed_tokens, keep, drop, exact)
+
+
+def near_budget(tokens: int) -> bool:
+    """Is tokens within ESCALATION_MARGIN of one of the budgets?"""
+    return any(abs(tokens - budget) <= budget * ESCALATION_MARGIN
+               for budget in (TARGET_BUDGET, WARNING_BUDGET, MAX_BUDGET))
 
 
 def format_tokens(tokens: int) -> str:
@@ -117,17 +1459,87 @@ def format_size(chars: int) -> str:
     return f"{kb:.1f} KB"
 
 
+def positive_int(value: str) -> int:
+    """argparse type for --jobs"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def main():
-    if len(sys.argv) > 2:
-        print(__doc__)
+    parser = argparse.ArgumentParser(description="Validate CLAUDE.md token budget")
+    parser.add_argument("filepath", nargs="?", default=".claude/CLAUDE.md",
+                        help="Path to CLAUDE.md (default: .claude/CLAUDE.md)")
+    parser.add_argument("--tokenizer", choices=TOKENIZERS, default="auto",
+                        help="Token counting backend (default: bpe if a vocabulary is configured, else heuristic; "
+                             "bpe without a vocabulary needs the optional tiktoken package)")
+    parser.add_argument("--vocab", help="BPE vocabulary in .tiktoken format (default: $ACK_TOKENIZER_VOCAB)")
+    parser.add_argument("--fast", action="store_true",
+                        help="Estimate from file sizes (os.stat); re-count exactly only near a budget")
+    parser.add_argument("--plan-budget", choices=("target", "warning"), default="target",
+                        help="Budget the import plan aims for when over target (default: target)")
+    parser.add_argument("--heatmap", nargs="?", const="text", choices=("text", "json"),
+                        help="Break tokens down by heading section (json: print only the heatmap as JSON)")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="Find repeated and near-identical paragraphs across the loaded context")
+    bundle = parser.add_mutually_exclusive_group()
+    bundle.add_argument("--compile", nargs="?", const="", metavar="BUNDLE",
+                        help=f"Write CLAUDE.md with all imports inlined, plus a manifest "
+                             f"(default: {DEFAULT_BUNDLE} next to CLAUDE.md); "
+                             "skipped if the bundle is up to date; exit 1 if it exceeds the warning budget")
+    bundle.add_argument("--check-bundle", nargs="?", const="", metavar="BUNDLE",
+                        help="Exit 0 if the bundle matches its sources, 1 if it is stale or missing "
+                             "(its size does not affect the exit code)")
+    parser.add_argument("--audit", nargs="+", metavar="DIR",
+                        help="Analyze every .claude/CLAUDE.md under DIR and print one JSON report")
+    parser.add_argument("--jobs", type=positive_int, default=8,
+                        help="Projects analyzed concurrently with --audit (default: 8)")
+    parser.add_argument("--output", help="Write the --audit report to this file instead of stdout")
+    parser.add_argument("--top", type=int, default=20,
+                        help="Sections or duplicate groups shown (default: 20)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the token count cache (~/.cache/ack/token-budget)")
+    args = parser.parse_args()
+    filepath = args.filepath
+    
+    try:
+        tokenizer = get_tokenizer(args.tokenizer, args.vocab)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
         sys.exit(2)
+    counter = TokenCounter(tokenizer) if args.no_cache else TokenCounter.cached(tokenizer)
+    stat_index = StatIndex() if args.no_cache else StatIndex.cached()
     
-    filepath = sys.argv[1] if len(sys.argv) == 2 else ".claude/CLAUDE.md"
+    if args.compile is not None or args.check_bundle is not None:
+        sys.exit(run_compile(args, counter, stat_index))
+    if args.audit:
+        sys.exit(run_audit(args, counter, stat_index))
     
-    print("🔍 Checking CLAUDE.md token budget...")
-    print()
+    if args.heatmap != "json":
+        print("🔍 Checking CLAUDE.md token budget...")
+        print()
+    
+    # The heatmap and duplicate search need every file's text, so they never use --fast
+    fast = args.fast and not (args.heatmap or args.duplicates)
+    tree = load_context(filepath, ImportResolver(counter=counter, stat_index=stat_index, fast=fast))
+    escalated = bool(tree.estimated) and near_budget(tree.total_tokens)
+    if escalated:
+        tree = load_context(filepath, ImportResolver(counter=counter, stat_index=stat_index))
+    counter.save()
+    stat_index.save()
+    for warning in tree.warnings:
+        print(f"⚠️  {warning}", file=sys.stderr)
+    core_tokens, total_tokens, imports = tree.core_tokens, tree.total_tokens, tree.imports
+    shared = tree.shared()
     
-    core_tokens, total_tokens, imports = analyze_claude_md(filepath)
+    if args.heatmap == "json":
+        print(heatmap_json(tree, section_heatmap(tree, tokenizer), tokenizer.name))
+        # Same verdict as the report: over the warning threshold fails
+        sys.exit(1 if total_tokens > WARNING_BUDGET else 0)
     
     # Display results
     print("═══════════════════════════════════════════════════════════════")
@@ -135,7 +1547,13 @@ def main():
     print("═══════════════════════════════════════════════════════════════")
     print()
     
-    print(f"Core CLAUDE.md:      {format_tokens(core_tokens)} tokens ({format_size(core_tokens * CHARS_PER_TOKEN)})")
+    print(f"Tokenizer:           {tokenizer.name}")
+    if tree.estimated:
+        print(f"                     ({len(tree.estimated)} of {len(tree.order)} file(s) estimated from size, --fast)")
+    elif escalated:
+        print("                     (--fast estimate was near a budget; counted exactly)")
+    print()
+    print(f"Core CLAUDE.md:      {format_tokens(core_tokens)} tokens ({format_size(tree.files[tree.root].chars)})")
     print()
     
     if imports:
@@ -148,21 +1566,40 @@ def main():
         for path, tokens in imports_sorted:
             # Show relative path from project root
             rel_path = os.path.relpath(path)
-            print(f"  {rel_path}")
-            print(f"    {format_tokens(tokens)} tokens ({format_size(tokens * CHARS_PER_TOKEN)})")
+            notes = []
+            if tree.root not in tree.importers[path]:
+                notes.append(f"via {os.path.relpath(tree.importers[path][0])}")
+            if path in shared:
+                notes.append(f"shared by {shared[path]} files, counted once")
+            print(f"  {rel_path}" + (f"  ({'; '.join(notes)})" if notes else ""))
+            print(f"    {format_tokens(tokens)} tokens ({format_size(tree.files[path].chars)})")
         
         print()
         import_total = sum(tokens for _, tokens in imports)
         print(f"Total Imports:       {format_tokens(import_total)} tokens")
         print()
+        
+        if tree.cycles:
+            print("Import cycles (each file loaded once):")
+            for cycle in tree.cycles:
+                print(f"  {' → '.join(os.path.relpath(path) for path in cycle)}")
+            print()
     else:
         print("No imports found")
         print()
     
     print("─────────────────────────────────────────────────────────────────")
-    print(f"TOTAL:               {format_tokens(total_tokens)} tokens ({format_size(total_tokens * CHARS_PER_TOKEN)})")
+    print(f"TOTAL:               {format_tokens(total_tokens)} tokens ({format_size(tree.total_chars)})")
     print()
     
+    if args.heatmap:
+        print("─────────────────────────────────────────────────────────────────")
+        print_heatmap(section_heatmap(tree, tokenizer), args.top)
+    
+    if args.duplicates:
+        print("─────────────────────────────────────────────────────────────────")
+        print_duplicates(find_duplicates(tree, tokenizer), args.top)
+    
     # Budget comparison
     print("─────────────────────────────────────────────────────────────────")
     print("Budget Targets:")
@@ -217,17 +1654,34 @@ def main():
         print("Optimization Suggestions:")
         print()
         
-        # Find largest imports
-        largest = sorted(imports, key=lambda x: x[1], reverse=True)[:3]
+        budget = WARNING_BUDGET if args.plan_budget == "warning" else TARGET_BUDGET
+        plan = plan_imports(tree, budget)
         
-        print("  Largest imports to consider moving to optional:")
-        for path, tokens in largest:
-            rel_path = os.path.relpath(path)
-            print(f"    - {rel_path} ({tokens:,} tokens)")
+        if total_tokens <= budget:
+            print(f"  Already within the {args.plan_budget} budget ({budget:,} tokens): nothing to comment out")
+        elif not plan.drop:
+            print(f"  Commenting out imports cannot reach the {args.plan_budget} budget ({budget:,} tokens):")
+            print(f"  {plan.fixed_tokens:,} tokens are in CLAUDE.md, required or shared imports")
+        else:
+            method = "optimal" if plan.exact else "approximate"
+            print(f"  Plan to fit the {args.plan_budget} budget ({budget:,} tokens, {method} by priority):")
+            print()
+            print("  Comment out in CLAUDE.md:")
+            for choice in sorted(plan.drop, key=lambda c: (c.priority, -c.tokens)):
+                print(f"    # {choice.line}  # Optional, load on demand")
+                print(f"        {choice.tokens:,} tokens, priority {choice.priority}")
+            print()
+            kept_priority = sum(choice.priority for choice in plan.keep if not choice.required)
+            all_priority = kept_priority + sum(choice.priority for choice in plan.drop)
+            print(f"  Keeps {len(plan.keep)} import(s) ({kept_priority} of {all_priority} priority points)")
+            print(f"  Resulting total: {format_tokens(plan.total_tokens)} tokens")
+            if not plan.fits:
+                print(f"  ⚠️  Still over budget: {plan.fixed_tokens:,} tokens are in CLAUDE.md, required or shared imports")
         
         print()
-        print("  To make import optional, comment it out in CLAUDE.md:")
-        print("    # @.ipe/verbose-artifact.md  # Optional, load on demand")
+        print("  Set priorities on import lines in CLAUDE.md (default 5):")
+        print("    @.ipe/architecture.md <!-- priority: 9 -->")
+        print("    @.ipe/decisions.md <!-- priority: required -->")
         print()
     
     sys.exit(exit_code)
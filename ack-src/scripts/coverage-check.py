@@ -6,7 +6,20 @@ Ensures every requirement from Stage 1 has:
   - Architecture component in Stage 2
   - Task(s) in Stage 5
 
-Usage: python3 coverage-check.py
+Usage: python3 coverage-check.py [ROOT ...] [options]
+
+  One root (default: current directory) prints the detailed report.
+  Several roots are checked in a worker pool and summarized per project;
+  results are cached by the hashes of each project's artifacts, so only
+  projects whose inputs changed are recomputed.
+
+Options:
+  --requirements PATH   Requirements file, relative to each root
+  --design PATH         Design document, relative to each root (repeatable)
+  --tasks PATH          Task file, relative to each root
+  --jobs N              Worker processes for several roots (default: CPU count)
+  --json                Print the per-project results as JSON
+  --no-cache            Recompute every project
 
 Exit codes:
   0 - All requirements covered
@@ -14,12 +27,43 @@ Exit codes:
   2 - Error reading files
 """
 
+import argparse
+import hashlib
+import json
+import os
 import sys
 import re
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Set, Tuple
 from dataclasses import dataclass
 
 
+DEFAULT_REQUIREMENTS = ".ipe/discovery/requirements.md"
+DEFAULT_DESIGN_DOCS = [
+    ".ipe/solution-design/architecture.md",
+    ".ipe/solution-design/stack.md",
+    ".ipe/solution-design/data-model.md"
+]
+DEFAULT_TASKS = ".ipe/implementation/tasks.md"
+
+# Bump when a change to parsing or matching would alter cached results
+CACHE_VERSION = 1
+
+
+# A requirement reference: R-042 or REQ-042, never a prefix of R-0421
+REQ_REF_PATTERN = re.compile(r'\b(?:REQ|R)-(\d+)\b')
+
+# A markdown heading, which starts a design document section
+SECTION_PATTERN = re.compile(r'^#+\s+(.+?)\s*#*\s*$')
+
+# Tokens that matter on a tasks.md line, in one alternation so each line is scanned once
+TASK_TOKEN_PATTERN = re.compile(
+    r'^###\s+(?P<header>TASK-\d+):'
+    r'|\b(?P<task>TASK-\d+)\b'
+    r'|\b(?:REQ|R)-(?P<req>\d+)\b'
+)
+
+
 @dataclass
 class Requirement:
     """Represents a requirement from discovery"""
@@ -28,13 +72,16 @@ class Requirement:
     description: str = ""
     covered_by_architecture: bool = False
     covered_by_tasks: List[str] = None
+    architecture_refs: List[Tuple[str, str]] = None
     
     def __post_init__(self):
         if self.covered_by_tasks is None:
             self.covered_by_tasks = []
+        if self.architecture_refs is None:
+            self.architecture_refs = []
 
 
-def parse_requirements(filepath: str = ".ipe/discovery/requirements.md") -> Dict[str, Requirement]:
+def parse_requirements(filepath: str = DEFAULT_REQUIREMENTS) -> Dict[str, Requirement]:
     """Parse requirements.md and extract all requirements"""
     requirements = {}
     
@@ -69,73 +116,100 @@ def parse_requirements(filepath: str = ".ipe/discovery/requirements.md") -> Dict
     return requirements
 
 
-def check_architecture_coverage(requirements: Dict[str, Requirement]) -> None:
-    """Check if requirements are addressed in architecture"""
-    
-    arch_files = [
-        ".ipe/solution-design/architecture.md",
-        ".ipe/solution-design/stack.md",
-        ".ipe/solution-design/data-model.md"
-    ]
+def index_design_references(filepaths: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    Map each requirement ID to the (document, section) pairs that mention it.
+
+    Every requirement ID is found by one compiled pattern in a single pass
+    over each document, so the cost is linear in the size of the design
+    set however many requirements there are. IDs match exactly, and
+    REQ-XXX is read as R-XXX.
+    """
+    index: Dict[str, List[Tuple[str, str]]] = {}
     
-    architecture_content = ""
-    for filepath in arch_files:
+    for filepath in filepaths:
+        doc = os.path.basename(filepath)
+        section = ""
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                architecture_content += f.read() + "\n"
+                for line in f:
+                    header = SECTION_PATTERN.match(line)
+                    if header:
+                        section = header.group(1)
+                    for match in REQ_REF_PATTERN.finditer(line):
+                        refs = index.setdefault('R-' + match.group(1), [])
+                        if (doc, section) not in refs[-1:]:
+                            refs.append((doc, section))
         except FileNotFoundError:
             continue
     
-    # Check if each requirement ID appears in architecture docs
-    for req_id in requirements:
-        if req_id in architecture_content or \
-           req_id.replace('R-', 'REQ-') in architecture_content:
-            requirements[req_id].covered_by_architecture = True
+    return index
 
 
-def check_task_coverage(requirements: Dict[str, Requirement]) -> None:
+def check_architecture_coverage(requirements: Dict[str, Requirement],
+                                arch_files: List[str] = None) -> None:
+    """Check if requirements are addressed in architecture"""
+    
+    index = index_design_references(arch_files or DEFAULT_DESIGN_DOCS)
+    for req_id, req in requirements.items():
+        req.architecture_refs = index.get(req_id, [])
+        req.covered_by_architecture = bool(req.architecture_refs)
+
+
+def format_design_ref(ref: Tuple[str, str]) -> str:
+    """architecture.md § Section, or just the document for text before any heading"""
+    doc, section = ref
+    return f"{doc} § {section}" if section else doc
+
+
+def index_task_references(content: str) -> Dict[str, List[str]]:
+    """
+    Build an inverted index from requirement ID to the tasks that reference it.
+
+    One pass over tasks.md: a reference counts for the task whose
+    "### TASK-XXX:" section it sits in, and for any TASK-XXX named earlier
+    on the same line. IDs match exactly, and REQ-XXX is read as R-XXX.
+    """
+    index: Dict[str, List[str]] = {}
+    section_task = None
+    
+    for line in content.split('\n'):
+        line_task = None
+        for match in TASK_TOKEN_PATTERN.finditer(line):
+            if match.group('header'):
+                section_task = line_task = match.group('header')
+            elif match.group('task'):
+                line_task = line_task or match.group('task')
+            else:
+                tasks = index.setdefault('R-' + match.group('req'), [])
+                for task_id in (section_task, line_task):
+                    if task_id and task_id not in tasks:
+                        tasks.append(task_id)
+    
+    return index
+
+
+def check_task_coverage(requirements: Dict[str, Requirement],
+                        filepath: str = DEFAULT_TASKS, quiet: bool = False) -> None:
     """Check if requirements are covered by tasks"""
     
     try:
-        with open(".ipe/implementation/tasks.md", 'r', encoding='utf-8') as f:
+        with open(filepath, 'r', encoding='utf-8') as f:
             tasks_content = f.read()
     except FileNotFoundError:
-        print("⚠️  tasks.md not found, skipping task coverage check", file=sys.stderr)
+        if not quiet:
+            print("⚠️  tasks.md not found, skipping task coverage check", file=sys.stderr)
         return
     
-    # For each requirement, find tasks that reference it
-    for req_id in requirements:
-        # Look for requirement references in tasks
-        # Could be in context links, description, or comments
-        task_pattern = r'(TASK-\d+)[^\n]*' + re.escape(req_id)
-        
-        for match in re.finditer(task_pattern, tasks_content):
-            task_id = match.group(1)
-            if task_id not in requirements[req_id].covered_by_tasks:
-                requirements[req_id].covered_by_tasks.append(task_id)
-        
-        # Also check reverse: requirement mentioned near task
-        # Split into task sections
-        task_sections = re.split(r'^###\s+TASK-\d+:', tasks_content, flags=re.MULTILINE)
-        
-        for i, section in enumerate(task_sections[1:], 1):  # Skip header
-            if req_id in section or req_id.replace('R-', 'REQ-') in section:
-                # Extract task ID from next header
-                task_match = re.search(r'^###\s+(TASK-\d+):', task_sections[i], re.MULTILINE)
-                if task_match:
-                    task_id = task_match.group(1)
-                    if task_id not in requirements[req_id].covered_by_tasks:
-                        requirements[req_id].covered_by_tasks.append(task_id)
+    index = index_task_references(tasks_content)
+    for req_id, req in requirements.items():
+        for task_id in index.get(req_id, []):
+            if task_id not in req.covered_by_tasks:
+                req.covered_by_tasks.append(task_id)
 
 
-def generate_report(requirements: Dict[str, Requirement]) -> Tuple[int, int, int]:
-    """Generate coverage report and return (total, covered, uncovered)"""
-    
-    print("═══════════════════════════════════════════════════════════════")
-    print("  Requirement Traceability Report")
-    print("═══════════════════════════════════════════════════════════════")
-    print()
-    
+def classify_coverage(requirements: Dict[str, Requirement]) -> Tuple[List[Requirement], List[Requirement], List[Requirement]]:
+    """Split requirements into (fully covered, partially covered, not covered)"""
     fully_covered = []
     partially_covered = []
     not_covered = []
@@ -153,13 +227,28 @@ def generate_report(requirements: Dict[str, Requirement]) -> Tuple[int, int, int
         else:
             not_covered.append(req)
     
+    return fully_covered, partially_covered, not_covered
+
+
+def generate_report(requirements: Dict[str, Requirement]) -> Tuple[int, int, int]:
+    """Generate coverage report and return (total, covered, uncovered)"""
+    
+    print("═══════════════════════════════════════════════════════════════")
+    print("  Requirement Traceability Report")
+    print("═══════════════════════════════════════════════════════════════")
+    print()
+    
+    fully_covered, partially_covered, not_covered = classify_coverage(requirements)
+    
     # Show fully covered (brief)
     if fully_covered:
         print(f"✅ Fully Covered ({len(fully_covered)} requirements):")
         print()
         for req in fully_covered:
             tasks_str = ", ".join(req.covered_by_tasks)
+            design_str = ", ".join(format_design_ref(ref) for ref in req.architecture_refs)
             print(f"  {req.id}: {req.title}")
+            print(f"    → Design: {design_str}")
             print(f"    → Tasks: {tasks_str}")
         print()
     
@@ -170,7 +259,8 @@ def generate_report(requirements: Dict[str, Requirement]) -> Tuple[int, int, int
         for req in partially_covered:
             print(f"  {req.id}: {req.title}")
             if req.covered_by_architecture:
-                print(f"    ✓ Architecture coverage")
+                design_str = ", ".join(format_design_ref(ref) for ref in req.architecture_refs)
+                print(f"    ✓ Architecture coverage: {design_str}")
             else:
                 print(f"    ✗ Not referenced in architecture")
             
@@ -210,12 +300,226 @@ def generate_report(requirements: Dict[str, Requirement]) -> Tuple[int, int, int
     return total, covered, len(not_covered)
 
 
+# Batch mode
+
+def default_cache_dir() -> str:
+    """Per-user cache directory ($XDG_CACHE_HOME/ack/coverage-check)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ack', 'coverage-check')
+
+
+def load_json_cache(path: str) -> Dict:
+    """Read a JSON cache file; a missing or damaged cache reads as empty"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_json_cache(path: str, data: Dict):
+    """Atomically write a JSON cache file; failures only cost the speedup"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def file_sha256(filepath: str) -> str:
+    """SHA-256 of a file's bytes, or "missing" if it cannot be read"""
+    digest = hashlib.sha256()
+    try:
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+    except OSError:
+        return "missing"
+    return digest.hexdigest()
+
+
+def inputs_key(paths: List[str]) -> str:
+    """Cache key over the artifact paths and their content hashes"""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in paths:
+        digest.update(f"{path}\0{file_sha256(path)}\0".encode())
+    return digest.hexdigest()
+
+
+def check_project(root: str, requirements_path: str, design_paths: List[str], tasks_path: str) -> Dict:
+    """Check one project root without printing; returns a JSON-ready result"""
+    result = {'root': root, 'error': None}
+    
+    if not os.path.isfile(requirements_path):
+        result['error'] = f"{os.path.relpath(requirements_path, root)} not found"
+        return result
+    
+    requirements = parse_requirements(requirements_path)
+    if not requirements:
+        result['error'] = "no requirements found"
+        return result
+    
+    check_architecture_coverage(requirements, design_paths)
+    check_task_coverage(requirements, tasks_path, quiet=True)
+    fully_covered, partially_covered, not_covered = classify_coverage(requirements)
+    
+    result.update({
+        'total': len(requirements),
+        'fully_covered': len(fully_covered),
+        'partially_covered': [req.id for req in partially_covered],
+        'not_covered': [req.id for req in not_covered],
+    })
+    return result
+
+
+def check_projects(roots: List[str], requirements_rel: str, design_rel: List[str],
+                   tasks_rel: str, jobs: int, use_cache: bool = True) -> List[Dict]:
+    """
+    Check many project roots, reusing cached results for unchanged inputs.
+
+    A project is recomputed only when the hash of its requirements, design
+    documents or tasks differs from the cached run. The rest are checked
+    in a process pool, since matching is CPU-bound.
+    """
+    cache_path = os.path.join(default_cache_dir(), 'results.json')
+    cache = load_json_cache(cache_path) if use_cache else {}
+    results: List[Dict] = [None] * len(roots)
+    pending = []
+    
+    for i, root in enumerate(roots):
+        requirements_path = os.path.join(root, requirements_rel)
+        design_paths = [os.path.join(root, path) for path in design_rel]
+        tasks_path = os.path.join(root, tasks_rel)
+        key = inputs_key([requirements_path] + design_paths + [tasks_path])
+        
+        entry = cache.get(os.path.realpath(root))
+        if isinstance(entry, dict) and entry.get('key') == key:
+            results[i] = dict(entry['result'], root=root, cached=True)
+        else:
+            pending.append((i, key, (root, requirements_path, design_paths, tasks_path)))
+    
+    if pending:
+        work = [task for _, _, task in pending]
+        if jobs > 1 and len(pending) > 1:
+            workers = min(jobs, len(pending))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                computed = list(pool.map(check_project, *zip(*work),
+                                         chunksize=max(1, len(work) // (workers * 4))))
+        else:
+            computed = [check_project(*task) for task in work]
+        
+        for (i, key, task), result in zip(pending, computed):
+            cache[os.path.realpath(task[0])] = {'key': key, 'result': result}
+            results[i] = dict(result, cached=False)
+        
+        if use_cache:
+            save_json_cache(cache_path, cache)
+    
+    return results
+
+
+def print_batch_report(results: List[Dict]):
+    """One line per project, then totals"""
+    
+    print("═══════════════════════════════════════════════════════════════")
+    print("  Requirement Coverage Across Projects")
+    print("═══════════════════════════════════════════════════════════════")
+    print()
+    
+    for result in results:
+        if result['error']:
+            print(f"❌ {result['root']}: {result['error']}")
+            continue
+        
+        partial = len(result['partially_covered'])
+        uncovered = len(result['not_covered'])
+        icon = "❌" if uncovered else "⚠️ " if partial else "✅"
+        line = f"{icon} {result['root']}: {result['fully_covered']}/{result['total']} fully covered"
+        if partial:
+            line += f", {partial} partial"
+        if uncovered:
+            line += f", {uncovered} not covered ({', '.join(result['not_covered'][:5])}"
+            line += ", ...)" if uncovered > 5 else ")"
+        print(line)
+    
+    print()
+    errors = sum(1 for result in results if result['error'])
+    gaps = sum(1 for result in results if not result['error'] and result['not_covered'])
+    cached = sum(1 for result in results if result['cached'])
+    print(f"Projects:             {len(results)} ({cached} unchanged, from cache)")
+    print(f"With uncovered reqs:  {gaps}")
+    print(f"Errors:               {errors}")
+    print()
+
+
+def run_batch(args) -> int:
+    """Check every root and report; exit code follows the single-project codes"""
+    results = check_projects(args.roots, args.requirements, args.design or DEFAULT_DESIGN_DOCS,
+                             args.tasks, args.jobs, use_cache=not args.no_cache)
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_batch_report(results)
+    
+    if any(result['error'] for result in results):
+        return 2
+    if any(result['not_covered'] for result in results):
+        return 1
+    return 0
+
+
+def positive_int(value: str) -> int:
+    """argparse type for --jobs"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def parse_args(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Verify requirement coverage in implementation plan"
+    )
+    parser.add_argument('roots', nargs='*', metavar='ROOT',
+                        help='Project root(s) to check (default: current directory)')
+    parser.add_argument('--requirements', default=DEFAULT_REQUIREMENTS, metavar='PATH',
+                        help=f'Requirements file relative to each root (default: {DEFAULT_REQUIREMENTS})')
+    parser.add_argument('--design', action='append', metavar='PATH',
+                        help='Design document relative to each root; repeat for several '
+                             '(default: architecture.md, stack.md, data-model.md)')
+    parser.add_argument('--tasks', default=DEFAULT_TASKS, metavar='PATH',
+                        help=f'Task file relative to each root (default: {DEFAULT_TASKS})')
+    parser.add_argument('--jobs', '-j', type=positive_int, default=os.cpu_count() or 1,
+                        help='Worker processes when checking several roots (default: CPU count)')
+    parser.add_argument('--json', action='store_true',
+                        help='Print per-project results as JSON')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute every project instead of reusing cached results')
+    return parser.parse_args(argv)
+
+
 def main():
+    args = parse_args()
+    
+    if len(args.roots) > 1 or args.json:
+        args.roots = args.roots or ["."]
+        sys.exit(run_batch(args))
+    
+    root = args.roots[0] if args.roots else "."
+    
     print("🔍 Checking requirement coverage...")
     print()
     
     # Parse requirements
-    requirements = parse_requirements()
+    requirements = parse_requirements(os.path.join(root, args.requirements))
     
     if not requirements:
         print("⚠️  No requirements found or requirements.md not accessible")
@@ -227,10 +531,11 @@ def main():
     
     # Check coverage
     print("Checking architecture coverage...")
-    check_architecture_coverage(requirements)
+    design_docs = args.design or DEFAULT_DESIGN_DOCS
+    check_architecture_coverage(requirements, [os.path.join(root, path) for path in design_docs])
     
     print("Checking task coverage...")
-    check_task_coverage(requirements)
+    check_task_coverage(requirements, os.path.join(root, args.tasks))
     
     print()
     
@@ -0,0 +1,86 @@
+"""
+Fixtures for the script tests.
+
+The scripts have hyphenated file names, so they are loaded from their
+paths rather than imported. Scripts run as subprocesses start in a
+temporary directory and, like the tests themselves, get a private cache
+directory; git fixtures a fresh repository with an identity.
+"""
+
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script(filename):
+    """Import scripts/<filename> as a module (check-cycles.py -> check_cycles)"""
+    name = os.path.splitext(filename)[0].replace('-', '_')
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        # Registered first: dataclasses and process pools look the module up by name
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+@pytest.fixture(scope='session')
+def cycles():
+    return load_script('check-cycles.py')
+
+
+@pytest.fixture(scope='session')
+def budget():
+    return load_script('check-token-budget.py')
+
+
+@pytest.fixture(scope='session')
+def coverage():
+    return load_script('coverage-check.py')
+
+
+@pytest.fixture(scope='session')
+def trace():
+    return load_script('trace-requirements.py')
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    """Keep every cache (in process and in subprocesses) out of the real home"""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.delenv('ACK_TOKENIZER_VOCAB', raising=False)
+
+
+@pytest.fixture
+def run(tmp_path):
+    """Run a script in tmp_path (or cwd) and return the CompletedProcess"""
+    def run(script, *args, cwd=None, input=None):
+        return subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, script), *map(str, args)],
+                              cwd=cwd or tmp_path, input=input, capture_output=True, text=True)
+    return run
+
+
+@pytest.fixture
+def git(tmp_path, monkeypatch):
+    """Run git in tmp_path, a new repository with one empty commit"""
+    if shutil.which('git') is None:
+        pytest.skip("git is not installed")
+    for var in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(var, 'ACK Tests')
+    for var in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(var, 'tests@example.com')
+    monkeypatch.setenv('GIT_CONFIG_GLOBAL', os.devnull)
+
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=tmp_path, check=True,
+                              capture_output=True, text=True).stdout
+
+    git('init', '-q')
+    git('commit', '-q', '--allow-empty', '-m', 'init')
+    return git
@@ -0,0 +1,513 @@
+"""Tests for check-cycles.py, mostly against brute-force reachability"""
+
+import random
+from functools import partial
+
+import pytest
+
+
+def task(i):
+    return f"TASK-{i:03d}"
+
+
+def random_graph(cycles, n, m, seed, acyclic=False):
+    """n tasks (TASK-i has ID i) and m distinct random edges; acyclic edges point to lower IDs"""
+    rng = random.Random(seed)
+    edges = set()
+    while len(edges) < m:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if not acyclic or u > v:
+            edges.add((u, v))
+    graph = cycles.DependencyGraph()
+    for i in range(n):
+        graph.intern(task(i))
+    for u, v in sorted(edges):
+        graph.add_edge(task(u), task(v))
+    graph.freeze()
+    return graph, edges
+
+
+def reachable(n, edges):
+    """reach[u]: every task u depends on through one or more edges"""
+    forward = [[] for _ in range(n)]
+    for u, v in edges:
+        forward[u].append(v)
+    reach = []
+    for start in range(n):
+        seen, stack = set(), list(forward[start])
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                stack.extend(forward[node])
+        reach.append(seen)
+    return reach
+
+
+def components_of(n, edges):
+    """Every task, grouped with the tasks it can reach and be reached from"""
+    reach = reachable(n, edges)
+    return {frozenset({u} | {v for v in reach[u] if u in reach[v]}) for u in range(n)}
+
+
+GRAPHS = [(30, 45, seed) for seed in range(5)] + [(60, 150, seed) for seed in range(5, 8)]
+
+
+@pytest.mark.parametrize("n, m, seed", GRAPHS)
+def test_strongly_connected_components_match_mutual_reachability(cycles, n, m, seed):
+    graph, edges = random_graph(cycles, n, m, seed)
+
+    components = graph.strongly_connected_components()
+    assert {frozenset(component) for component in components} == components_of(n, edges)
+
+    # Dependencies first: a component comes before every component depending on it
+    position = {node: i for i, component in enumerate(components) for node in component}
+    assert all(position[v] <= position[u] for u, v in edges)
+
+
+@pytest.mark.parametrize("n, m, seed", GRAPHS)
+def test_find_cycles_gives_one_real_cycle_per_cyclic_component(cycles, n, m, seed):
+    graph, edges = random_graph(cycles, n, m, seed)
+    reach = reachable(n, edges)
+    cyclic = [component for component in components_of(n, edges)
+              if any(u in reach[u] for u in component)]
+
+    found = graph.find_cycles()
+    assert len(found) == len(cyclic)
+    for cycle in found:
+        assert cycle[0] == cycle[-1]
+        ids = [graph.ids[name] for name in cycle]
+        assert all((a, b) in edges for a, b in zip(ids, ids[1:]))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_incremental_insertion_rejects_exactly_the_edges_closing_a_cycle(cycles, seed):
+    rng = random.Random(seed)
+    n = 40
+    graph = cycles.DependencyGraph()
+    for i in range(n):
+        graph.intern(task(i))
+    graph.enable_incremental()
+    accepted = set()
+
+    for _ in range(300):
+        u, v = rng.randrange(n), rng.randrange(n)
+        closes = u == v or u in reachable(n, accepted)[v]
+        if closes:
+            with pytest.raises(cycles.CycleError) as error:
+                graph.add_edge(task(u), task(v))
+            ids = [graph.ids[name] for name in error.value.cycle]
+            assert ids[0] == ids[-1] == u
+            assert all((a, b) in accepted | {(u, v)} for a, b in zip(ids, ids[1:]))
+        else:
+            graph.add_edge(task(u), task(v))
+            accepted.add((u, v))
+        # Pearce-Kelly keeps every task after the tasks it depends on
+        assert all(graph._position[b] < graph._position[a] for a, b in accepted)
+
+    graph.freeze()
+    assert graph.find_cycles() == []
+    assert graph.edge_count == len(accepted)
+
+
+def test_enable_incremental_refuses_a_cyclic_graph(cycles):
+    graph = cycles.DependencyGraph()
+    graph.add_edge("TASK-001", "TASK-002")
+    graph.add_edge("TASK-002", "TASK-001")
+    with pytest.raises(cycles.CycleError):
+        graph.enable_incremental()
+
+
+@pytest.mark.parametrize("max_labels", [None, 1])
+@pytest.mark.parametrize("n, m, seed", GRAPHS)
+def test_reachability_index_matches_search(cycles, monkeypatch, max_labels, n, m, seed):
+    if max_labels is not None:
+        # Force the unlabeled fallback for nearly every component
+        monkeypatch.setattr(cycles, 'interval_labels', partial(cycles.interval_labels, max_labels=max_labels))
+    graph, edges = random_graph(cycles, n, m, seed)
+    reach = reachable(n, edges)
+    index = cycles.ReachabilityIndex.build(graph)
+
+    for u in range(n):
+        for v in range(n):
+            if u != v:
+                assert index.depends_on(task(u), task(v)) == (v in reach[u])
+        assert set(index.dependencies_of(task(u))) == {task(v) for v in reach[u] - {u}}
+        assert set(index.dependents_of(task(u))) == {task(w) for w in range(n) if w != u and u in reach[w]}
+
+
+def test_reachability_index_survives_save_and_load(cycles, tmp_path):
+    graph, edges = random_graph(cycles, 50, 120, seed=3, acyclic=True)
+    path = str(tmp_path / "deps.reach")
+    cycles.ReachabilityIndex.build(graph, {'sha256': 'x'}).save(path)
+    index = cycles.ReachabilityIndex.load(path)
+    reach = reachable(50, edges)
+    assert index.source == {'sha256': 'x'}
+    assert all(index.depends_on(task(u), task(v)) == (v in reach[u])
+               for u in range(50) for v in range(50) if u != v)
+
+
+@pytest.mark.parametrize("block_bytes", [None, 1])
+@pytest.mark.parametrize("n, m, seed", [(40, 200, 1), (200, 1500, 2), (300, 600, 3)])
+def test_transitive_reduction_matches_brute_force(cycles, monkeypatch, block_bytes, n, m, seed):
+    if block_bytes is not None:
+        # Blocks of 64 components: several passes over the edges
+        monkeypatch.setattr(cycles, 'REDUCTION_BLOCK_BYTES', block_bytes)
+    graph, edges = random_graph(cycles, n, m, seed, acyclic=True)
+    reach = reachable(n, edges)
+    expected = {(u, v) for u, v in edges
+                if any(v in reach[w] for x, w in edges if x == u and w != v)}
+
+    redundant = cycles.transitive_reduction(graph)
+    assert {(u, v) for u, v, _ in redundant} == expected
+    for u, v, via in redundant:
+        assert (u, via) in edges and v in reach[via]
+    assert redundant == sorted(redundant)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_schedule_waves_and_critical_path_match_longest_chains(cycles, seed):
+    n = 60
+    graph, edges = random_graph(cycles, n, 150, seed, acyclic=True)
+    points = {task(i): (i % 4) * 2 or None for i in range(n)}
+    schedule = cycles.Schedule(graph, points)
+    weight = [points[task(i)] or cycles.DEFAULT_POINTS for i in range(n)]
+
+    # Acyclic edges point to lower IDs, so a task's dependencies come first
+    links, heaviest = [0] * n, [0] * n
+    for u in range(n):
+        deps = [v for x, v in edges if x == u]
+        links[u] = max((links[v] + 1 for v in deps), default=0)
+        heaviest[u] = max((heaviest[v] for v in deps), default=0) + weight[u]
+
+    assert [sorted(wave) for wave in schedule.waves] == \
+        [sorted(u for u in range(n) if links[u] == k) for k in range(max(links) + 1)]
+    assert schedule.critical_points == max(heaviest)
+    path = schedule.critical_path
+    assert all((b, a) in edges for a, b in zip(path, path[1:]))
+    assert sum(weight[u] for u in path) == max(heaviest)
+
+
+def test_schedule_bounds(cycles):
+    graph, _ = random_graph(cycles, 80, 200, seed=5, acyclic=True)
+    points = {task(i): (i % 3) * 3 or None for i in range(80)}
+    schedule = cycles.Schedule(graph, points)
+
+    assert schedule.makespan(1) == schedule.total_points
+    assert schedule.makespan(80) == schedule.critical_points
+    spans = [schedule.makespan(workers) for workers in (1, 2, 4, 8)]
+    assert spans == sorted(spans, reverse=True)
+    assert sum(len(wave) for wave in schedule.waves) == 80
+
+
+def test_task_points_come_from_complexity_ratings(cycles, tmp_path):
+    path = tmp_path / "tasks.md"
+    path.write_text("### TASK-001: One\n**Complexity:** Complex\n\n"
+                    "### TASK-002: Two\n**Complexity:** Unknown\n\n"
+                    "### TASK-003: Three\n")
+    assert cycles.parse_task_points(str(path)) == {"TASK-001": 8, "TASK-002": None, "TASK-003": None}
+
+
+def test_single_file_reads_a_prefixed_task_as_the_plain_id(cycles):
+    lines = ["## Phase:TASK-001 → TASK-002\n", "- TASK-002 depends on TASK-003\n"]
+    assert cycles.graph_edges(cycles.build_dependency_graph(lines)) == [
+        ("TASK-001", "TASK-002"), ("TASK-002", "TASK-003")]
+    assert ("Phase:TASK-001", "TASK-002") in cycles.graph_edges(cycles.build_dependency_graph(lines, qualified=True))
+
+
+def test_merge_projects_links_qualified_references(cycles, tmp_path):
+    for project, line in (("api", "- TASK-001 → web:TASK-001\n"), ("web", "- TASK-001 → TASK-002\n")):
+        (tmp_path / project).mkdir()
+        (tmp_path / project / "dependencies.md").write_text(line)
+    files = [str(tmp_path / project / "dependencies.md") for project in ("api", "web")]
+
+    graph, errors = cycles.merge_projects(files, str(tmp_path), jobs=1)
+    assert errors == []
+    edges = [(graph.names[u], graph.names[v]) for u in range(graph.task_count) for v in graph.dependencies(u)]
+    assert sorted(edges) == [("api:TASK-001", "web:TASK-001"), ("web:TASK-001", "web:TASK-002")]
+
+
+def test_graph_cache_is_keyed_by_content(cycles, tmp_path, monkeypatch):
+    path = tmp_path / "dependencies.md"
+    path.write_text("- TASK-001 → TASK-002\n- TASK-002 → TASK-001\n")
+    cache = cycles.GraphCache(str(tmp_path / "graphs"))
+    graph, found = cycles.load_dependencies(str(path), cache)
+    assert found == [["TASK-001", "TASK-002", "TASK-001"]]
+
+    # A hit never parses
+    with monkeypatch.context() as patch:
+        patch.setattr(cycles, 'read_dependency_graph', None)
+        cached, cached_cycles = cycles.load_dependencies(str(path), cache)
+    assert cached.names == graph.names and list(cached.targets) == list(graph.targets)
+    assert cached_cycles == found
+
+    path.write_text("- TASK-001 → TASK-002\n")
+    assert cycles.load_dependencies(str(path), cache)[1] == []
+
+    # A corrupt entry is a miss, and gets overwritten
+    entry = cache.path(cycles.file_sha256(str(path)))
+    with open(entry, 'wb') as f:
+        f.write(b"not a graph")
+    assert cache.load(cycles.file_sha256(str(path))) is None
+    assert cycles.load_dependencies(str(path), cache)[1] == []
+    assert cache.load(cycles.file_sha256(str(path))) is not None
+
+
+def test_deep_chain_stays_clear_of_the_recursion_limit(cycles):
+    graph = cycles.DependencyGraph()
+    for i in range(20000):
+        graph.add_edge(task(i + 1), task(i))
+    graph.add_edge(task(0), task(20000))
+    cycle, = graph.find_cycles()
+    assert len(cycle) == 20002
+
+
+def test_csr_rows_are_sorted_and_deduplicated(cycles):
+    graph = cycles.DependencyGraph()
+    for from_task, to_task in [("A", "C"), ("A", "B"), ("A", "C"), ("B", "C")]:
+        graph.add_edge(from_task, to_task)
+    a, b, c = (graph.ids[name] for name in "ABC")
+    assert list(graph.dependencies(a)) == sorted([b, c])
+    assert graph.edge_count == 3
+    assert graph.has_edge(a, c) and not graph.has_edge(c, a)
+
+    # Adding after a freeze thaws the rows and keeps the existing edges
+    graph.add_edge("C", "D")
+    assert graph.edge_count == 4
+    assert graph.has_edge(c, graph.ids["D"]) and graph.has_edge(a, b)
+
+
+def test_one_pass_reads_every_syntax(cycles):
+    lines = [
+        "| Task | Depends On | Blocks |\n",
+        "|---|---|---|\n",
+        "| TASK-001 | TASK-002, see TASK-003 | TASK-009 |\n",
+        "| TASK-004 | None | TASK-001 |\n",
+        "- TASK-005 → TASK-006\n",
+        "- TASK-008 depends on TASK-001, TASK-004\n",
+        "- TASK-010 →\n",
+        "  TASK-011\n",
+    ]
+    assert list(cycles.iter_dependency_edges(lines)) == [
+        ("TASK-001", ["TASK-002", "TASK-003"]),
+        ("TASK-005", ["TASK-006"]),
+        ("TASK-008", ["TASK-001", "TASK-004"]),
+        ("TASK-010", ["TASK-011"]),
+    ]
+
+
+def test_exit_codes(run, tmp_path):
+    (tmp_path / "dag.md").write_text("- TASK-001 → TASK-002\n")
+    (tmp_path / "cyclic.md").write_text("- TASK-001 → TASK-002\n- TASK-002 depends on TASK-001\n")
+    assert run("check-cycles.py", "dag.md").returncode == 0
+    result = run("check-cycles.py", "cyclic.md")
+    assert result.returncode == 1
+    assert "TASK-001 → TASK-002 → TASK-001" in result.stdout
+
+    result = run("check-cycles.py", "missing.md")
+    assert result.returncode == 2
+    assert "File not found: missing.md" in result.stderr
+
+
+def test_watch_answers_each_edge(run, tmp_path):
+    (tmp_path / "dependencies.md").write_text("- TASK-001 → TASK-002\n")
+    result = run("check-cycles.py", "watch", "dependencies.md",
+                 input="TASK-002 depends on TASK-003, TASK-001\nnothing here\n- TASK-003 → TASK-004\n")
+    assert result.returncode == 0
+    assert result.stdout.splitlines() == [
+        "OK TASK-002 → TASK-003",
+        "CYCLE TASK-002 → TASK-001 → TASK-002",
+        "ERROR no dependency found: nothing here",
+        "OK TASK-003 → TASK-004",
+    ]
+
+
+def test_query_rebuilds_a_stale_index(run, tmp_path):
+    path = tmp_path / "dependencies.md"
+    path.write_text("- TASK-001 → TASK-002\n- TASK-002 → TASK-003\n")
+    assert run("check-cycles.py", "check", "dependencies.md", "--index").returncode == 0
+    assert (tmp_path / "dependencies.md.reach").exists()
+    assert run("check-cycles.py", "query", "dependencies.md", "--depends", "TASK-001", "TASK-003").returncode == 0
+
+    path.write_text("- TASK-001 → TASK-002\n- TASK-004 → TASK-003\n")
+    assert run("check-cycles.py", "query", "dependencies.md", "--depends", "TASK-001", "TASK-003").returncode == 1
+    result = run("check-cycles.py", "query", "dependencies.md", "--blocked-by", "TASK-003")
+    assert result.stdout.split() == ["TASK-004"]
+    assert run("check-cycles.py", "query", "dependencies.md", "--blockers", "TASK-009").returncode == 2
+
+
+@pytest.mark.parametrize("args", [
+    ["check", "missing.md"],
+    ["query", "missing.md", "--depends", "TASK-001", "TASK-002"],
+    ["query", "missing.md", "--blockers", "TASK-001"],
+    ["schedule", "missing.md"],
+    ["reduce", "missing.md"],
+])
+def test_missing_file_exits_2(run, args):
+    result = run("check-cycles.py", *args)
+    assert result.returncode == 2
+    assert "File not found: missing.md" in result.stderr
+    assert "Traceback" not in result.stderr
+
+
+def test_schedule_refuses_a_cyclic_plan(run, tmp_path):
+    (tmp_path / "dependencies.md").write_text("- TASK-001 → TASK-002\n- TASK-002 → TASK-001\n")
+    result = run("check-cycles.py", "schedule", "dependencies.md")
+    assert result.returncode == 1
+    assert "Cannot schedule" in result.stdout
+
+
+@pytest.mark.parametrize("args, message", [
+    (["schedule", "dependencies.md", "--workers", "0"], "--workers: must be at least 1"),
+    (["schedule", "dependencies.md", "--workers", "2", "-1"], "--workers: must be at least 1"),
+    (["check", "dependencies.md", "--jobs", "0"], "--jobs: must be at least 1"),
+])
+def test_counts_below_one_are_usage_errors(run, tmp_path, args, message):
+    (tmp_path / "dependencies.md").write_text("- TASK-001 → TASK-002\n")
+    result = run("check-cycles.py", *args)
+    assert result.returncode == 2
+    assert message in result.stderr
+
+
+def write_mono(tmp_path, api_line, web_line):
+    for project, line in (("api", api_line), ("web", web_line)):
+        (tmp_path / "mono" / project / ".ipe").mkdir(parents=True)
+        (tmp_path / "mono" / project / ".ipe" / "dependencies.md").write_text(line)
+
+
+def test_check_finds_a_cycle_across_projects(run, tmp_path):
+    write_mono(tmp_path, "- TASK-001 → mono/web:TASK-001\n", "- TASK-001 → mono/api:TASK-001\n")
+
+    result = run("check-cycles.py", "check", "mono", "--jobs", "2")
+    assert result.returncode == 1
+    assert "1 of 1 cycle(s) cross project boundaries" in result.stdout
+    assert "mono/api:TASK-001 → mono/web:TASK-001" in result.stdout
+
+
+@pytest.mark.parametrize("paths", [
+    ["mono"],
+    ["mono/api/.ipe/dependencies.md", "mono/web/.ipe/dependencies.md"],
+    ["mono/api", "mono/web/.ipe/dependencies.md"],
+    ["mono/**/dependencies.md"],
+])
+def test_project_names_do_not_depend_on_how_files_are_given(run, tmp_path, paths):
+    write_mono(tmp_path, "- TASK-001 → web:TASK-001\n", "- TASK-001 → api:TASK-001\n")
+
+    result = run("check-cycles.py", "check", *paths, "--root", "mono", "--no-cache")
+    assert result.returncode == 1
+    assert "api:TASK-001 → web:TASK-001 → api:TASK-001" in result.stdout
+
+
+def test_glob_patterns_reach_hidden_directories(cycles, tmp_path, monkeypatch):
+    for path in ("mono/api/.ipe", "mono/web", "mono/node_modules/pkg", "mono/a/b"):
+        (tmp_path / path).mkdir(parents=True)
+        (tmp_path / path / "dependencies.md").write_text("- TASK-001 → TASK-002\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert cycles.find_dependency_files(["mono/**/dependencies.md"]) == [
+        "mono/a/b/dependencies.md", "mono/api/.ipe/dependencies.md", "mono/web/dependencies.md"]
+    assert cycles.find_dependency_files(["mono/*/dependencies.md"]) == ["mono/web/dependencies.md"]
+    assert cycles.find_dependency_files(["mono/*/.*/*.md"]) == ["mono/api/.ipe/dependencies.md"]
+
+
+def test_project_root_defaults_to_the_git_toplevel(git, run, tmp_path):
+    write_mono(tmp_path, "- TASK-001 → mono/web:TASK-001\n", "- TASK-001 → mono/api:TASK-001\n")
+
+    result = run("check-cycles.py", "check", "api/.ipe/dependencies.md", "web", cwd=tmp_path / "mono")
+    assert result.returncode == 1
+    assert "mono/api:TASK-001 → mono/web:TASK-001" in result.stdout
+
+
+def test_reference_to_an_unknown_project_exits_2(run, tmp_path):
+    write_mono(tmp_path, "- TASK-001 → webb:TASK-001\n", "- TASK-001 → TASK-002\n")
+
+    result = run("check-cycles.py", "check", "mono", "--root", "mono")
+    assert result.returncode == 2
+    assert "References to unknown projects: webb" in result.stderr
+
+
+def test_file_outside_the_project_root_exits_2(run, tmp_path):
+    write_mono(tmp_path, "- TASK-001 → TASK-002\n", "- TASK-001 → TASK-002\n")
+
+    result = run("check-cycles.py", "check", "mono", "--root", "mono/api")
+    assert result.returncode == 2
+    assert "outside the project root" in result.stderr
+
+
+def test_reduce_keeps_reachability(cycles, run, tmp_path):
+    _, edges = random_graph(cycles, 30, 90, seed=4, acyclic=True)
+    rows = {}
+    for u, v in edges:
+        rows.setdefault(u, []).append(task(v))
+    path = tmp_path / "dependencies.md"
+    path.write_text("| Task | Depends On |\n|---|---|\n" +
+                    "".join(f"| {task(u)} | {', '.join(deps)} |\n" for u, deps in sorted(rows.items())))
+
+    result = run("check-cycles.py", "reduce", path, "--matrix", "--no-cache")
+    assert result.returncode == 0
+    reduced = cycles.build_dependency_graph(result.stdout.splitlines(keepends=True))
+    kept = {(int(reduced.names[u][5:]), int(reduced.names[v][5:]))
+            for u in range(reduced.task_count) for v in reduced.dependencies(u)}
+    assert reachable(30, kept) == reachable(30, edges)
+
+
+def write_edges(path, edges, rng):
+    lines = [f"- {task(u)} → {task(v)}\n" for u, v in edges]
+    rng.shuffle(lines)
+    path.write_text("# Dependencies\n\n" + "".join(lines))
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("committed", [False, True])
+def test_diff_edges_match_the_edge_sets(cycles, git, tmp_path, seed, committed):
+    rng = random.Random(seed)
+    path = tmp_path / "dependencies.md"
+    _, base_edges = random_graph(cycles, 40, 80, seed, acyclic=True)
+    write_edges(path, sorted(base_edges), rng)
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+
+    kept = {edge for edge in base_edges if rng.random() > 0.3}
+    _, extra = random_graph(cycles, 40, 20, seed + 100)
+    head_edges = kept | extra
+    write_edges(path, sorted(head_edges), rng)
+    head_rev = None
+    if committed:
+        git("commit", "-q", "-am", "head")
+        head_rev = "HEAD"
+    base_rev = "HEAD~1" if committed else "HEAD"
+
+    base = cycles.revision_graph(str(path), base_rev)
+    head = cycles.revision_graph(str(path), head_rev)
+    removed, added = cycles.edge_delta(str(path), base, head, base_rev, head_rev)
+    assert removed == sorted((task(u), task(v)) for u, v in base_edges - head_edges)
+    assert added == sorted((task(u), task(v)) for u, v in head_edges - base_edges)
+
+
+def test_diff_reports_introduced_and_resolved_cycles(git, run, tmp_path):
+    path = tmp_path / "dependencies.md"
+    path.write_text("- TASK-001 → TASK-002\n- TASK-002 → TASK-001\n- TASK-003 → TASK-004\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    path.write_text("- TASK-001 → TASK-002\n- TASK-003 → TASK-004\n- TASK-004 → TASK-003\n")
+
+    result = run("check-cycles.py", "diff", "dependencies.md", "HEAD", "--no-cache")
+    assert result.returncode == 1
+    assert "Resolved: TASK-002 → TASK-001 → TASK-002" in result.stdout
+    assert "Cycle 1: TASK-004 → TASK-003 → TASK-004" in result.stdout
+
+
+def test_diff_of_a_file_new_since_base_adds_every_edge(git, run, tmp_path):
+    (tmp_path / "dependencies.md").write_text("- TASK-001 → TASK-002\n- TASK-002 → TASK-001\n")
+
+    result = run("check-cycles.py", "diff", "dependencies.md", "HEAD", "--no-cache")
+    assert result.returncode == 1
+    assert "Edges added: 2" in result.stdout
+    assert "circular dependency cycle(s) introduced" in result.stdout
+
+
+def test_diff_of_an_unknown_revision_exits_2(git, run, tmp_path):
+    (tmp_path / "dependencies.md").write_text("- TASK-001 → TASK-002\n")
+    result = run("check-cycles.py", "diff", "dependencies.md", "no-such-revision")
+    assert result.returncode == 2
+    assert "Error comparing revisions" in result.stderr
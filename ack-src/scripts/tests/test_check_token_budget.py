@@ -0,0 +1,573 @@
+"""Tests for check-token-budget.py"""
+
+import base64
+import hashlib
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def write_vocab(path, tokens):
+    """A .tiktoken file: every single byte, then tokens in rank order"""
+    ranked = [bytes([b]) for b in range(256)] + list(tokens)
+    path.write_text("".join(f"{base64.b64encode(token).decode()} {rank}\n" for rank, token in enumerate(ranked)))
+    return str(path)
+
+
+# Tokenizers
+
+def test_bpe_counts_a_known_vocabulary(budget, tmp_path):
+    vocab = write_vocab(tmp_path / "small.tiktoken",
+                        [b"he", b"ll", b"hell", b"llo", b" w", b"or", b"ld", b" wor", b" world"])
+    tokenizer = budget.BPETokenizer(vocab)
+    # hello: he, ll, then hell beats llo -> hell + o; " world" merges fully
+    assert tokenizer.count("hello world") == 3
+    # " hello": the leading space never merges -> " " + hell + o
+    assert tokenizer.count("hello hello") == 5
+    assert tokenizer.name.startswith("bpe:small.tiktoken:")
+
+
+def train_merges(budget, corpus, merges):
+    """Byte-level BPE training: repeatedly merge the most frequent adjacent pair"""
+    words = Counter(tuple(bytes([b]) for b in piece.encode('utf-8'))
+                    for piece in budget.PRETOKENIZE_PATTERN.findall(corpus))
+    tokens = []
+    for _ in range(merges):
+        pairs = Counter()
+        for word, count in words.items():
+            for pair in zip(word, word[1:]):
+                pairs[pair] += count
+        if not pairs:
+            break
+        best = max(sorted(pairs), key=pairs.__getitem__)
+        tokens.append(best[0] + best[1])
+        merged = Counter()
+        for word, count in words.items():
+            out, i = [], 0
+            while i < len(word):
+                if word[i:i + 2] == best:
+                    out.append(best[0] + best[1])
+                    i += 2
+                else:
+                    out.append(word[i])
+                    i += 1
+            merged[tuple(out)] += count
+        words = merged
+    return tokens
+
+
+def apply_merges(piece, tokens):
+    """Reference encoder: apply each merge in training order, left to right"""
+    if piece in tokens:
+        return 1
+    parts = [bytes([b]) for b in piece]
+    for token in tokens:
+        i = 0
+        while i < len(parts) - 1:
+            if parts[i] + parts[i + 1] == token:
+                parts[i:i + 2] = [token]
+            i += 1
+    return len(parts)
+
+
+@pytest.mark.parametrize("text, pieces", [
+    # What tiktoken's cl100k pattern (\p{L}, \p{N}) gives
+    ("naïve café", ["naïve", " café"]),
+    (" Привет, мир!", [" Привет", ",", " мир", "!"]),
+    ("日本語のテキスト。", ["日本語のテキスト", "。"]),
+    ("12345678", ["123", "456", "78"]),
+    ("v1.25, x=٣٤٥٦", ["v", "1", ".", "25", ",", " x", "=", "٣٤٥", "٦"]),
+    ("Straße_x don't", ["Straße", "_x", " don", "'t"]),
+    ("a\n\n  b", ["a", "\n\n", " ", " b"]),
+])
+def test_pretokenizer_splits_like_cl100k(budget, text, pieces):
+    assert budget.PRETOKENIZE_PATTERN.findall(text) == pieces
+
+
+def test_bpe_merges_multibyte_tokens(budget, tmp_path):
+    vocab = write_vocab(tmp_path / "utf8.tiktoken",
+                        [b"ca", "é".encode(), b"caf", "café".encode(), "т".encode(), "с".encode(), "ст".encode()])
+    tokenizer = budget.BPETokenizer(vocab)
+    # café merges fully; " café" keeps its space; digits split 123 + 45
+    assert tokenizer.count("café café 12345") == 1 + 2 + 1 + 3 + 2
+    # т, с and then ст merge; е stays two bytes
+    assert tokenizer.count("тест") == 1 + 2 + 1
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_bpe_matches_training_order_merges(budget, tmp_path, seed):
+    rng = random.Random(seed)
+    lexicon = ["".join(rng.choice("abcde") for _ in range(rng.randint(1, 7))) for _ in range(60)]
+    corpus = " ".join(rng.choice(lexicon) for _ in range(3000))
+    tokens = train_merges(budget, corpus, 80)
+    tokenizer = budget.BPETokenizer(write_vocab(tmp_path / "trained.tiktoken", tokens))
+
+    text = " ".join(rng.choice(lexicon + ["edcba", "zz9", "a-b"]) for _ in range(500))
+    expected = sum(apply_merges(piece.encode('utf-8'), tokens)
+                   for piece in budget.PRETOKENIZE_PATTERN.findall(text))
+    assert tokenizer.count(text) == expected
+
+
+def test_auto_tokenizer_stays_offline_without_a_vocabulary(budget, tmp_path):
+    assert budget.get_tokenizer("auto").name == "heuristic"
+    assert budget.get_tokenizer("auto", str(tmp_path / "missing.tiktoken")).name == "heuristic"
+    vocab = write_vocab(tmp_path / "v.tiktoken", [b"ab"])
+    assert budget.get_tokenizer("auto", vocab).name.startswith("bpe:")
+    with pytest.raises(ValueError):
+        budget.get_tokenizer("bpe", str(tmp_path / "missing.tiktoken"))
+
+
+def test_counts_are_cached_per_tokenizer_and_content(budget, tmp_path):
+    class Counting:
+        def __init__(self, name):
+            self.name, self.calls = name, 0
+
+        def count(self, text):
+            self.calls += 1
+            return len(text)
+
+    cache = str(tmp_path / "counts.json")
+    first = Counting("bpe:a")
+    counter = budget.TokenCounter(first, cache)
+    assert counter.count("some text") == counter.count("some text") == 9
+    counter.save()
+
+    # A new run reads the saved count; another tokenizer counts for itself
+    again = Counting("bpe:a")
+    assert budget.TokenCounter(again, cache).count("some text") == 9
+    other = Counting("bpe:b")
+    assert budget.TokenCounter(other, cache).count("some text") == 9
+    assert (first.calls, again.calls, other.calls) == (1, 0, 1)
+
+
+def test_count_cache_keeps_the_most_recently_used(budget, tmp_path, monkeypatch):
+    monkeypatch.setattr(budget, 'MAX_CACHED_COUNTS', 3)
+    cache = tmp_path / "counts.json"
+    counter = budget.TokenCounter(budget.BPETokenizer(write_vocab(tmp_path / "v.tiktoken", [])), str(cache))
+    for text in ("a", "b", "c"):
+        counter.count(text)
+    counter.save()
+
+    counter = budget.TokenCounter(counter.tokenizer, str(cache))
+    counter.count("a")
+    counter.count("d")
+    counter.save()
+    kept = budget.TokenCounter(counter.tokenizer, str(cache)).counts
+    assert len(kept) == 3
+    assert {counter.tokenizer.name + ":" + hashlib.sha256(t.encode()).hexdigest()
+            for t in ("c", "a", "d")} == set(kept)
+
+
+# Import resolution
+
+def test_shared_imports_and_cycles_count_once(budget, tmp_path):
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n@a.md\n@b.md\n")
+    write(tmp_path / ".claude/a.md", "A" * 400 + "\n@c.md\n@b.md\n")
+    write(tmp_path / ".claude/b.md", "B" * 800 + "\n@a.md\n@c.md\n")
+    write(tmp_path / ".claude/c.md", "C" * 1200 + "\n")
+
+    tree = budget.load_context(str(tmp_path / ".claude/CLAUDE.md"))
+    assert len(tree.order) == 4
+    assert tree.total_tokens == sum(budget.estimate_tokens(f.content) for f in tree.files.values())
+    assert tree.cycles
+    assert tree.shared() == {str(tmp_path / ".claude" / name): 2 for name in ("a.md", "b.md", "c.md")}
+
+
+def test_symlinked_imports_are_read_once(budget, tmp_path):
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n@docs/guide.md\n@link.md\n")
+    write(tmp_path / ".claude/docs/guide.md", "G" * 4000)
+    os.symlink(tmp_path / ".claude/docs/guide.md", tmp_path / ".claude/link.md")
+
+    tree = budget.load_context(str(tmp_path / ".claude/CLAUDE.md"))
+    assert [path for path, _ in tree.imports] == [str(tmp_path / ".claude/docs/guide.md")]
+    assert tree.total_tokens == tree.core_tokens + 1000
+
+
+def test_imports_stop_at_the_depth_limit(budget, tmp_path):
+    depth = budget.MAX_IMPORT_DEPTH
+    write(tmp_path / ".claude/CLAUDE.md", "@0.md\n")
+    for i in range(depth + 1):
+        write(tmp_path / f".claude/{i}.md", f"@{i + 1}.md\n")
+
+    tree = budget.load_context(str(tmp_path / ".claude/CLAUDE.md"))
+    assert len(tree.imports) == depth
+    assert any("deeper than" in warning for warning in tree.warnings)
+
+
+def test_missing_imports_are_warnings(budget, tmp_path):
+    claude = write(tmp_path / ".claude/CLAUDE.md", "# Root\n@missing.md\n")
+    tree = budget.load_context(str(claude))
+    assert tree.imports == []
+    assert tree.warnings == [f"Import file not found: {tmp_path / '.claude/missing.md'}"]
+
+
+# Fast mode
+
+def test_fast_mode_reuses_unchanged_files_and_estimates_changed_ones(budget, tmp_path):
+    claude = write(tmp_path / ".claude/CLAUDE.md", "# Root\n@a.md\n")
+    write(tmp_path / ".claude/a.md", "alpha " * 100)
+    index_path = str(tmp_path / "stat-index.json")
+    stat_index = budget.StatIndex(index_path)
+    exact = budget.load_context(str(claude), budget.ImportResolver(stat_index=stat_index))
+    stat_index.save()
+
+    fast = budget.load_context(str(claude), budget.ImportResolver(stat_index=budget.StatIndex(index_path), fast=True))
+    assert fast.estimated == []
+    assert fast.total_tokens == exact.total_tokens
+
+    # A changed file is estimated from its size, and its new imports are followed
+    write(tmp_path / ".claude/a.md", "beta " * 400 + "\n@b.md\n")
+    write(tmp_path / ".claude/b.md", "gamma " * 10)
+    fast = budget.load_context(str(claude), budget.ImportResolver(stat_index=budget.StatIndex(index_path), fast=True))
+    a, b = (str(tmp_path / ".claude" / name) for name in ("a.md", "b.md"))
+    assert fast.estimated == [a, b]
+    assert fast.files[a].tokens == round(os.path.getsize(a) / budget.CHARS_PER_TOKEN)
+
+
+def test_fast_estimate_near_a_budget_is_counted_exactly(run, tmp_path):
+    write(tmp_path / ".claude/CLAUDE.md", "x" * (4 * 20500))
+    result = run("check-token-budget.py", "--fast")
+    assert "--fast estimate was near a budget; counted exactly" in result.stdout
+
+
+# Import plans
+
+def test_import_choices_treat_shared_files_as_fixed(budget, tmp_path):
+    claude = write(tmp_path / ".claude/CLAUDE.md",
+                   "# Root\n@a.md <!-- priority: 8 -->\n@b.md\n@c.md <!-- priority: required -->\n")
+    write(tmp_path / ".claude/a.md", "A" * 400 + "\n@shared.md\n@only-a.md\n")
+    write(tmp_path / ".claude/b.md", "B" * 800 + "\n@shared.md\n")
+    write(tmp_path / ".claude/c.md", "C" * 40)
+    write(tmp_path / ".claude/shared.md", "S" * 4000)
+    write(tmp_path / ".claude/only-a.md", "O" * 1200)
+    tree = budget.load_context(str(claude))
+
+    choices, fixed = budget.import_choices(tree)
+    summary = {os.path.basename(c.path): (c.tokens, c.priority, c.required) for c in choices}
+    a, b = tree.files[str(tmp_path / ".claude/a.md")].tokens, tree.files[str(tmp_path / ".claude/b.md")].tokens
+    assert summary == {
+        "a.md": (a + 300, 8, False),
+        "b.md": (b, budget.DEFAULT_PRIORITY, False),
+        "c.md": (10, budget.DEFAULT_PRIORITY, True),
+    }
+    assert fixed == tree.total_tokens - sum(c.tokens for c in choices)
+
+
+def brute_force_priority(choices, capacity):
+    best = 0
+    for size in range(len(choices) + 1):
+        for subset in itertools.combinations(choices, size):
+            if sum(c.tokens for c in subset) <= capacity:
+                best = max(best, sum(c.priority for c in subset))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_select_imports_is_optimal(budget, seed):
+    rng = random.Random(seed)
+    choices = [budget.ImportChoice(f"{i}.md", f"@{i}.md", rng.randint(100, 5000), rng.randint(0, 10))
+               for i in range(rng.randint(1, 10))]
+    capacity = rng.randint(0, sum(c.tokens for c in choices))
+
+    kept, exact = budget.select_imports(choices, capacity)
+    assert exact
+    assert sum(choices[i].tokens for i in kept) <= capacity
+    assert sum(choices[i].priority for i in kept) == brute_force_priority(choices, capacity)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_greedy_selection_is_within_half_of_optimal(budget, monkeypatch, seed):
+    monkeypatch.setattr(budget, 'EXACT_SELECTION_LIMIT', 0)
+    rng = random.Random(seed)
+    choices = [budget.ImportChoice(f"{i}.md", f"@{i}.md", rng.randint(100, 5000), rng.randint(0, 10))
+               for i in range(rng.randint(1, 10))]
+    capacity = rng.randint(0, sum(c.tokens for c in choices))
+
+    kept, exact = budget.select_imports(choices, capacity)
+    assert not exact
+    assert sum(choices[i].tokens for i in kept) <= capacity
+    assert 2 * sum(choices[i].priority for i in kept) >= brute_force_priority(choices, capacity)
+
+
+@pytest.fixture
+def over_target(tmp_path):
+    """A project of ~22,500 tokens: over target, within warning"""
+    write(tmp_path / ".claude/CLAUDE.md", "# Project\n@docs/one.md <!-- priority: 2 -->\n@docs/two.md\n")
+    write(tmp_path / ".claude/docs/one.md", "word " * 12000)
+    write(tmp_path / ".claude/docs/two.md", "word " * 6000)
+    return tmp_path
+
+
+def test_plan_says_nothing_to_drop_when_already_within_budget(run, over_target):
+    result = run("check-token-budget.py", "--plan-budget", "warning", "--no-cache")
+    assert "Already within the warning budget" in result.stdout
+    assert "cannot reach" not in result.stdout
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_plan_drops_the_low_priority_import(run, over_target, fast):
+    result = run("check-token-budget.py", *(["--fast"] if fast else []))
+    assert "Comment out in CLAUDE.md:" in result.stdout
+    assert "# @docs/one.md <!-- priority: 2 -->" in result.stdout
+    assert "cannot reach" not in result.stdout
+    if fast:
+        assert "estimated from size, --fast" in result.stdout
+
+
+# Heatmap
+
+def test_sections_follow_headings_outside_code_fences(budget):
+    content = ("intro " * 10 + "\n"
+               "# Guide\n" + "g" * 40 + "\n"
+               "## Setup\n```\n# not a heading\n```\n"
+               "# @docs/old.md\n"
+               "## Usage\n" + "u" * 400 + "\n"
+               "# Reference\n")
+    sections = budget.file_sections("CLAUDE.md", content, budget.HeuristicTokenizer())
+    assert [(s.heading, s.level, s.line) for s in sections] == [
+        ("(preamble)", 0, 1), ("Guide", 1, 2), ("Guide > Setup", 2, 4),
+        ("Guide > Usage", 2, 9), ("Reference", 1, 11),
+    ]
+    assert sum(s.tokens for s in sections) <= budget.estimate_tokens(content)
+    assert sections[3].tokens == budget.estimate_tokens("## Usage\n" + "u" * 400 + "\n")
+
+
+def test_heatmap_json_covers_every_loaded_file(run, tmp_path):
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n" + "r" * 40 + "\n@docs/a.md\n")
+    write(tmp_path / ".claude/docs/a.md", "# A\n" + "a" * 400 + "\n## A2\n" + "b" * 80 + "\n")
+
+    result = run("check-token-budget.py", "--heatmap", "json")
+    assert result.returncode == 0
+    heatmap = json.loads(result.stdout)
+    headings = [(section["file"], section["heading"]) for section in heatmap["sections"]]
+    assert headings == [(".claude/docs/a.md", "A"), (".claude/docs/a.md", "A > A2"), (".claude/CLAUDE.md", "Root")]
+    assert heatmap["total_tokens"] == sum(section["tokens"] for section in heatmap["sections"])
+
+
+# Duplicates
+
+def test_minhash_agreement_estimates_jaccard(budget):
+    rng = random.Random(7)
+    errors = []
+    for shared in (10, 100, 300, 500):
+        common = {rng.getrandbits(64) for _ in range(shared)}
+        a = common | {rng.getrandbits(64) for _ in range(500 - shared)}
+        b = common | {rng.getrandbits(64) for _ in range(500 - shared)}
+        sig_a, sig_b = budget.minhash_signature(a), budget.minhash_signature(b)
+        estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+        errors.append(abs(estimate - len(a & b) / len(a | b)))
+    assert max(errors) < 0.25
+
+
+def test_shingle_hashes_are_the_same_in_every_process(budget):
+    text = "Run the full test suite before every commit, then push."
+    code = (f"import sys; sys.path.insert(0, {os.path.dirname(__file__)!r}); "
+            "from conftest import load_script; "
+            f"print(sorted(load_script('check-token-budget.py').shingles({text!r})))")
+    outputs = {subprocess.run([sys.executable, "-c", code], env={**os.environ, "PYTHONHASHSEED": seed},
+                              capture_output=True, text=True, check=True).stdout
+               for seed in ("1", "2")}
+    assert outputs == {f"{sorted(budget.shingles(text))}\n"}
+
+
+def test_find_duplicates_matches_pairwise_jaccard(budget, tmp_path):
+    rng = random.Random(11)
+    lexicon = [f"w{i}" for i in range(3000)]
+    originals = [[rng.choice(lexicon) for _ in range(80)] for _ in range(25)]
+    copies = []
+    for words in originals[:15]:
+        words = list(words)
+        words[rng.randrange(80)] = rng.choice(lexicon)
+        copies.append(words)
+    copies += originals[15:18]  # exact copies
+
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n\n@a.md\n@b.md\n")
+    write(tmp_path / ".claude/a.md", "\n\n".join(" ".join(words) for words in originals) + "\n")
+    write(tmp_path / ".claude/b.md", "\n\n".join(" ".join(words) for words in copies) + "\n")
+    tree = budget.load_context(str(tmp_path / ".claude/CLAUDE.md"))
+    groups = budget.find_duplicates(tree, budget.HeuristicTokenizer())
+
+    paragraphs = [p for path in tree.order for p in budget.iter_paragraphs(path, tree.files[path].content)]
+    sets = [budget.shingles(p.text) for p in paragraphs]
+    parent = list(range(len(paragraphs)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i, j in itertools.combinations(range(len(paragraphs)), 2):
+        if len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= budget.DUPLICATE_SIMILARITY:
+            parent[find(j)] = find(i)
+    expected = {}
+    for i, p in enumerate(paragraphs):
+        expected.setdefault(find(i), set()).add((p.path, p.line))
+
+    found = {frozenset((p.path, p.line) for p in group.paragraphs) for group in groups}
+    assert found == {frozenset(members) for members in expected.values() if len(members) > 1}
+    assert len(found) == 18
+
+
+# Bundles
+
+def test_flatten_inlines_each_import_once(budget, tmp_path):
+    claude = write(tmp_path / ".claude/CLAUDE.md", "# Root\n@a.md\n@b.md\n@missing.md\n")
+    write(tmp_path / ".claude/a.md", "alpha\n@b.md\n")
+    write(tmp_path / ".claude/b.md", "beta")
+    tree = budget.load_context(str(claude))
+
+    assert budget.flatten_context(tree) == (
+        "# Root\n"
+        "<!-- @import a.md -->\n"
+        "alpha\n"
+        "<!-- @import b.md -->\n"
+        "beta\n"
+        "<!-- end @import b.md -->\n"
+        "<!-- end @import a.md -->\n"
+        "<!-- @import b.md (included above) -->\n"
+        "<!-- @import missing.md (not loaded) -->\n"
+    )
+
+
+def test_bundle_goes_stale_when_a_source_changes(budget, tmp_path):
+    claude = write(tmp_path / ".claude/CLAUDE.md", "# Root\n@docs/a.md\n@docs/later.md\n")
+    source = write(tmp_path / ".claude/docs/a.md", "alpha " * 50)
+    bundle = str(tmp_path / "bundle.md")
+
+    tree = budget.load_context(str(claude))
+    budget.compile_bundle(tree, bundle, budget.TokenCounter(budget.HeuristicTokenizer()))
+    assert budget.bundle_is_fresh(bundle, str(claude), "heuristic")
+
+    source.write_text("beta " * 60)
+    assert not budget.bundle_is_fresh(bundle, str(claude), "heuristic")
+
+    counter = budget.TokenCounter()
+    budget.compile_bundle(budget.load_context(str(claude)), bundle, counter)
+    assert budget.bundle_is_fresh(bundle, str(claude), counter.tokenizer.name)
+    # An import that was missing now exists
+    write(tmp_path / ".claude/docs/later.md", "later")
+    assert not budget.bundle_is_fresh(bundle, str(claude), counter.tokenizer.name)
+
+
+def test_bundle_freshness_checks_sources_root_and_tokenizer(budget, tmp_path):
+    claude = write(tmp_path / ".claude/CLAUDE.md", "# Root\n@docs/a.md\n")
+    write(tmp_path / ".claude/docs/a.md", "alpha " * 50)
+    other = write(tmp_path / "other/.claude/CLAUDE.md", "# Other\n@../../.claude/docs/a.md\n")
+    bundle = budget.default_bundle_path(str(claude))
+    assert bundle == str(tmp_path / ".claude" / budget.DEFAULT_BUNDLE)
+
+    tree = budget.load_context(str(claude))
+    budget.compile_bundle(tree, bundle, budget.TokenCounter(budget.HeuristicTokenizer()))
+    assert budget.bundle_is_fresh(bundle, str(claude), "heuristic")
+    assert not budget.bundle_is_fresh(bundle, str(claude), "bpe:other")
+    assert not budget.bundle_is_fresh(bundle, str(other), "heuristic")
+
+
+def test_compile_then_check_bundle(run, tmp_path):
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n@a.md\n")
+    write(tmp_path / ".claude/a.md", "alpha\n")
+    assert run("check-token-budget.py", "--check-bundle").returncode == 1
+
+    result = run("check-token-budget.py", "--compile")
+    assert result.returncode == 0
+    assert "alpha" in (tmp_path / ".claude/CLAUDE.bundle.md").read_text()
+    assert run("check-token-budget.py", "--check-bundle").returncode == 0
+    assert "Bundle is up to date" in run("check-token-budget.py", "--compile").stdout
+
+
+def test_check_bundle_ignores_the_size_of_an_up_to_date_bundle(run, tmp_path):
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n@a.md\n")
+    write(tmp_path / ".claude/a.md", "alpha " * 25000)
+    assert run("check-token-budget.py", "--compile").returncode == 1
+
+    result = run("check-token-budget.py", "--check-bundle")
+    assert result.returncode == 0
+    assert "Bundle is up to date" in result.stdout
+    assert "exceeds the warning budget" in result.stdout
+    # Recompiling is skipped, but the overrun is still reported
+    assert run("check-token-budget.py", "--compile").returncode == 1
+
+
+def test_default_bundle_goes_beside_the_given_claude_md(run, tmp_path):
+    write(tmp_path / "project/.claude/CLAUDE.md", "# Root\n")
+    assert run("check-token-budget.py", "project/.claude/CLAUDE.md", "--check-bundle").returncode == 1
+
+    result = run("check-token-budget.py", "project/.claude/CLAUDE.md", "--compile")
+    assert result.returncode == 0
+    assert (tmp_path / "project/.claude/CLAUDE.bundle.md").exists()
+    assert not (tmp_path / ".claude").exists()
+    assert run("check-token-budget.py", "project/.claude/CLAUDE.md", "--check-bundle").returncode == 0
+
+
+# Audits
+
+def test_audit_reads_shared_imports_once(budget, tmp_path):
+    write(tmp_path / "rules.md", "shared rules " * 100)
+    for i in range(12):
+        write(tmp_path / f"p{i}/.claude/CLAUDE.md", f"# Project {i}\n@../../rules.md\n")
+
+    class Counting(budget.HeuristicTokenizer):
+        name = "counting"
+        texts = []
+
+        def count(self, text):
+            self.texts.append(text)
+            return super().count(text)
+
+    tokenizer = Counting()
+    resolver = budget.ImportResolver(counter=budget.TokenCounter(tokenizer))
+    files = budget.find_claude_files([str(tmp_path)])
+    report = budget.audit_report([str(tmp_path)], files, resolver, resolver, jobs=8)
+
+    assert report['summary']['projects'] == 12
+    assert tokenizer.texts.count("shared rules " * 100) == 1
+    assert report['shared_imports'] == [{'path': "rules.md", 'tokens': 325, 'projects': 12}]
+
+
+def test_audit_exit_codes(run, tmp_path):
+    write(tmp_path / "small/.claude/CLAUDE.md", "# Small\n")
+    result = run("check-token-budget.py", "--audit", ".")
+    assert result.returncode == 0
+    assert json.loads(result.stdout)['summary']['over_target'] == 0
+
+    write(tmp_path / "large/.claude/CLAUDE.md", "x" * 4 * 35000)
+    result = run("check-token-budget.py", "--audit", ".", "--jobs", "2")
+    assert result.returncode == 1
+    assert json.loads(result.stdout)['outliers'] == ["large"]
+
+
+def test_audit_counts_each_project_once(budget, run, tmp_path, monkeypatch):
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n")
+    write(tmp_path / "other/.claude/CLAUDE.md", "# Other\n")
+    monkeypatch.chdir(tmp_path)
+    assert len(budget.find_claude_files([".", "other", "./other/"])) == 2
+
+    result = run("check-token-budget.py", "--audit", ".", "other")
+    report = json.loads(result.stdout)
+    assert report['summary']['projects'] == 2
+    assert sorted(entry['project'] for entry in report['projects']) == [".", "other"]
+
+
+def test_audit_jobs_below_one_is_a_usage_error(run, tmp_path):
+    write(tmp_path / ".claude/CLAUDE.md", "# Root\n")
+    result = run("check-token-budget.py", "--audit", ".", "--jobs", "0")
+    assert result.returncode == 2
+    assert "--jobs: must be at least 1" in result.stderr
+
+
+def test_audit_without_projects_exits_2(run, tmp_path):
+    result = run("check-token-budget.py", "--audit", "nowhere")
+    assert result.returncode == 2
+    assert "No .claude/CLAUDE.md found" in result.stderr
@@ -0,0 +1,113 @@
+"""Tests for coverage-check.py"""
+
+import json
+import random
+import re
+
+import pytest
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def make_project(root, requirements, architecture="", tasks=""):
+    write(root / ".ipe/discovery/requirements.md",
+          "# Requirements\n\n" + "".join(f"## {req_id}: Requirement {req_id}\n\nText.\n\n" for req_id in requirements))
+    write(root / ".ipe/solution-design/architecture.md", architecture)
+    write(root / ".ipe/implementation/tasks.md", tasks)
+    return root
+
+
+def brute_force_task_index(content):
+    """Per reference: its "### TASK-XXX:" section, and the first task named before it on the line"""
+    index = {}
+    section = None
+    for line in content.split('\n'):
+        header = re.match(r'###\s+(TASK-\d+):', line)
+        if header:
+            section = header.group(1)
+        for ref in re.finditer(r'\b(?:REQ|R)-(\d+)\b', line):
+            named = re.search(r'\bTASK-\d+\b', line[:ref.start()])
+            tasks = index.setdefault('R-' + ref.group(1), [])
+            for task_id in (section, named and named.group(0)):
+                if task_id and task_id not in tasks:
+                    tasks.append(task_id)
+    return index
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_task_index_matches_a_line_by_line_scan(coverage, seed):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(200):
+        kind = rng.random()
+        if kind < 0.1:
+            lines.append(f"### TASK-{rng.randint(1, 30)}: Something")
+        else:
+            words = [rng.choice(["do", "the", f"TASK-{rng.randint(1, 30)}", f"R-{rng.randint(1, 40)}",
+                                 f"REQ-{rng.randint(1, 40)}", f"R-{rng.randint(1, 40)}0"])
+                     for _ in range(rng.randint(0, 6))]
+            lines.append(" ".join(words))
+    content = "\n".join(lines)
+    assert coverage.index_task_references(content) == brute_force_task_index(content)
+
+
+def test_references_match_exact_ids(coverage, tmp_path):
+    doc = write(tmp_path / "architecture.md",
+                "Intro R-1\n# Auth\nCovers REQ-1 and R-10.\n## Storage\nR-100, R-1\n")
+    index = coverage.index_design_references([str(doc), str(tmp_path / "missing.md")])
+    assert index == {
+        'R-1': [('architecture.md', ''), ('architecture.md', 'Auth'), ('architecture.md', 'Storage')],
+        'R-10': [('architecture.md', 'Auth')],
+        'R-100': [('architecture.md', 'Storage')],
+    }
+
+
+def test_check_projects_reuses_unchanged_results(coverage, tmp_path):
+    roots = []
+    for i in range(3):
+        roots.append(str(make_project(tmp_path / f"p{i}", ["R-001", "R-002"],
+                                      architecture="# Auth\nR-001 R-002\n",
+                                      tasks="### TASK-001: Build\nR-001\n")))
+    args = (coverage.DEFAULT_REQUIREMENTS, coverage.DEFAULT_DESIGN_DOCS, coverage.DEFAULT_TASKS)
+
+    first = coverage.check_projects(roots, *args, jobs=2)
+    assert [result['cached'] for result in first] == [False] * 3
+    assert all(result['not_covered'] == [] and result['partially_covered'] == ['R-002'] for result in first)
+
+    write(tmp_path / "p1/.ipe/implementation/tasks.md", "### TASK-001: Build\nR-001\n### TASK-002: More\nR-002\n")
+    second = coverage.check_projects(roots, *args, jobs=2)
+    assert [result['cached'] for result in second] == [True, False, True]
+    assert second[1]['fully_covered'] == 2
+
+
+def test_batch_reports_a_missing_requirements_file(run, tmp_path):
+    make_project(tmp_path / "good", ["R-001"], architecture="R-001\n", tasks="### TASK-001: x\nR-001\n")
+    (tmp_path / "empty").mkdir()
+
+    result = run("coverage-check.py", "good", "empty", "--json", "--no-cache")
+    assert result.returncode == 2
+    results = {r['root']: r for r in json.loads(result.stdout)}
+    assert results['good']['fully_covered'] == 1
+    assert "not found" in results['empty']['error']
+
+
+@pytest.mark.parametrize("jobs", ["0", "-2"])
+def test_jobs_below_one_is_a_usage_error(run, tmp_path, jobs):
+    result = run("coverage-check.py", "a", "b", "--jobs", jobs)
+    assert result.returncode == 2
+    assert "--jobs/-j: must be at least 1" in result.stderr
+
+
+def test_single_project_exit_codes(run, tmp_path):
+    assert run("coverage-check.py").returncode == 2
+
+    make_project(tmp_path, ["R-001", "R-002"], architecture="# A\nR-001\n", tasks="### TASK-001: x\nR-001\n")
+    assert run("coverage-check.py").returncode == 1
+
+    write(tmp_path / ".ipe/implementation/tasks.md", "### TASK-001: x\nR-001 R-002\n")
+    write(tmp_path / ".ipe/solution-design/architecture.md", "# A\nR-001 REQ-002\n")
+    assert run("coverage-check.py").returncode == 0
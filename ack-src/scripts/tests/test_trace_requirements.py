@@ -0,0 +1,261 @@
+"""Tests for trace-requirements.py"""
+
+import csv
+import io
+import json
+import random
+from collections import Counter
+
+import pytest
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def random_project(trace, root, rng):
+    """Write requirements and every artifact with random sections and references"""
+    requirements = sorted(rng.sample(range(1, 30), 12))
+    write(root / trace.REQUIREMENTS_PATH,
+          "# Requirements\n\n" + "".join(f"## R-{i:03d}: Requirement {i}\n\n" for i in requirements))
+    for name, path in trace.ARTIFACTS.items():
+        if rng.random() < 0.15:
+            (root / path).unlink(missing_ok=True)
+            continue
+        sections = []
+        for k in range(rng.randint(0, 6)):
+            refs = " ".join(f"R-{rng.randrange(1, 30):03d}" for _ in range(rng.randint(0, 3)))
+            header = f"### TASK-{k:03d}: Task {k}" if name == 'tasks' else f"## {name} section {k}"
+            sections.append(f"{header}\n\nCovers {refs}\n")
+        write(root / path, "\n".join(sections))
+
+
+def brute_force_delta(trace, read_base, read_head):
+    """Every requirement whose declaration or references differ, with its statuses"""
+    expected = {}
+    sides = []
+    for read in (read_base, read_head):
+        requirements = trace.parse_requirements(read)
+        index = trace.build_index(read)
+        sides.append({req_id: {name: index[name].get(req_id, []) for name in trace.ARTIFACTS}
+                      for req_id in requirements})
+    base, head = sides
+    for req_id in set(base) | set(head):
+        before, after = base.get(req_id), head.get(req_id)
+        if before is None or after is None or any(set(before[n]) != set(after[n]) for n in trace.ARTIFACTS):
+            expected[req_id] = ("added" if before is None else trace.trace_status(before),
+                                trace.trace_status(after))
+    return expected
+
+
+def test_sections_and_exact_references(trace):
+    content = "Intro R-001\n# Auth\nR-001 and REQ-001, not R-0010\n## Login\nR-002\n## Empty\n"
+    assert trace.split_sections('architecture', content) == [
+        ("Auth", ["R-001", "R-0010"]), ("Login", ["R-002"]), ("Empty", [])]
+    assert trace.index_artifact('architecture', content) == {'R-001': ["Auth"], 'R-0010': ["Auth"], 'R-002': ["Login"]}
+    tasks = "### TASK-001: Build\nR-001\n### TASK-002: Test\nR-001 R-003\n"
+    assert trace.index_artifact('tasks', tasks) == {'R-001': ['TASK-001', 'TASK-002'], 'R-003': ['TASK-002']}
+    assert trace.index_artifact('tasks', None) == {}
+
+
+def test_index_reads_each_artifact_once(trace):
+    reads = []
+    contents = {trace.ARTIFACTS['architecture']: "# Auth\nR-001\n", trace.ARTIFACTS['tasks']: "### TASK-001: x\nR-001\n"}
+
+    def read(path):
+        reads.append(path)
+        return contents.get(path)
+
+    index = trace.build_index(read)
+    assert sorted(reads) == sorted(trace.ARTIFACTS.values())
+    traced, untraced = trace.generate_traces({'R-001': "Login", 'R-002': "Logout"}, index)
+    assert (traced.architecture_refs, traced.task_refs, traced.fully_traced) == (["Auth"], ["TASK-001"], True)
+    assert not untraced.fully_traced
+
+
+def make_traces(trace, count):
+    return [trace.TraceLink(f"R-{i:03d}", f"Requirement {i}", ["Auth"] if i % 2 else [], [], [],
+                            ["TASK-001"] if i % 3 else [], bool(i % 2 and i % 3))
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("count", [0, 1, 7])
+def test_emitters_write_each_trace_as_it_arrives(trace, count):
+    traces = make_traces(trace, count)
+    expected = (sum(t.fully_traced for t in traces), count)
+
+    for name in ("json", "ndjson", "csv"):
+        out = io.StringIO()
+
+        def produce():
+            for i, link in enumerate(traces):
+                if i:
+                    # The previous trace has been written before this one is asked for
+                    assert traces[i - 1].requirement_id in out.getvalue()
+                yield link
+
+        assert trace.OUTPUT_FORMATS[name](produce(), out) == expected
+        text = out.getvalue()
+        if name == "json":
+            document = json.loads(text)
+            assert document["traces"] == [t.to_dict() for t in traces]
+            assert document["total_requirements"] == count
+        elif name == "ndjson":
+            assert [json.loads(line) for line in text.splitlines()] == [t.to_dict() for t in traces]
+        else:
+            rows = list(csv.reader(io.StringIO(text)))
+            assert [row[0] for row in rows[1:]] == [t.requirement_id for t in traces]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_store_answers_match_the_in_memory_index(trace, tmp_path, monkeypatch, seed):
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(seed)
+    store = trace.TraceStore(str(tmp_path / "trace.db"))
+    try:
+        for _ in range(3):
+            random_project(trace, tmp_path, rng)
+            store.refresh()
+            requirements = trace.parse_requirements()
+            index = trace.build_index()
+            for req_id in requirements:
+                assert [title for _, title in store.requirement_sections(req_id, ['tasks'])] == \
+                    index['tasks'].get(req_id, [])
+            untraced = {req_id for req_id, *_ in store.untraced_requirements()}
+            assert untraced == {t.requirement_id for t in trace.iter_traces(requirements, index) if not t.fully_traced}
+        assert store.refresh() == []
+    finally:
+        store.close()
+
+
+def test_query_refreshes_changed_artifacts(run, tmp_path):
+    write(tmp_path / ".ipe/discovery/requirements.md", "## R-001: Login\n## R-002: Logout\n")
+    write(tmp_path / ".ipe/implementation/tasks.md", "### TASK-001: Build\nR-001\n")
+    assert "Re-indexed" in run("trace-requirements.py", "index").stdout
+    assert run("trace-requirements.py", "query", "tasks", "REQ-001").stdout.split() == ["TASK-001"]
+
+    write(tmp_path / ".ipe/implementation/tasks.md", "### TASK-001: Build\nR-001\n### TASK-002: Ship\nR-001\n")
+    result = run("trace-requirements.py", "query", "--format", "json", "tasks", "R-001")
+    assert json.loads(result.stdout) == [{"task": "TASK-001"}, {"task": "TASK-002"}]
+    assert "is up to date" in run("trace-requirements.py", "index").stdout
+
+
+def test_store_defaults_to_one_database_per_project_in_the_cache(run, tmp_path):
+    for project in ("a", "b"):
+        write(tmp_path / project / ".ipe/discovery/requirements.md", "## R-001: Login\n")
+        assert "Re-indexed" in run("trace-requirements.py", "index", cwd=tmp_path / project).stdout
+        assert list((tmp_path / project / ".ipe").iterdir()) == [tmp_path / project / ".ipe/discovery"]
+
+    assert len(list((tmp_path / "cache/ack/trace-requirements").glob("*.db"))) == 2
+    assert "is up to date" in run("trace-requirements.py", "index", cwd=tmp_path / "a").stdout
+
+
+def test_json_matrix_and_exit_code(run, tmp_path):
+    write(tmp_path / ".ipe/discovery/requirements.md", "## R-001: Login\n## R-002: Logout\n")
+    write(tmp_path / ".ipe/solution-design/architecture.md", "# Auth\nR-001 R-002\n")
+    write(tmp_path / ".ipe/implementation/tasks.md", "### TASK-001: Build\nR-001\n")
+
+    result = run("trace-requirements.py", "--format", "json")
+    assert result.returncode == 1
+    matrix = json.loads(result.stdout)
+    assert [t["requirement_id"] for t in matrix["traces"]] == ["R-001", "R-002"]
+    assert [t["fully_traced"] for t in matrix["traces"]] == [True, False]
+
+
+def test_matrix_without_requirements_exits_2(run):
+    result = run("trace-requirements.py")
+    assert result.returncode == 2
+    assert "No requirements found" in result.stderr
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("committed", [False, True])
+def test_diff_matches_a_full_comparison(trace, git, tmp_path, monkeypatch, seed, committed):
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(seed)
+    random_project(trace, tmp_path, rng)
+    git("add", "-A")
+    git("commit", "-q", "-m", "base")
+    random_project(trace, tmp_path, rng)
+    head = None
+    if committed:
+        git("add", "-A")
+        git("commit", "-q", "-m", "head")
+        head = "HEAD"
+    base = "HEAD~1" if committed else "HEAD"
+
+    deltas, _ = trace.trace_delta(base, head)
+    expected = brute_force_delta(trace, trace.revision_reader(base), trace.revision_reader(head))
+    assert {d.requirement_id: (d.before, d.after) for d in deltas} == expected
+
+
+def test_diff_counts_an_untracked_artifact_as_changed(trace, git, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / trace.REQUIREMENTS_PATH, "## R-001: Login\n")
+    git("add", "-A")
+    git("commit", "-q", "-m", "requirements")
+    write(tmp_path / trace.ARTIFACTS['tasks'], "### TASK-001: Build\nR-001\n")
+
+    deltas, changed = trace.trace_delta("HEAD", None)
+    assert changed == {'tasks'}
+    assert [(d.requirement_id, d.gained) for d in deltas] == [("R-001", {'tasks': ["TASK-001"]})]
+
+
+def test_diff_reads_unchanged_artifacts_once_and_only_when_needed(trace, git, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / trace.REQUIREMENTS_PATH, "## R-001: Login\n## R-002: Logout\n")
+    write(tmp_path / trace.ARTIFACTS['architecture'], "# Auth\nR-001 R-002\n")
+    write(tmp_path / trace.ARTIFACTS['tasks'], "### TASK-001: Build\nR-001\n")
+    git("add", "-A")
+    git("commit", "-q", "-m", "base")
+
+    reads = Counter()
+    revision_reader = trace.revision_reader
+
+    def counting_reader(rev):
+        read = revision_reader(rev)
+        return lambda path: reads.update([path]) or read(path)
+    monkeypatch.setattr(trace, 'revision_reader', counting_reader)
+
+    tasks = trace.ARTIFACTS['tasks']
+    write(tmp_path / tasks, "### TASK-001: Build\nR-001\n### TASK-002: Ship\nR-002\n")
+    deltas, changed = trace.trace_delta("HEAD", None)
+    assert changed == {'tasks'}
+    assert [(d.requirement_id, d.after) for d in deltas] == [("R-002", "fully traced")]
+    assert reads == {trace.REQUIREMENTS_PATH: 1, tasks: 2,
+                     **{path: 1 for name, path in trace.ARTIFACTS.items() if name != 'tasks'}}
+
+    # A change that touches no reference reads nothing else
+    reads.clear()
+    write(tmp_path / tasks, "### TASK-001: Build the login form\nR-001\n")
+    assert trace.trace_delta("HEAD", None) == ([], {'tasks'})
+    assert reads == {trace.REQUIREMENTS_PATH: 1, tasks: 2}
+
+
+def test_diff_reports_a_lost_full_trace(run, git, tmp_path):
+    write(tmp_path / ".ipe/discovery/requirements.md", "## R-001: Login\n")
+    write(tmp_path / ".ipe/solution-design/architecture.md", "# Auth\nR-001\n")
+    write(tmp_path / ".ipe/implementation/tasks.md", "### TASK-001: Build\nR-001\n")
+    git("add", "-A")
+    git("commit", "-q", "-m", "traced")
+    write(tmp_path / ".ipe/implementation/tasks.md", "### TASK-001: Build\n")
+
+    result = run("trace-requirements.py", "diff", "HEAD", "--format", "json")
+    assert result.returncode == 1
+    delta, = json.loads(result.stdout)["deltas"]
+    assert (delta["before"], delta["after"]) == ("fully traced", "partially traced")
+
+
+def test_diff_without_requirements_at_either_revision_exits_2(run, git):
+    result = run("trace-requirements.py", "diff", "HEAD")
+    assert result.returncode == 2
+    assert "No requirements found" in result.stderr
+
+
+def test_diff_of_an_unknown_revision_exits_2(run, git, tmp_path):
+    write(tmp_path / ".ipe/discovery/requirements.md", "## R-001: Login\n")
+    result = run("trace-requirements.py", "diff", "no-such-revision")
+    assert result.returncode == 2
+    assert "Error comparing revisions" in result.stderr
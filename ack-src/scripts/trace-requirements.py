@@ -5,21 +5,64 @@ trace-requirements.py - Generate complete traceability report
 Shows full path from requirements through design to implementation:
   Requirement → Architecture → Stack → Tasks
 
-Usage: python3 trace-requirements.py [--format text|json|csv]
+Usage: python3 trace-requirements.py [--format text|json|ndjson|csv]
+       python3 trace-requirements.py index [--db PATH]
+       python3 trace-requirements.py query [--db PATH] [--format text|json] QUESTION
+       python3 trace-requirements.py diff BASE [HEAD] [--format text|json]
+
+  json, ndjson and csv are streamed: each requirement is written as soon
+  as it is traced. ndjson writes one trace object per line.
+
+  index stores requirements, design sections, tasks and their links in a
+  SQLite database, re-parsing only artifacts whose hash changed. The
+  database is a cache: by default one per project directory under
+  $XDG_CACHE_HOME/ack/trace-requirements (default ~/.cache), outside the
+  tracked .ipe/ artifacts. query refreshes it the same way, then answers:
+    tasks R-042             Tasks that implement a requirement
+    design R-042            Design sections that address a requirement
+    requirements TASK-7     Requirements a task or section references
+    orphans [ARTIFACT]      Sections that reference no requirement
+    untraced                Requirements lacking design or task links
+
+  diff reports which requirements gained or lost design and task links
+  between two git revisions (HEAD defaults to the working tree). Only
+  artifacts that changed between them are parsed twice.
 
 Exit codes:
   0 - Complete traceability
-  1 - Some requirements not fully traced
+  1 - Some requirements not fully traced (diff: some lost full traceability)
   2 - Error reading files
 """
 
+import argparse
+import hashlib
+import os
 import sys
 import json
 import csv
 import re
-from typing import Dict, List, Set
+import sqlite3
+import subprocess
+import textwrap
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
 from dataclasses import dataclass, asdict
-from io import StringIO
+
+
+REQUIREMENTS_PATH = ".ipe/discovery/requirements.md"
+
+# Artifacts traced, by name, relative to the project root
+ARTIFACTS = {
+    'architecture': ".ipe/solution-design/architecture.md",
+    'stack': ".ipe/solution-design/stack.md",
+    'data_model': ".ipe/solution-design/data-model.md",
+    'tasks': ".ipe/implementation/tasks.md",
+}
+
+# A requirement reference: R-042 or REQ-042, never a prefix of R-0421
+REQ_REF_PATTERN = re.compile(r'\b(?:REQ|R)-(\d+)\b')
+
+SECTION_PATTERN = re.compile(r'^#+\s+(.*)$')
+TASK_PATTERN = re.compile(r'###\s+(TASK-\d+):[^\n]+')
 
 
 @dataclass
@@ -37,15 +80,18 @@ class TraceLink:
         return asdict(self)
 
 
-def parse_requirements() -> Dict[str, str]:
-    """Parse requirements and return {id: title}"""
-    requirements = {}
-    
+def read_artifact(filepath: str) -> Optional[str]:
+    """Read an artifact from the working tree, or None if it does not exist"""
     try:
-        with open(".ipe/discovery/requirements.md", 'r', encoding='utf-8') as f:
-            content = f.read()
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read()
     except FileNotFoundError:
-        return requirements
+        return None
+
+
+def requirements_in(content: str) -> Dict[str, str]:
+    """Requirements declared in requirements.md content: {id: title}"""
+    requirements = {}
     
     for match in re.finditer(r'^##\s+(R-\d+):\s*(.+)$', content, re.MULTILINE):
         requirements[match.group(1)] = match.group(2).strip()
@@ -53,76 +99,84 @@ def parse_requirements() -> Dict[str, str]:
     return requirements
 
 
-def find_references_in_file(filepath: str, requirement_id: str) -> List[str]:
-    """Find sections/components that reference a requirement"""
-    refs = []
-    
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        return refs
-    
-    # Split into sections by headers
-    sections = re.split(r'^#+\s+', content, flags=re.MULTILINE)
-    
-    for i, section in enumerate(sections):
-        if i == 0:  # Skip before first header
-            continue
-        
-        # Check if requirement is mentioned in this section
-        if requirement_id in section or requirement_id.replace('R-', 'REQ-') in section:
-            # Extract section title (first line)
-            lines = section.split('\n')
-            if lines:
-                title = lines[0].strip()
-                refs.append(title)
-    
-    return refs
+def parse_requirements(read: Callable[[str], Optional[str]] = read_artifact) -> Dict[str, str]:
+    """Parse requirements and return {id: title}"""
+    content = read(REQUIREMENTS_PATH)
+    return requirements_in(content) if content is not None else {}
 
 
-def find_task_references(requirement_id: str) -> List[str]:
-    """Find tasks that reference a requirement"""
-    tasks = []
-    
-    try:
-        with open(".ipe/implementation/tasks.md", 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        return tasks
-    
-    # Find task sections that mention the requirement
-    task_pattern = r'###\s+(TASK-\d+):[^\n]+'
+def split_sections(name: str, content: str) -> List[Tuple[str, List[str]]]:
+    """
+    List an artifact's sections in order as (title, requirement IDs referenced).
+
+    In design documents a section runs from a markdown header to the next
+    header of any level; text before the first header belongs to no
+    section. In tasks.md a section is a "### TASK-XXX:" block, titled by
+    its task ID. IDs match exactly, and REQ-XXX is read as R-XXX.
+    """
+    sections: List[Tuple[str, List[str]]] = []
+    refs = None
+    is_tasks = name == 'tasks'
     
-    current_task = None
     for line in content.split('\n'):
-        task_match = re.match(task_pattern, line)
-        if task_match:
-            current_task = task_match.group(1)
-        elif current_task and (requirement_id in line or requirement_id.replace('R-', 'REQ-') in line):
-            if current_task not in tasks:
-                tasks.append(current_task)
+        header = (TASK_PATTERN if is_tasks else SECTION_PATTERN).match(line)
+        if header:
+            refs = []
+            sections.append((header.group(1).strip(), refs))
+            if is_tasks:
+                continue
+        if refs is None:
+            continue
+        for match in REQ_REF_PATTERN.finditer(line):
+            req_id = 'R-' + match.group(1)
+            if req_id not in refs:
+                refs.append(req_id)
     
-    return tasks
+    return sections
 
 
-def generate_traces(requirements: Dict[str, str]) -> List[TraceLink]:
-    """Generate trace links for all requirements"""
-    traces = []
+def index_artifact(name: str, content: Optional[str]) -> Dict[str, List[str]]:
+    """
+    Map each requirement ID to the titles of the artifact's sections that
+    reference it; a missing artifact references nothing.
+    """
+    index: Dict[str, List[str]] = {}
+    if content is None:
+        return index
+    
+    for title, refs in split_sections(name, content):
+        for req_id in refs:
+            titles = index.setdefault(req_id, [])
+            if title not in titles:
+                titles.append(title)
+    
+    return index
+
+
+def build_index(read: Callable[[str], Optional[str]] = read_artifact) -> Dict[str, Dict[str, List[str]]]:
+    """Load and section every artifact once: {artifact: {requirement ID: refs}}"""
+    return {name: index_artifact(name, read(path)) for name, path in ARTIFACTS.items()}
+
+
+def iter_traces(requirements: Dict[str, str],
+                index: Dict[str, Dict[str, List[str]]] = None) -> Iterator[TraceLink]:
+    """Yield a trace link per requirement, as soon as each is resolved"""
+    if index is None:
+        index = build_index()
     
     for req_id, req_title in requirements.items():
-        # Find references in design documents
-        arch_refs = find_references_in_file(".ipe/solution-design/architecture.md", req_id)
-        stack_refs = find_references_in_file(".ipe/solution-design/stack.md", req_id)
-        data_refs = find_references_in_file(".ipe/solution-design/data-model.md", req_id)
-        task_refs = find_task_references(req_id)
+        # Look up references in design documents and tasks
+        arch_refs = index['architecture'].get(req_id, [])
+        stack_refs = index['stack'].get(req_id, [])
+        data_refs = index['data_model'].get(req_id, [])
+        task_refs = index['tasks'].get(req_id, [])
         
         # Determine if fully traced
         has_design = bool(arch_refs or stack_refs or data_refs)
         has_tasks = bool(task_refs)
         fully_traced = has_design and has_tasks
         
-        trace = TraceLink(
+        yield TraceLink(
             requirement_id=req_id,
             requirement_title=req_title,
             architecture_refs=arch_refs,
@@ -131,14 +185,22 @@ def generate_traces(requirements: Dict[str, str]) -> List[TraceLink]:
             task_refs=task_refs,
             fully_traced=fully_traced
         )
-        
-        traces.append(trace)
-    
-    return traces
 
 
-def output_text(traces: List[TraceLink]) -> None:
-    """Output traceability report as formatted text"""
+def generate_traces(requirements: Dict[str, str],
+                    index: Dict[str, Dict[str, List[str]]] = None) -> List[TraceLink]:
+    """Generate trace links for all requirements"""
+    return list(iter_traces(requirements, index))
+
+
+def output_text(traces: Iterable[TraceLink]) -> Tuple[int, int]:
+    """
+    Output traceability report as formatted text.
+
+    The report groups requirements by status, so unlike the other formats
+    it holds the matrix in memory. Returns (fully traced, total).
+    """
+    traces = list(traces)
     
     print("═══════════════════════════════════════════════════════════════")
     print("  Requirement Traceability Matrix")
@@ -214,27 +276,65 @@ def output_text(traces: List[TraceLink]) -> None:
     print(f"Partially Traced:     {len(partially_traced)}")
     print(f"Not Traced:           {len(not_traced)}")
     print()
+    
+    return traced, total
 
 
-def output_json(traces: List[TraceLink]) -> None:
-    """Output traceability report as JSON"""
-    
-    output = {
-        "total_requirements": len(traces),
-        "fully_traced": len([t for t in traces if t.fully_traced]),
-        "partially_traced": len([t for t in traces if not t.fully_traced and (t.architecture_refs or t.task_refs)]),
-        "not_traced": len([t for t in traces if not (t.architecture_refs or t.task_refs)]),
-        "traces": [t.to_dict() for t in traces]
+def output_json(traces: Iterable[TraceLink], out: TextIO = None) -> Tuple[int, int]:
+    """
+    Stream the traceability report as JSON.
+
+    Each trace is written as soon as it is produced. The summary counts
+    are only known at the end, so they follow the traces array.
+    Returns (fully traced, total).
+    """
+    out = out or sys.stdout
+    total = fully_traced = partially_traced = not_traced = 0
+    
+    out.write('{\n  "traces": [')
+    for trace in traces:
+        out.write(',\n' if total else '\n')
+        out.write(textwrap.indent(json.dumps(trace.to_dict(), indent=2), '    '))
+        total += 1
+        if trace.fully_traced:
+            fully_traced += 1
+        elif trace.architecture_refs or trace.task_refs:
+            partially_traced += 1
+        if not (trace.architecture_refs or trace.task_refs):
+            not_traced += 1
+    out.write('\n  ],\n' if total else '],\n')
+    
+    summary = {
+        "total_requirements": total,
+        "fully_traced": fully_traced,
+        "partially_traced": partially_traced,
+        "not_traced": not_traced,
     }
+    for i, (key, value) in enumerate(summary.items()):
+        out.write(f'  {json.dumps(key)}: {value}' + (',\n' if i < len(summary) - 1 else '\n'))
+    out.write('}\n')
+    
+    return fully_traced, total
+
+
+def output_ndjson(traces: Iterable[TraceLink], out: TextIO = None) -> Tuple[int, int]:
+    """Stream one JSON trace per line; returns (fully traced, total)"""
+    out = out or sys.stdout
+    total = fully_traced = 0
+    
+    for trace in traces:
+        out.write(json.dumps(trace.to_dict()) + '\n')
+        total += 1
+        fully_traced += trace.fully_traced
     
-    print(json.dumps(output, indent=2))
+    return fully_traced, total
 
 
-def output_csv(traces: List[TraceLink]) -> None:
-    """Output traceability report as CSV"""
+def output_csv(traces: Iterable[TraceLink], out: TextIO = None) -> Tuple[int, int]:
+    """Stream the traceability report as CSV; returns (fully traced, total)"""
     
-    output = StringIO()
-    writer = csv.writer(output)
+    writer = csv.writer(out or sys.stdout)
+    total = fully_traced = 0
     
     # Header
     writer.writerow([
@@ -258,50 +358,563 @@ def output_csv(traces: List[TraceLink]) -> None:
             '; '.join(trace.task_refs) if trace.task_refs else '',
             'Yes' if trace.fully_traced else 'No'
         ])
+        total += 1
+        fully_traced += trace.fully_traced
     
-    print(output.getvalue())
+    return fully_traced, total
+
+
+OUTPUT_FORMATS = {
+    'text': output_text,
+    'json': output_json,
+    'ndjson': output_ndjson,
+    'csv': output_csv,
+}
+
+
+# Traceability store
+
+STORE_SCHEMA = """
+CREATE TABLE artifacts (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE requirements (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL
+);
+CREATE TABLE sections (
+    id INTEGER PRIMARY KEY,
+    artifact TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE links (
+    requirement_id TEXT NOT NULL,
+    section_id INTEGER NOT NULL,
+    PRIMARY KEY (requirement_id, section_id)
+) WITHOUT ROWID;
+CREATE INDEX sections_by_artifact ON sections (artifact, position);
+CREATE INDEX sections_by_title ON sections (title);
+CREATE INDEX links_by_section ON links (section_id);
+"""
+
+# Bump when the schema or section parsing changes; older stores are rebuilt
+STORE_VERSION = 1
+
+
+def content_sha256(content: Optional[str]) -> str:
+    """SHA-256 of an artifact's text, or "missing" if it does not exist"""
+    if content is None:
+        return "missing"
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory ($XDG_CACHE_HOME/ack/trace-requirements)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ack', 'trace-requirements')
+
+
+def default_db_path(root: str = '.') -> str:
+    """The cached database of the project at root, keyed by its real path"""
+    key = hashlib.sha256(os.path.realpath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(default_cache_dir(), f"{key}.db")
+
+
+class TraceStore:
+    """
+    SQLite store of requirements, design sections, tasks and their links.
+
+    Each artifact is stored with the hash of its content, and refresh()
+    re-parses only the artifacts whose hash changed, so narrow questions
+    are answered by indexed queries instead of re-reading every document.
+    Without a path it lives in the cache directory, as default_db_path().
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = default_db_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != STORE_VERSION:
+            with self.conn:
+                for table in ('artifacts', 'requirements', 'sections', 'links'):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self.conn.executescript(STORE_SCHEMA)
+                self.conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+    
+    def close(self):
+        self.conn.close()
+    
+    def refresh(self, read: Callable[[str], Optional[str]] = read_artifact) -> List[str]:
+        """Re-parse artifacts whose content changed; returns their names"""
+        stored = dict(self.conn.execute("SELECT name, sha256 FROM artifacts"))
+        changed = []
+        
+        for name, path in [('requirements', REQUIREMENTS_PATH)] + list(ARTIFACTS.items()):
+            content = read(path)
+            sha = content_sha256(content)
+            if stored.get(name) == sha:
+                continue
+            
+            with self.conn:
+                if name == 'requirements':
+                    self._store_requirements(content)
+                else:
+                    self._store_sections(name, content)
+                self.conn.execute("INSERT OR REPLACE INTO artifacts (name, sha256) VALUES (?, ?)",
+                                  (name, sha))
+            changed.append(name)
+        
+        return changed
+    
+    def _store_requirements(self, content: Optional[str]):
+        self.conn.execute("DELETE FROM requirements")
+        if content is not None:
+            self.conn.executemany("INSERT OR REPLACE INTO requirements (id, title) VALUES (?, ?)",
+                                  requirements_in(content).items())
+    
+    def _store_sections(self, name: str, content: Optional[str]):
+        self.conn.execute("DELETE FROM links WHERE section_id IN "
+                          "(SELECT id FROM sections WHERE artifact = ?)", (name,))
+        self.conn.execute("DELETE FROM sections WHERE artifact = ?", (name,))
+        if content is None:
+            return
+        
+        for position, (title, refs) in enumerate(split_sections(name, content)):
+            section_id = self.conn.execute(
+                "INSERT INTO sections (artifact, position, title) VALUES (?, ?, ?)",
+                (name, position, title)
+            ).lastrowid
+            self.conn.executemany("INSERT INTO links (requirement_id, section_id) VALUES (?, ?)",
+                                  [(req_id, section_id) for req_id in refs])
+    
+    def requirement_sections(self, req_id: str, artifacts: List[str]) -> List[Tuple[str, str]]:
+        """(artifact, title) of sections in the given artifacts that reference a requirement"""
+        placeholders = ', '.join('?' * len(artifacts))
+        return self.conn.execute(
+            "SELECT s.artifact, s.title FROM links l JOIN sections s ON s.id = l.section_id "
+            f"WHERE l.requirement_id = ? AND s.artifact IN ({placeholders}) "
+            "ORDER BY s.artifact, s.position",
+            [req_id] + artifacts
+        ).fetchall()
+    
+    def section_requirements(self, title: str) -> List[Tuple[str, str, str]]:
+        """(artifact, requirement ID, requirement title) for sections or tasks with this title"""
+        return self.conn.execute(
+            "SELECT s.artifact, l.requirement_id, COALESCE(r.title, '') "
+            "FROM sections s JOIN links l ON l.section_id = s.id "
+            "LEFT JOIN requirements r ON r.id = l.requirement_id "
+            "WHERE s.title = ? ORDER BY s.artifact, s.position, l.requirement_id",
+            (title,)
+        ).fetchall()
+    
+    def orphan_sections(self, artifacts: List[str]) -> List[Tuple[str, str]]:
+        """(artifact, title) of sections that reference no requirement"""
+        placeholders = ', '.join('?' * len(artifacts))
+        return self.conn.execute(
+            "SELECT s.artifact, s.title FROM sections s "
+            f"WHERE s.artifact IN ({placeholders}) "
+            "AND NOT EXISTS (SELECT 1 FROM links l WHERE l.section_id = s.id) "
+            "ORDER BY s.artifact, s.position",
+            artifacts
+        ).fetchall()
+    
+    def untraced_requirements(self) -> List[Tuple[str, str, bool, bool]]:
+        """(id, title, has design, has tasks) of requirements not fully traced"""
+        rows = self.conn.execute(
+            "SELECT r.id, r.title, "
+            "COALESCE(MAX(s.artifact != 'tasks'), 0), COALESCE(MAX(s.artifact = 'tasks'), 0) "
+            "FROM requirements r "
+            "LEFT JOIN links l ON l.requirement_id = r.id "
+            "LEFT JOIN sections s ON s.id = l.section_id "
+            "GROUP BY r.id ORDER BY r.id"
+        ).fetchall()
+        return [(req_id, title, bool(design), bool(tasks))
+                for req_id, title, design, tasks in rows if not (design and tasks)]
+
+
+DESIGN_ARTIFACTS = [name for name in ARTIFACTS if name != 'tasks']
+
+
+def normalize_requirement_id(value: str) -> str:
+    """Accept R-042, REQ-042 or 042 and return R-042"""
+    match = re.fullmatch(r'(?:REQ-|R-)?(\d+)', value.strip(), re.IGNORECASE)
+    return f"R-{match.group(1)}" if match else value.strip()
+
+
+def run_query(args) -> int:
+    """Answer one question from the store, refreshing changed artifacts first"""
+    try:
+        store = TraceStore(args.db)
+    except (OSError, sqlite3.Error) as e:
+        print(f"❌ Cannot open {args.db or default_db_path()}: {e}", file=sys.stderr)
+        return 2
+    
+    try:
+        store.refresh()
+        if args.question == 'tasks':
+            req_id = normalize_requirement_id(args.requirement)
+            rows = [{"task": title} for _, title in store.requirement_sections(req_id, ['tasks'])]
+        elif args.question == 'design':
+            req_id = normalize_requirement_id(args.requirement)
+            rows = [{"artifact": artifact, "section": title}
+                    for artifact, title in store.requirement_sections(req_id, DESIGN_ARTIFACTS)]
+        elif args.question == 'requirements':
+            rows = [{"artifact": artifact, "requirement_id": req_id, "requirement_title": title}
+                    for artifact, req_id, title in store.section_requirements(args.section)]
+        elif args.question == 'orphans':
+            artifacts = [args.artifact] if args.artifact else DESIGN_ARTIFACTS
+            rows = [{"artifact": artifact, "section": title}
+                    for artifact, title in store.orphan_sections(artifacts)]
+        else:
+            rows = [{"requirement_id": req_id, "requirement_title": title,
+                     "has_design": has_design, "has_tasks": has_tasks}
+                    for req_id, title, has_design, has_tasks in store.untraced_requirements()]
+    finally:
+        store.close()
+    
+    if args.query_format == 'json':
+        print(json.dumps(rows, indent=2))
+    elif not rows:
+        print("(no results)")
+    else:
+        for row in rows:
+            print("  ".join(
+                f"{key[4:]}: {'yes' if value else 'no'}" if isinstance(value, bool) else str(value)
+                for key, value in row.items()
+            ))
+    
+    return 0
+
+
+def run_index(args) -> int:
+    """Bring the store up to date and report which artifacts were re-parsed"""
+    try:
+        store = TraceStore(args.db)
+    except (OSError, sqlite3.Error) as e:
+        print(f"❌ Cannot open {args.db or default_db_path()}: {e}", file=sys.stderr)
+        return 2
+    
+    try:
+        changed = store.refresh()
+    finally:
+        store.close()
+    
+    unchanged = len(ARTIFACTS) + 1 - len(changed)
+    if changed:
+        print(f"✅ Re-indexed {', '.join(changed)} ({unchanged} unchanged) in {store.path}")
+    else:
+        print(f"✅ {store.path} is up to date")
+    return 0
+
+
+# Revision delta
+
+ARTIFACT_LABELS = {
+    'architecture': "Architecture",
+    'stack': "Stack",
+    'data_model': "Data Model",
+    'tasks': "Tasks",
+}
+
+
+@dataclass
+class TraceDelta:
+    """How one requirement's trace links changed between two revisions"""
+    requirement_id: str
+    requirement_title: str
+    before: str
+    after: str
+    gained: Dict[str, List[str]] = None
+    lost: Dict[str, List[str]] = None
+    
+    def __post_init__(self):
+        if self.gained is None:
+            self.gained = {}
+        if self.lost is None:
+            self.lost = {}
+    
+    @property
+    def regressed(self) -> bool:
+        return self.before == "fully traced" and self.after not in ("fully traced", "removed")
+    
+    def to_dict(self):
+        return asdict(self)
+
+
+def git_output(args: List[str], cwd: str = ".") -> bytes:
+    """Run git in cwd and return stdout, raising RuntimeError on failure"""
+    try:
+        result = subprocess.run(['git', *args], cwd=cwd, capture_output=True)
+    except OSError as e:
+        raise RuntimeError(f"cannot run git: {e}")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def revision_reader(rev: Optional[str]) -> Callable[[str], Optional[str]]:
+    """Artifact reader for git revision rev (the working tree if None)"""
+    if rev is None:
+        return read_artifact
+    
+    def read(filepath: str) -> Optional[str]:
+        try:
+            return git_output(['show', f"{rev}:./{filepath}"]).decode('utf-8')
+        except RuntimeError:
+            return None  # not present in that revision
+    
+    return read
+
+
+def changed_artifacts(base: str, head: Optional[str]) -> Set[str]:
+    """Names of the artifacts whose content differs between base and head"""
+    paths = {REQUIREMENTS_PATH: 'requirements'}
+    paths.update({path: name for name, path in ARTIFACTS.items()})
+    
+    revs = [base] + ([head] if head else [])
+    output = git_output(['diff', '--name-only', '--no-renames', '--relative', *revs, '--', *paths])
+    if head is None:
+        # A new artifact not yet added to git is still a change from base
+        output += git_output(['ls-files', '--others', '--exclude-standard', '--', *paths])
+    
+    return {paths[line] for line in output.decode('utf-8').splitlines() if line in paths}
+
+
+def trace_status(refs: Optional[Dict[str, List[str]]]) -> str:
+    """fully traced, partially traced or not traced; "removed" for an absent requirement"""
+    if refs is None:
+        return "removed"
+    has_design = any(refs[name] for name in ARTIFACTS if name != 'tasks')
+    has_tasks = bool(refs['tasks'])
+    if has_design and has_tasks:
+        return "fully traced"
+    return "partially traced" if has_design or has_tasks else "not traced"
+
+
+def trace_delta(base: str, head: Optional[str]) -> Optional[Tuple[List[TraceDelta], Set[str]]]:
+    """
+    Compare trace links between two git revisions (head None: working tree).
+
+    Only the artifacts git reports as changed are parsed at both
+    revisions, and they alone decide which requirements are compared:
+    those declared, dropped, or referenced differently in a changed
+    artifact. An unchanged artifact is the same on both sides, so it is
+    sectioned once (from the working tree when that is the head, sparing
+    a git call), and only if some requirement is compared at all. The
+    cost follows the size of the change rather than of the spec.
+    Returns the deltas and the names of the changed artifacts, or None
+    if neither revision declares any requirement.
+    """
+    changed = changed_artifacts(base, head)
+    read_base, read_head = revision_reader(base), revision_reader(head)
+    
+    head_requirements = parse_requirements(read_head)
+    base_requirements = parse_requirements(read_base) if 'requirements' in changed else head_requirements
+    if not base_requirements and not head_requirements:
+        return None
+    
+    base_index, head_index = {}, {}
+    for name, path in ARTIFACTS.items():
+        if name in changed:
+            base_index[name] = index_artifact(name, read_base(path))
+            head_index[name] = index_artifact(name, read_head(path))
+    
+    candidates = set(base_requirements) ^ set(head_requirements)
+    for name in base_index:
+        before, after = base_index[name], head_index[name]
+        candidates.update(req_id for req_id in before.keys() | after.keys()
+                          if before.get(req_id) != after.get(req_id))
+    # Drop IDs that are referenced but never declared
+    candidates &= set(base_requirements) | set(head_requirements)
+    
+    if candidates:
+        read_unchanged = read_head if head is None else read_base
+        for name, path in ARTIFACTS.items():
+            if name not in changed:
+                base_index[name] = head_index[name] = index_artifact(name, read_unchanged(path))
+    
+    deltas = []
+    for req_id in sorted(candidates, key=lambda req_id: int(req_id[2:])):
+        base_refs = ({name: base_index[name].get(req_id, []) for name in ARTIFACTS}
+                     if req_id in base_requirements else None)
+        head_refs = ({name: head_index[name].get(req_id, []) for name in ARTIFACTS}
+                     if req_id in head_requirements else None)
+        
+        gained, lost = {}, {}
+        for name in ARTIFACTS:
+            before = base_refs[name] if base_refs else []
+            after = head_refs[name] if head_refs else []
+            added = [ref for ref in after if ref not in before]
+            removed = [ref for ref in before if ref not in after]
+            if added:
+                gained[name] = added
+            if removed:
+                lost[name] = removed
+        
+        if not gained and not lost and base_refs is not None and head_refs is not None:
+            continue
+        
+        deltas.append(TraceDelta(
+            requirement_id=req_id,
+            requirement_title=head_requirements.get(req_id) or base_requirements[req_id],
+            before="added" if base_refs is None else trace_status(base_refs),
+            after=trace_status(head_refs),
+            gained=gained,
+            lost=lost
+        ))
+    
+    return deltas, changed
+
+
+def print_delta(deltas: List[TraceDelta], changed: Set[str], base: str, head_label: str):
+    """Text report: regressions first, then every other requirement whose links changed"""
+    
+    print("═══════════════════════════════════════════════════════════════")
+    print(f"  Traceability Delta: {base} → {head_label}")
+    print("═══════════════════════════════════════════════════════════════")
+    print()
+    
+    names = ['requirements'] + list(ARTIFACTS)
+    print(f"Artifacts changed: {len(changed)} of {len(names)}"
+          + (f" ({', '.join(name for name in names if name in changed)})" if changed else ""))
+    print()
+    
+    regressed = [delta for delta in deltas if delta.regressed]
+    others = [delta for delta in deltas if not delta.regressed]
+    
+    for title, group in (("❌ Lost full traceability", regressed), ("🔀 Trace links changed", others)):
+        if not group:
+            continue
+        print(f"{title} ({len(group)}):")
+        print()
+        for delta in group:
+            transition = delta.after if delta.before == delta.after else f"{delta.before} → {delta.after}"
+            print(f"{delta.requirement_id}: {delta.requirement_title}  [{transition}]")
+            for name in ARTIFACTS:
+                if name in delta.gained:
+                    print(f"  + {ARTIFACT_LABELS[name]}: {', '.join(delta.gained[name])}")
+                if name in delta.lost:
+                    print(f"  - {ARTIFACT_LABELS[name]}: {', '.join(delta.lost[name])}")
+            print()
+    
+    print("═══════════════════════════════════════════════════════════════")
+    print("  Summary")
+    print("═══════════════════════════════════════════════════════════════")
+    print()
+    
+    newly_traced = sum(1 for delta in deltas
+                       if delta.after == "fully traced" and delta.before != "fully traced")
+    print(f"Requirements changed: {len(deltas)}")
+    print(f"Links gained:         {sum(len(refs) for delta in deltas for refs in delta.gained.values())}")
+    print(f"Links lost:           {sum(len(refs) for delta in deltas for refs in delta.lost.values())}")
+    print(f"Newly fully traced:   {newly_traced}")
+    print(f"Lost full traces:     {len(regressed)}")
+    print()
+
+
+def run_diff(args) -> int:
+    """Report trace link changes between two revisions; 1 if any requirement lost full traceability"""
+    head_label = args.head or "working tree"
+    
+    try:
+        delta = trace_delta(args.base, args.head)
+    except (OSError, UnicodeDecodeError, RuntimeError) as e:
+        print(f"❌ Error comparing revisions: {e}", file=sys.stderr)
+        return 2
+    if delta is None:
+        report_no_requirements()
+        return 2
+    deltas, changed = delta
+    
+    if args.diff_format == 'json':
+        print(json.dumps({
+            "base": args.base,
+            "head": head_label,
+            "changed_artifacts": sorted(changed),
+            "deltas": [delta.to_dict() for delta in deltas]
+        }, indent=2))
+    else:
+        print_delta(deltas, changed, args.base, head_label)
+    
+    return 1 if any(delta.regressed for delta in deltas) else 0
+
+
+def parse_args(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Generate complete traceability report",
+        epilog="Without a command, prints the traceability matrix."
+    )
+    parser.add_argument('--format', '-f', choices=list(OUTPUT_FORMATS), default='text',
+                        help='Matrix output format (default: text)')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    db_parent = argparse.ArgumentParser(add_help=False)
+    db_parent.add_argument('--db',
+                           help='Traceability database (default: one per project under '
+                                '~/.cache/ack/trace-requirements)')
+    
+    subparsers.add_parser('index', parents=[db_parent],
+                          help='Refresh the traceability database from changed artifacts')
+    
+    query = subparsers.add_parser('query', parents=[db_parent],
+                                  help='Answer a traceability question from the database')
+    query.add_argument('--format', '-f', dest='query_format', choices=['text', 'json'], default='text',
+                       help='Query output format (default: text)')
+    questions = query.add_subparsers(dest='question', required=True)
+    questions.add_parser('tasks', help='Tasks that implement a requirement') \
+        .add_argument('requirement', help='Requirement ID, e.g. R-042')
+    questions.add_parser('design', help='Design sections that address a requirement') \
+        .add_argument('requirement', help='Requirement ID, e.g. R-042')
+    questions.add_parser('requirements', help='Requirements referenced by a section or task') \
+        .add_argument('section', help='Section title or task ID, e.g. TASK-7')
+    orphans = questions.add_parser('orphans', help='Sections that reference no requirement')
+    orphans.add_argument('artifact', nargs='?', choices=list(ARTIFACTS),
+                         help='Limit to one artifact (default: all design documents)')
+    questions.add_parser('untraced', help='Requirements lacking design or task links')
+    
+    diff = subparsers.add_parser('diff', help='Trace link changes between two git revisions')
+    diff.add_argument('base', help='Base revision, e.g. main')
+    diff.add_argument('head', nargs='?', help='Head revision (default: the working tree)')
+    diff.add_argument('--format', '-f', dest='diff_format', choices=['text', 'json'], default='text',
+                      help='Delta output format (default: text)')
+    
+    return parser.parse_args(argv)
+
+
+def report_no_requirements():
+    """Explain an empty requirements list (the matrix and diff both exit 2 after it)"""
+    print("⚠️  No requirements found", file=sys.stderr)
+    print("   Make sure you're in the project root directory", file=sys.stderr)
 
 
 def main():
-    # Parse arguments
-    output_format = 'text'
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ['--format', '-f']:
-            if len(sys.argv) > 2:
-                output_format = sys.argv[2]
-            else:
-                print("Error: --format requires argument (text|json|csv)", file=sys.stderr)
-                sys.exit(2)
-        elif sys.argv[1] in ['--help', '-h']:
-            print(__doc__)
-            sys.exit(0)
-    
-    if output_format not in ['text', 'json', 'csv']:
-        print(f"Error: Invalid format '{output_format}' (must be text, json, or csv)", file=sys.stderr)
-        sys.exit(2)
+    args = parse_args()
+    
+    if args.command == 'index':
+        sys.exit(run_index(args))
+    if args.command == 'query':
+        sys.exit(run_query(args))
+    if args.command == 'diff':
+        sys.exit(run_diff(args))
+    
+    output_format = args.format
     
     # Generate traces
     requirements = parse_requirements()
     
     if not requirements:
-        print("⚠️  No requirements found", file=sys.stderr)
-        print("   Make sure you're in the project root directory", file=sys.stderr)
+        report_no_requirements()
         sys.exit(2)
     
-    traces = generate_traces(requirements)
-    
-    # Output in requested format
-    if output_format == 'json':
-        output_json(traces)
-    elif output_format == 'csv':
-        output_csv(traces)
-    else:
-        output_text(traces)
+    # Output in requested format, streaming traces as they are resolved
+    fully_traced, total = OUTPUT_FORMATS[output_format](iter_traces(requirements))
     
     # Exit based on traceability
-    fully_traced = len([t for t in traces if t.fully_traced])
-    total = len(traces)
-    
     if fully_traced == total:
         sys.exit(0)
     else: